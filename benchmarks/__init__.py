@@ -0,0 +1,3 @@
+"""
+Benchmarks for the E-commerce Mock API.
+"""
@@ -0,0 +1,164 @@
+"""
+Chat latency under concurrency, against the local fake LLM.
+
+Serves the fake LLM and the app on local ports, then measures:
+
+- concurrent non-streaming chats, plain and with one or several tool calls
+- time to first token and to completion of streamed chats
+- latency of ``GET /products`` while chats are in flight, which stays flat
+  only if the LLM calls do not block the event loop
+
+Run with ``python -m benchmarks.bench_chat``; set ``TOOL_BACKEND=http`` to
+measure tool calls made through the API instead of in-process, and
+``CHAT_CACHE_TTL_SECONDS=60`` to measure with the response caches.
+"""
+
+import asyncio
+import os
+import time
+from typing import List, Tuple
+
+import httpx
+
+from .common import percentile, print_table, serve
+from .fake_llm import create_app
+
+LLM_PORT = 8101
+APP_PORT = 8102
+LLM_LATENCY = 0.2
+TOKENS = 20
+TOKEN_INTERVAL = 0.01
+CONCURRENCY = [1, 10, 50]
+
+APP_URL = f"http://127.0.0.1:{APP_PORT}"
+
+
+def chat_body(text: str) -> list:
+    return [{"role": "user", "content": text}]
+
+
+async def timed_chat(http: httpx.AsyncClient, headers: dict, text: str) -> float:
+    start = time.perf_counter()
+    response = await http.post(f"{APP_URL}/chat", headers=headers, json=chat_body(text))
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def timed_stream(
+    http: httpx.AsyncClient, headers: dict, text: str
+) -> Tuple[float, float]:
+    """Return the time to the first token and to the end of the stream."""
+    start = time.perf_counter()
+    first_token = None
+    async with http.stream(
+        "POST",
+        f"{APP_URL}/chat",
+        params={"stream": True},
+        headers=headers,
+        json=chat_body(text),
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line == "event: token" and first_token is None:
+                first_token = time.perf_counter() - start
+            elif line == "event: error":
+                raise RuntimeError("chat stream failed")
+    return first_token, time.perf_counter() - start
+
+
+async def login(http: httpx.AsyncClient) -> dict:
+    response = await http.post(
+        f"{APP_URL}/login", data={"username": "admin", "password": "admin123"}
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def probe_products(http: httpx.AsyncClient, stop: asyncio.Event) -> List[float]:
+    headers = await login(http)
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await http.get(f"{APP_URL}/products", headers=headers)
+        response.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1e3)
+        await asyncio.sleep(0.01)
+    return samples
+
+
+async def run_chats(http: httpx.AsyncClient, concurrency: int, text: str) -> list:
+    headers = await login(http)
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_products(http, stop))
+    start = time.perf_counter()
+    latencies = await asyncio.gather(
+        *(timed_chat(http, headers, text) for _ in range(concurrency))
+    )
+    wall = time.perf_counter() - start
+    stop.set()
+    probes = await probe
+    latencies = [latency * 1e3 for latency in latencies]
+    return [
+        concurrency,
+        percentile(latencies, 50),
+        percentile(latencies, 95),
+        wall * 1e3,
+        percentile(probes, 95),
+    ]
+
+
+async def run_streams(http: httpx.AsyncClient, concurrency: int) -> list:
+    headers = await login(http)
+    results = await asyncio.gather(
+        *(timed_stream(http, headers, "hello") for _ in range(concurrency))
+    )
+    first_tokens = [first * 1e3 for first, _ in results]
+    totals = [total * 1e3 for _, total in results]
+    return [
+        concurrency,
+        percentile(first_tokens, 50),
+        percentile(first_tokens, 95),
+        percentile(totals, 50),
+    ]
+
+
+async def main() -> None:
+    limits = httpx.Limits(max_connections=200, max_keepalive_connections=200)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as http:
+        for text, label in (
+            ("hello", "plain"),
+            ("what is my email?", "tool call"),
+            ("where are my last orders?", "three tool calls"),
+        ):
+            print(f"\nNon-streaming chat, {label} (ms)")
+            print_table(
+                ["chats", "p50", "p95", "wall", "products p95"],
+                [await run_chats(http, c, text) for c in CONCURRENCY],
+            )
+        print("\nStreaming chat (ms)")
+        print_table(
+            ["chats", "first token p50", "first token p95", "total p50"],
+            [await run_streams(http, c) for c in CONCURRENCY],
+        )
+        response = await http.get(f"{APP_URL}/chat/cache", headers=await login(http))
+        caches = response.json()
+        if caches["completions"]["enabled"]:
+            print("\nResponse caches")
+            print_table(
+                ["cache", "hits", "misses", "hit rate", "saved (s)"],
+                [
+                    [name, s["hits"], s["misses"], s["hit_rate"], s["saved_seconds"]]
+                    for name, s in caches.items()
+                ],
+            )
+
+
+if __name__ == "__main__":
+    os.environ["PROXY_URL"] = f"http://127.0.0.1:{LLM_PORT}/v1"
+    os.environ["API_KEY"] = "fake"
+    os.environ["API_BASE_URL"] = APP_URL
+    from src.app import app
+
+    serve(create_app(LLM_LATENCY, TOKENS, TOKEN_INTERVAL), LLM_PORT)
+    serve(app, APP_PORT)
+    asyncio.run(main())
@@ -0,0 +1,221 @@
+"""
+Microbenchmarks of the functions exported by ``src.database``.
+
+Loads a synthetic fixture (see ``src.synthetic``) into a fresh backend and
+times every read and write function on seeded arguments, reporting the
+best time per call. Run with ``python -m benchmarks.bench_database``, or as
+part of ``python -m benchmarks.suite``.
+"""
+
+import argparse
+import itertools
+import random
+from datetime import UTC, datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from src import database
+from src.models import OrderStatus
+from src.schemas import OrderCreate, ProductCreate
+
+from .common import print_table, seeded_database, synthetic_fixture, time_per_call
+
+USERS = 20_000
+PRODUCTS = 2_000
+ORDERS = 200_000
+# Calls per timed repetition, for cheap and for whole-table operations
+NUMBER = 500
+SLOW_NUMBER = 1
+
+
+def build_cases(
+    users: int, products: int, orders: int, seed: int = 7
+) -> List[Tuple[str, Callable[[], object], int]]:
+    """Return ``(name, call, number)`` for each function, with seeded arguments."""
+    rng = random.Random(seed)
+    now = datetime.now(UTC)
+    new_ids = itertools.count(users + 1)
+    page = database.list_orders(limit=20)[0]
+    # Created up front, so that each timed delete removes a product
+    deletable = iter(
+        [
+            database.create_product(
+                ProductCreate(name="Bench", description="Deleted", price=1.0)
+            ).id
+            for _ in range(NUMBER * 5)
+        ]
+    )
+
+    def user_id() -> int:
+        return rng.randint(1, users)
+
+    def new_order() -> OrderCreate:
+        return OrderCreate(items=[{"id": rng.randint(1, products), "quantity": 1}])
+
+    return [
+        (
+            "get_user_by_username",
+            lambda: database.get_user_by_username(f"user{user_id()}"),
+            NUMBER,
+        ),
+        (
+            "get_user_by_email",
+            lambda: database.get_user_by_email(f"user{user_id()}@example.com"),
+            NUMBER,
+        ),
+        ("get_user_by_id", lambda: database.get_user_by_id(user_id()), NUMBER),
+        (
+            "add_user",
+            lambda: database.add_user(
+                {
+                    "id": (new_id := next(new_ids)),
+                    "email": f"bench{new_id}@example.com",
+                    "username": f"bench{new_id}",
+                    "hashed_password": "0" * 64 + ":" + "0" * 32,
+                    "role": "user",
+                }
+            ),
+            NUMBER,
+        ),
+        (
+            "get_product_by_id",
+            lambda: database.get_product_by_id(rng.randint(1, products)),
+            NUMBER,
+        ),
+        (
+            "get_products_by_ids",
+            lambda: database.get_products_by_ids(
+                rng.randint(1, products) for _ in range(20)
+            ),
+            NUMBER,
+        ),
+        ("get_all_products", database.get_all_products, SLOW_NUMBER),
+        (
+            "list_products",
+            lambda: database.list_products(sort_by="price", limit=100),
+            NUMBER,
+        ),
+        ("get_catalog_version", database.get_catalog_version, NUMBER),
+        (
+            "create_product",
+            lambda: database.create_product(
+                ProductCreate(name="Bench", description="Created", price=9.99)
+            ),
+            NUMBER,
+        ),
+        (
+            "delete_product_by_id",
+            lambda: database.delete_product_by_id(next(deletable)),
+            NUMBER,
+        ),
+        ("get_orders_by_user", lambda: database.get_orders_by_user(user_id()), NUMBER),
+        (
+            "list_orders (user)",
+            lambda: database.list_orders(user_id=user_id(), limit=20),
+            NUMBER,
+        ),
+        (
+            "list_orders (status, range)",
+            lambda: database.list_orders(
+                status=OrderStatus.DELIVERED,
+                created_from=now - timedelta(days=rng.randint(30, 300)),
+                limit=100,
+            ),
+            NUMBER,
+        ),
+        (
+            "iter_orders (since 1 day)",
+            lambda: sum(1 for _ in database.iter_orders(now - timedelta(days=1))),
+            SLOW_NUMBER,
+        ),
+        (
+            "get_product_order_count",
+            lambda: database.get_product_order_count(rng.randint(1, products)),
+            NUMBER,
+        ),
+        (
+            "get_order_by_id",
+            lambda: database.get_order_by_id(rng.randint(1, orders)),
+            NUMBER,
+        ),
+        (
+            "get_orders_by_ids",
+            lambda: database.get_orders_by_ids(
+                rng.randint(1, orders) for _ in range(20)
+            ),
+            NUMBER,
+        ),
+        ("create_order", lambda: database.create_order(user_id(), new_order()), NUMBER),
+        (
+            "create_orders (100)",
+            lambda: database.create_orders(
+                [(user_id(), new_order()) for _ in range(100)]
+            ),
+            SLOW_NUMBER * 10,
+        ),
+        (
+            "update_order_status",
+            lambda: database.update_order_status(rng.randint(1, orders), "processing"),
+            NUMBER,
+        ),
+        ("get_all_orders", database.get_all_orders, SLOW_NUMBER),
+        ("get_sales_by_status", database.get_sales_by_status, NUMBER),
+        ("get_sales_by_product", database.get_sales_by_product, NUMBER),
+        (
+            "get_sales_by_day (30 days)",
+            lambda: database.get_sales_by_day((now - timedelta(days=30)).date()),
+            NUMBER,
+        ),
+        (
+            "add_product_details",
+            lambda: database.add_product_details(rng.choice(page)),
+            NUMBER,
+        ),
+        (
+            "add_products_details (20)",
+            lambda: database.add_products_details(page),
+            NUMBER,
+        ),
+    ]
+
+
+def run(
+    kind: str = "memory",
+    users: int = USERS,
+    products: int = PRODUCTS,
+    orders: int = ORDERS,
+    seed: int = 42,
+) -> Dict[str, dict]:
+    """Time every case against ``kind`` storage and return results by name."""
+    fixture = synthetic_fixture(users, products, orders, seed)
+    results = {}
+    with seeded_database(kind, fixture):
+        for name, call, number in build_cases(users, products, orders):
+            repeat = 5 if number > SLOW_NUMBER else 3
+            us_per_call = time_per_call(call, number, repeat)
+            results[name] = {
+                "us_per_call": us_per_call,
+                "calls_per_second": 1e6 / us_per_call,
+            }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--users", type=int, default=USERS)
+    parser.add_argument("--products", type=int, default=PRODUCTS)
+    parser.add_argument("--orders", type=int, default=ORDERS)
+    args = parser.parse_args()
+    results = run(args.backend, args.users, args.products, args.orders)
+    print(f"\nsrc.database on {args.backend} ({args.orders:,} orders)")
+    print_table(
+        ["function", "us_per_call", "calls_per_s"],
+        [
+            [name, result["us_per_call"], result["calls_per_second"]]
+            for name, result in results.items()
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
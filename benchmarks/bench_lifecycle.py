@@ -0,0 +1,100 @@
+"""
+Cost of the order lifecycle scheduler against polling every order.
+
+Loads synthetic fixtures of growing order counts and reports the time to
+queue the open orders when the scheduler starts, the time a poll of every
+order takes to find the due ones (what a periodic scan pays on each tick,
+against a heap lookup for the scheduler), and the time per transition
+while the scheduler catches up on the orders already due. Run with
+``python -m benchmarks.bench_lifecycle``.
+"""
+
+import argparse
+import time
+from datetime import UTC, datetime
+
+from src.database import iter_orders
+from src.lifecycle import ORDER_LIFECYCLE, OrderScheduler
+from src.models import OrderStatus
+
+from .common import print_table, seeded_database, synthetic_fixture
+
+USERS = 20_000
+PRODUCTS = 2_000
+SIZES = [100_000, 1_000_000]
+
+
+def poll_due() -> int:
+    """Find the due orders by looking at every order, as a poller would."""
+    now = datetime.now(UTC)
+    due = 0
+    for order in iter_orders():
+        status = OrderStatus(order["status"])
+        if status in ORDER_LIFECYCLE:
+            _, delay = ORDER_LIFECYCLE[status]
+            changed_at = order["updated_at"] or order["created_at"]
+            if changed_at + delay <= now:
+                due += 1
+    return due
+
+
+def measure(backend: str, orders: int) -> list:
+    fixture = synthetic_fixture(USERS, PRODUCTS, orders)
+    with seeded_database(backend, fixture):
+        start = time.perf_counter()
+        due = poll_due()
+        poll_ms = (time.perf_counter() - start) * 1e3
+
+        start = time.perf_counter()
+        OrderScheduler()._queue_open_orders()
+        queue_ms = (time.perf_counter() - start) * 1e3
+
+        scheduler = OrderScheduler()
+        start = time.perf_counter()
+        scheduler.start()
+        # Caught up once the open orders are queued, none is due and no
+        # transition was made since the last look
+        transitions = -1
+        while due and not (
+            scheduler._heap
+            and scheduler._heap[0][0] > time.time()
+            and scheduler.transitions == transitions
+        ):
+            transitions = scheduler.transitions
+            time.sleep(0.05)
+        # Less the initial queueing, which start() does first
+        catch_up = time.perf_counter() - start - queue_ms / 1e3
+        scheduler.stop()
+        transitions = scheduler.transitions
+    return [
+        orders,
+        due,
+        queue_ms,
+        poll_ms,
+        transitions,
+        catch_up / max(transitions, 1) * 1e6,
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--orders", type=int, nargs="+", default=SIZES)
+    args = parser.parse_args()
+
+    print(f"\nOrder lifecycle scheduler on {args.backend}")
+    print_table(
+        [
+            "orders",
+            "due",
+            "queue_ms",
+            "poll_ms",
+            "transitions",
+            "us/transition",
+        ],
+        [measure(args.backend, size) for size in args.orders],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Login storms against the password hashing pool.
+
+Serves the app on a local port, fires bursts of concurrent logins and
+measures their latency, how many were shed with 503, and the latency of
+``GET /products`` meanwhile, which stays flat only if hashing does not block
+the event loop.
+
+Run with ``python -m benchmarks.bench_login``; the pool is tuned with
+``PASSWORD_HASH_WORKERS``, ``PASSWORD_HASH_QUEUE_LIMIT``,
+``PASSWORD_HASH_EXECUTOR`` and ``PASSWORD_HASH_ITERATIONS``.
+"""
+
+import asyncio
+import time
+from typing import List
+
+import httpx
+
+from .common import percentile, print_table, serve
+
+APP_PORT = 8103
+APP_URL = f"http://127.0.0.1:{APP_PORT}"
+BURSTS = [1, 8, 32, 128]
+
+
+async def timed_login(http: httpx.AsyncClient) -> tuple:
+    start = time.perf_counter()
+    response = await http.post(
+        f"{APP_URL}/login", data={"username": "johndoe", "password": "password123"}
+    )
+    return response.status_code, (time.perf_counter() - start) * 1e3
+
+
+async def probe_products(
+    http: httpx.AsyncClient, headers: dict, stop: asyncio.Event
+) -> List[float]:
+    samples = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await http.get(f"{APP_URL}/products", headers=headers)
+        response.raise_for_status()
+        samples.append((time.perf_counter() - start) * 1e3)
+        await asyncio.sleep(0.01)
+    return samples
+
+
+async def run_burst(http: httpx.AsyncClient, headers: dict, logins: int) -> list:
+    stop = asyncio.Event()
+    probe = asyncio.create_task(probe_products(http, headers, stop))
+    results = await asyncio.gather(*(timed_login(http) for _ in range(logins)))
+    stop.set()
+    probes = await probe
+    accepted = [ms for code, ms in results if code == 200]
+    return [
+        logins,
+        len(accepted),
+        sum(1 for code, _ in results if code == 503),
+        percentile(accepted, 50) if accepted else 0.0,
+        percentile(accepted, 95) if accepted else 0.0,
+        percentile(probes, 95) if probes else 0.0,
+    ]
+
+
+async def main() -> None:
+    limits = httpx.Limits(max_connections=500, max_keepalive_connections=500)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as http:
+        response = await http.post(
+            f"{APP_URL}/login", data={"username": "admin", "password": "admin123"}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        print(f"\nLogin bursts (ms), {response.headers['Server-Timing']}")
+        print_table(
+            ["logins", "ok", "shed", "p50", "p95", "products p95"],
+            [await run_burst(http, headers, logins) for logins in BURSTS],
+        )
+
+
+if __name__ == "__main__":
+    from src.app import app
+
+    serve(app, APP_PORT)
+    asyncio.run(main())
@@ -0,0 +1,55 @@
+"""
+Cost of ``get_all_orders`` with per-item and batched product hydration.
+
+The per-item version reproduces the previous ``add_product_details``, which
+validated a new ``Product`` for every item of every order. Run with
+``python -m benchmarks.bench_order_hydration``.
+"""
+
+import time
+from typing import List
+
+from src.data import MOCK_PRODUCTS
+from src.models import Order, Product
+from src.storage import MemoryBackend
+
+from .common import make_orders, print_table
+
+SIZES = [10_000, 100_000]
+
+
+def per_item_get_all_orders(backend: MemoryBackend) -> List[Order]:
+    orders = []
+    for raw in backend.iter_orders():
+        order = Order(**raw)
+        order.products = [
+            Product(**backend.products_db[item.id]) for item in order.items
+        ]
+        orders.append(order)
+    return orders
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1e3
+
+
+def main() -> None:
+    product_ids = [product["id"] for product in MOCK_PRODUCTS]
+    rows = []
+    for size in SIZES:
+        backend = MemoryBackend()
+        backend.load(products=MOCK_PRODUCTS, orders=make_orders(size, product_ids))
+
+        per_item = min(
+            timed(lambda: per_item_get_all_orders(backend)) for _ in range(3)
+        )
+        batched = min(timed(backend.get_all_orders) for _ in range(3))
+        rows.append([size, per_item, batched, per_item / batched])
+
+    print_table(["orders", "per_item_ms", "batched_ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
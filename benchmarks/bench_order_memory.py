@@ -0,0 +1,115 @@
+"""
+Memory held by orders as dicts and packed into an ``OrderStore``.
+
+The dict layout reproduces the previous ``MemoryBackend.orders_db``: one
+dict per order as loaded from a fixture, with a ``datetime`` per timestamp
+and a dict per item. Memory is measured with ``tracemalloc`` while each
+layout is loaded from the same synthetic fixture, and the time to turn a
+stored order into an ``Order`` is reported alongside. Run with
+``python -m benchmarks.bench_order_memory``.
+"""
+
+import argparse
+import gc
+import random
+import tracemalloc
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from src.models import Order
+from src.storage.base import StorageBackend
+from src.storage.columnar import OrderStore
+from src.synthetic import iter_fixture
+
+from .common import print_table, synthetic_fixture, time_per_call
+
+USERS = 20_000
+PRODUCTS = 2_000
+SIZES = [100_000, 1_000_000]
+# Orders decoded per timed call
+SAMPLE = 1_000
+
+
+def allocated(build: Callable[[], object]) -> Tuple[object, int]:
+    """Return what ``build`` returns and the bytes it left allocated."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def fixture_orders(fixture: str) -> Iterator[dict]:
+    for section, records in iter_fixture(fixture):
+        if section == "orders":
+            yield from records
+
+
+def measure_dicts(fixture: str, ids: List[int]) -> Tuple[int, float]:
+    """Bytes held by the dict layout, and microseconds to validate an order."""
+
+    def build() -> Dict[int, dict]:
+        return {order["id"]: order for order in fixture_orders(fixture)}
+
+    dicts, size = allocated(build)
+    us = time_per_call(lambda: [Order(**dicts[i]) for i in ids], 10)
+    return size, us / len(ids)
+
+
+def measure_store(fixture: str, ids: List[int]) -> Tuple[int, float]:
+    """Bytes held by an OrderStore, and microseconds to decode an order."""
+
+    def build() -> OrderStore:
+        store = OrderStore()
+        for order in fixture_orders(fixture):
+            store.add(Order(**order))
+        return store
+
+    store, size = allocated(build)
+    us = time_per_call(
+        lambda: [StorageBackend.stored_order(store.record(i)) for i in ids], 10
+    )
+    return size, us / len(ids)
+
+
+def measure(orders: int) -> list:
+    fixture = synthetic_fixture(USERS, PRODUCTS, orders)
+    ids = random.Random(7).choices(range(1, orders + 1), k=SAMPLE)
+    dict_bytes, dict_us = measure_dicts(fixture, ids)
+    store_bytes, store_us = measure_store(fixture, ids)
+    return [
+        orders,
+        dict_bytes / 2**20,
+        store_bytes / 2**20,
+        dict_bytes / orders,
+        store_bytes / orders,
+        dict_bytes / store_bytes,
+        dict_us,
+        store_us,
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, nargs="+", default=SIZES)
+    args = parser.parse_args()
+    print_table(
+        [
+            "orders",
+            "dicts_mb",
+            "packed_mb",
+            "dict_b/order",
+            "packed_b/order",
+            "ratio",
+            "dict_to_order_us",
+            "packed_to_order_us",
+        ],
+        [measure(size) for size in args.orders],
+    )
+
+
+if __name__ == "__main__":
+    main()
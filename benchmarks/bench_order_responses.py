@@ -0,0 +1,98 @@
+"""
+Latency of ``GET /orders`` with the JSON fast path and with revalidation.
+
+Loads synthetic fixtures of growing order counts and times admin requests
+for pages of orders, through httpx's ASGI transport. The revalidating
+version reproduces the previous route: each stored order was validated
+again on read, and FastAPI validated the page once more against
+``response_model`` before serializing it. Run with
+``python -m benchmarks.bench_order_responses``.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import httpx
+
+from src.auth import create_access_token
+from src.database import list_orders
+from src.models import Order
+from src.schemas import OrderResponse
+
+from .common import print_table, seeded_database, synthetic_fixture
+
+USERS = 20_000
+PRODUCTS = 2_000
+SIZES = [50_000, 500_000]
+PAGE_SIZES = [100, 1_000]
+REQUESTS = 50
+LEGACY_PATH = "/bench/orders-revalidated"
+
+
+def add_revalidating_route(app) -> None:
+    def read_orders_revalidated(limit: int = 100) -> List[Order]:
+        orders, _ = list_orders(limit=limit)
+        return [Order(**order.model_dump()) for order in orders]
+
+    if not any(getattr(route, "path", None) == LEGACY_PATH for route in app.routes):
+        app.add_api_route(
+            LEGACY_PATH,
+            read_orders_revalidated,
+            response_model=List[OrderResponse],
+            include_in_schema=False,
+        )
+
+
+async def best_ms_per_request(
+    http: httpx.AsyncClient, path: str, limit: int, repeat: int = 3
+) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            response = await http.get(path, params={"limit": limit})
+            response.raise_for_status()
+        best = min(best, time.perf_counter() - start)
+    return best / REQUESTS * 1e3
+
+
+async def measure(page_sizes: List[int]) -> List[List[float]]:
+    from src.app import app
+
+    add_revalidating_route(app)
+    # Synthetic user 1 is an admin, who sees every order
+    token = create_access_token(data={"sub": "user1"})
+    rows = []
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://bench",
+        headers={"Authorization": f"Bearer {token}"},
+    ) as http:
+        for limit in page_sizes:
+            revalidated = await best_ms_per_request(http, LEGACY_PATH, limit)
+            fast = await best_ms_per_request(http, "/orders", limit)
+            rows.append([limit, revalidated, fast, revalidated / fast])
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--orders", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--limit", type=int, nargs="+", default=PAGE_SIZES)
+    args = parser.parse_args()
+    rows = []
+    for orders in args.orders:
+        fixture = synthetic_fixture(USERS, PRODUCTS, orders)
+        with seeded_database(args.backend, fixture):
+            for row in asyncio.run(measure(args.limit)):
+                rows.append([orders, *row])
+
+    print(f"\nGET /orders on {args.backend}")
+    print_table(["orders", "limit", "revalidated_ms", "fast_path_ms", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
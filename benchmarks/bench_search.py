@@ -0,0 +1,73 @@
+"""
+Latency of product search, and of keeping its index up to date.
+
+Loads a synthetic catalog into a fresh backend and times ``search_products``
+for queries from selective to broad: whole words, prefixes, several terms
+and price ranges. The synthetic vocabulary is small, so common words match
+a large share of the catalog, which is the expensive case for ranking.
+Creating and deleting a product is timed too, since both update the index.
+Run with ``python -m benchmarks.bench_search``.
+"""
+
+import argparse
+
+from src import database
+from src.schemas import ProductCreate
+
+from .common import print_table, seeded_database, synthetic_fixture, time_per_call
+
+SIZES = [10_000, 100_000]
+# (query, min_price, max_price)
+QUERIES = [
+    ("waterproof backpack", None, None),
+    ("headphones", None, None),
+    ("head", None, None),
+    ("wireless", 20, 40),
+    ("classic t shirt cotton", None, None),
+    ("pr", None, None),
+    ("nothingmatches", None, None),
+]
+LIMIT = 20
+
+
+def measure(backend_kind: str, products: int) -> list:
+    fixture = synthetic_fixture(1, products, 0)
+    rows = []
+    with seeded_database(backend_kind, fixture):
+        for query, min_price, max_price in QUERIES:
+            matches = len(
+                database.search_products(query, min_price, max_price, products)
+            )
+            us = time_per_call(
+                lambda: database.search_products(query, min_price, max_price, LIMIT),
+                20,
+            )
+            price = f"{min_price}-{max_price}" if min_price is not None else ""
+            rows.append([products, query, price, matches, us / 1e3])
+
+        def create_and_delete() -> None:
+            product = database.create_product(
+                ProductCreate(
+                    name="Bench Lamp", description="Adjustable desk lamp", price=25
+                )
+            )
+            database.delete_product_by_id(product.id)
+
+        us = time_per_call(create_and_delete, 200)
+        rows.append([products, "(create + delete)", "", 0, us / 1e3])
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--products", type=int, nargs="+", default=SIZES)
+    args = parser.parse_args()
+    rows = [row for size in args.products for row in measure(args.backend, size)]
+
+    print(f"\nsearch_products on {args.backend}, limit {LIMIT}")
+    print_table(["products", "query", "price", "matches", "ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
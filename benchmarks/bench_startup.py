@@ -0,0 +1,96 @@
+"""
+Cold start of a worker.
+
+Each sample runs in a fresh interpreter: the time to import ``src.app``
+(and, for comparison, the chat stack that it now loads on first use), then
+the time from spawning a uvicorn worker until it answers its first request
+and its first login.
+
+Run with ``python -m benchmarks.bench_startup``.
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from .common import print_table
+
+APP_PORT = 8104
+APP_URL = f"http://127.0.0.1:{APP_PORT}"
+RUNS = 5
+
+IMPORT_SNIPPET = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - start)\n"
+)
+
+
+def import_seconds(module: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def first_request_seconds() -> tuple:
+    """Spawn a worker and return the seconds until it serves and logs in."""
+    start = time.perf_counter()
+    worker = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "src.app:app",
+            "--port",
+            str(APP_PORT),
+            "--log-level",
+            "warning",
+        ]
+    )
+    try:
+        with httpx.Client(timeout=30) as http:
+            while True:
+                try:
+                    http.get(f"{APP_URL}/docs").raise_for_status()
+                    break
+                except httpx.TransportError:
+                    time.sleep(0.005)
+            ready = time.perf_counter() - start
+            http.post(
+                f"{APP_URL}/login", data={"username": "admin", "password": "admin123"}
+            ).raise_for_status()
+            logged_in = time.perf_counter() - start
+    finally:
+        worker.terminate()
+        worker.wait()
+    return ready, logged_in
+
+
+def main() -> None:
+    rows = []
+    for label, module in [
+        ("import src.app", "src.app"),
+        ("import chat stack", "candidate_solution.solution"),
+    ]:
+        samples = [import_seconds(module) * 1e3 for _ in range(RUNS)]
+        rows.append([label, statistics.median(samples), max(samples)])
+    spawns = [first_request_seconds() for _ in range(RUNS)]
+    for label, samples in [
+        ("first request", [ready * 1e3 for ready, _ in spawns]),
+        ("first login", [logged_in * 1e3 for _, logged_in in spawns]),
+    ]:
+        rows.append([label, statistics.median(samples), max(samples)])
+    print(f"\nCold start (ms), {RUNS} fresh processes each")
+    print_table(["step", "median", "max"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Throughput of the storage backends on read-heavy and write-heavy mixes.
+
+Every backend is loaded with the same users, catalog and orders and then
+runs the same seeded sequence of operations. Run with
+``python -m benchmarks.bench_storage``.
+"""
+
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List, Tuple
+
+from src.data import MOCK_PRODUCTS
+from src.schemas import OrderCreate
+from src.storage import MemoryBackend, SQLiteBackend, StorageBackend
+
+from .common import make_orders, make_user, print_table
+
+USERS = 1_000
+ORDERS = 20_000
+OPERATIONS = 5_000
+# Share of read operations in each mix
+MIXES = {"read_heavy": 0.9, "write_heavy": 0.3}
+
+
+def build_operations(
+    backend: StorageBackend, read_share: float, seed: int = 7
+) -> List[Callable[[], object]]:
+    rng = random.Random(seed)
+    product_ids = [product["id"] for product in MOCK_PRODUCTS]
+    reads = [
+        lambda: backend.get_order_by_id(rng.randint(1, ORDERS)),
+        lambda: backend.list_orders(user_id=rng.randint(1, USERS), limit=20),
+        lambda: backend.get_user_by_username(f"user{rng.randint(1, USERS)}"),
+        lambda: backend.get_product_by_id(rng.choice(product_ids)),
+    ]
+    writes = [
+        lambda: backend.create_order(
+            rng.randint(1, USERS),
+            OrderCreate(items=[{"id": rng.choice(product_ids), "quantity": 1}]),
+        ),
+        lambda: backend.update_order_status(rng.randint(1, ORDERS), "processing"),
+    ]
+    return [
+        rng.choice(reads) if rng.random() < read_share else rng.choice(writes)
+        for _ in range(OPERATIONS)
+    ]
+
+
+def run(backend: StorageBackend, read_share: float) -> Tuple[float, float]:
+    operations = build_operations(backend, read_share)
+    start = time.perf_counter()
+    for operation in operations:
+        operation()
+    elapsed = time.perf_counter() - start
+    return OPERATIONS / elapsed, elapsed / OPERATIONS * 1e6
+
+
+def main() -> None:
+    users = [make_user(user_id) for user_id in range(1, USERS + 1)]
+    product_ids = [product["id"] for product in MOCK_PRODUCTS]
+
+    with tempfile.TemporaryDirectory() as directory:
+        factories: Dict[str, Callable[[], StorageBackend]] = {
+            "memory": MemoryBackend,
+            "sqlite": lambda: SQLiteBackend(os.path.join(directory, "bench.db")),
+        }
+        rows = []
+        for name, factory in factories.items():
+            for mix, read_share in MIXES.items():
+                backend = factory()
+                backend.clear()
+                # The memory backend stores these dicts, so build fresh ones
+                orders = make_orders(ORDERS, product_ids, users=USERS)
+                backend.load(users=users, products=MOCK_PRODUCTS, orders=orders)
+                ops_per_second, mean_us = run(backend, read_share)
+                rows.append([name, mix, ops_per_second, mean_us])
+                backend.close()
+
+    print_table(["backend", "mix", "ops_per_s", "mean_us"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Username lookup cost as the number of users grows.
+
+Compares the indexed ``UserStore`` against the previous linear scan over
+``users_db.values()``. Run with ``python -m benchmarks.bench_user_lookup``.
+"""
+
+import random
+from typing import Optional
+
+from src.schemas import UserInDB
+from src.storage import MemoryBackend
+
+from .common import make_user, print_table, time_per_call
+
+SIZES = [1_000, 10_000, 100_000, 300_000]
+LOOKUPS = 1_000
+
+
+def linear_scan(users: list, username: str) -> Optional[UserInDB]:
+    for user in users:
+        if user["username"] == username:
+            return UserInDB(**user)
+    return None
+
+
+def main() -> None:
+    rng = random.Random(42)
+    rows = []
+    for size in SIZES:
+        backend = MemoryBackend()
+        raw = [make_user(user_id) for user_id in range(1, size + 1)]
+        backend.load(users=raw)
+        names = [f"user{rng.randint(1, size)}" for _ in range(LOOKUPS)]
+
+        lookups = iter(names * 1_000)
+        indexed = time_per_call(
+            lambda: backend.get_user_by_username(next(lookups)), LOOKUPS
+        )
+        scan_names = iter(names * 10)
+        scan = time_per_call(
+            lambda: linear_scan(raw, next(scan_names)), number=10, repeat=1
+        )
+        rows.append([size, indexed, scan, scan / indexed])
+
+    print_table(["users", "indexed_us", "linear_scan_us", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import gc
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from typing import Callable, Iterable, Iterator, List
+
+import uvicorn
+
+from src import database
+from src.models import OrderStatus
+from src.storage import MemoryBackend, SQLiteBackend, StorageBackend
+from src.synthetic import SyntheticData, write_fixture
+
+
+def make_user(user_id: int) -> dict:
+    return {
+        "id": user_id,
+        "email": f"user{user_id}@example.com",
+        "username": f"user{user_id}",
+        "hashed_password": "0" * 64 + ":" + "0" * 32,
+        "role": "user",
+    }
+
+
+def time_per_call(fn: Callable[[], object], number: int, repeat: int = 5) -> float:
+    """Return the best observed time per call of ``fn``, in microseconds."""
+    best = float("inf")
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return best / number * 1e6
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Return the ``q``-th percentile (0-100) of ``samples``."""
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(q) - 1]
+
+
+def serve(app, port: int) -> uvicorn.Server:
+    """Serve an ASGI app on a local port from a daemon thread."""
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def synthetic_fixture(users: int, products: int, orders: int, seed: int = 42) -> str:
+    """Path of a synthetic fixture of these sizes, written on first use."""
+    name = f"ecommerce-synthetic-{users}-{products}-{orders}-{seed}"
+    path = os.path.join(tempfile.gettempdir(), f"{name}.jsonl.gz")
+    if not os.path.exists(path):
+        # Renamed into place once complete, so readers never see a partial file
+        partial = os.path.join(tempfile.gettempdir(), f"{name}.{os.getpid()}.jsonl.gz")
+        write_fixture(partial, SyntheticData(users, products, orders, seed))
+        os.replace(partial, path)
+    return path
+
+
+@contextmanager
+def seeded_database(kind: str, fixture: str) -> Iterator[StorageBackend]:
+    """Point ``src.database`` at a fresh ``memory`` or ``sqlite`` backend
+    loaded from ``fixture``."""
+    with tempfile.TemporaryDirectory() as directory:
+        if kind == "memory":
+            backend: StorageBackend = MemoryBackend()
+        else:
+            backend = SQLiteBackend(os.path.join(directory, "bench.db"))
+        database.set_backend(backend).close()
+        database.init_db(fixture)
+        try:
+            yield backend
+        finally:
+            backend.close()
+
+
+def print_table(headers: List[str], rows: Iterable[Iterable[object]]) -> None:
+    rows = [[_format(cell) for cell in row] for row in rows]
+    widths = [
+        max(len(header), *(len(row[i]) for row in rows))
+        for i, header in enumerate(headers)
+    ]
+    print("  ".join(header.rjust(width) for header, width in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+
+def _format(cell: object) -> str:
+    if isinstance(cell, float):
+        return f"{cell:,.2f}"
+    if isinstance(cell, int):
+        return f"{cell:,}"
+    return str(cell)
+
+
+def make_orders(
+    count: int, product_ids: List[int], users: int = 1_000, seed: int = 42
+) -> List[dict]:
+    rng = random.Random(seed)
+    now = datetime.now(UTC)
+    orders = []
+    for order_id in range(1, count + 1):
+        items = [
+            {"id": product_id, "quantity": rng.randint(1, 3)}
+            for product_id in rng.sample(product_ids, rng.randint(1, 3))
+        ]
+        created_at = now - timedelta(minutes=order_id)
+        orders.append(
+            {
+                "id": order_id,
+                "user_id": rng.randint(1, users),
+                "items": items,
+                "total_price": 10.0,
+                "status": OrderStatus.PENDING,
+                "created_at": created_at,
+                "updated_at": None,
+                "delivery_date": created_at + timedelta(days=7),
+            }
+        )
+    return orders
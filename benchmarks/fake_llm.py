@@ -0,0 +1,153 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+Answers after a fixed latency, streaming tokens at a fixed interval when
+asked to, so chat latency can be measured without network access or an API
+key. When tools are offered, the first answer is a tool call if the last user
+message mentions "email" (``get_user_info``), and several concurrent tool
+calls if it mentions "order", as the real model would do.
+
+Run standalone with ``python -m benchmarks.fake_llm --port 8100`` and point
+the app at it with ``PROXY_URL=http://127.0.0.1:8100/v1 API_KEY=fake``.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+def create_app(
+    latency: float = 0.2, tokens: int = 20, token_interval: float = 0.01
+) -> FastAPI:
+    """Build the fake server.
+
+    - **latency**: Seconds before the first byte of an answer
+    - **tokens**: Number of content tokens in each answer
+    - **token_interval**: Seconds between streamed tokens
+    """
+    app = FastAPI(title="Fake LLM")
+
+    def completion(
+        completion_id: str, message: dict, finish_reason: Optional[str]
+    ) -> dict:
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "fake",
+            "choices": [
+                {"index": 0, "message": message, "finish_reason": finish_reason}
+            ],
+        }
+
+    def chunk(completion_id: str, delta: dict, finish_reason: Optional[str]) -> str:
+        body = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": "fake",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(body)}\n\n"
+
+    def tool_calls(body: dict) -> List[dict]:
+        """The calls the real model would likely make for the last question."""
+        user_messages = [m for m in body["messages"] if m.get("role") == "user"]
+        if not body.get("tools") or not user_messages:
+            return []
+        question = user_messages[-1].get("content") or ""
+        calls = []
+        if "email" in question:
+            # The app's system prompt ends with the user id
+            user_id = 1
+            for message in body["messages"]:
+                last_word = (message.get("content") or "").rsplit(" ", 1)[-1]
+                if message.get("role") == "system" and last_word.isdigit():
+                    user_id = int(last_word)
+            calls.append(("get_user_info", {"user_id": user_id}))
+        if "order" in question:
+            calls.append(("list_orders", {"limit": 3}))
+            calls.append(("get_order_status", {"order_ids": [1, 2, 3]}))
+            calls.append(("get_products", {"product_ids": [1, 2, 3]}))
+        return [
+            {
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(arguments)},
+            }
+            for name, arguments in calls
+        ]
+
+    def answer_tokens() -> List[str]:
+        return [f"token{i} " for i in range(tokens)]
+
+    async def stream(body: dict, completion_id: str):
+        await asyncio.sleep(latency)
+        yield chunk(completion_id, {"role": "assistant", "content": ""}, None)
+        calls = tool_calls(body)
+        if calls:
+            for index, call in enumerate(calls):
+                # Split each call over two chunks, as the real API does
+                arguments = call["function"]["arguments"]
+                call["function"]["arguments"] = ""
+                yield chunk(
+                    completion_id, {"tool_calls": [{"index": index, **call}]}, None
+                )
+                yield chunk(
+                    completion_id,
+                    {
+                        "tool_calls": [
+                            {"index": index, "function": {"arguments": arguments}}
+                        ]
+                    },
+                    None,
+                )
+            yield chunk(completion_id, {}, "tool_calls")
+        else:
+            for token in answer_tokens():
+                yield chunk(completion_id, {"content": token}, None)
+                await asyncio.sleep(token_interval)
+            yield chunk(completion_id, {}, "stop")
+        yield "data: [DONE]\n\n"
+
+    @app.post("/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        if body.get("stream"):
+            return StreamingResponse(
+                stream(body, completion_id), media_type="text/event-stream"
+            )
+        await asyncio.sleep(latency + token_interval * tokens)
+        calls = tool_calls(body)
+        if calls:
+            message = {"role": "assistant", "content": None, "tool_calls": calls}
+            return completion(completion_id, message, "tool_calls")
+        message = {"role": "assistant", "content": "".join(answer_tokens())}
+        return completion(completion_id, message, "stop")
+
+    return app
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-interval", type=float, default=0.01)
+    args = parser.parse_args()
+    app = create_app(args.latency, args.tokens, args.token_interval)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Mixed-traffic load test of the API, in-process.
+
+Drives ``src.app:app`` through httpx's ASGI transport, so no server or
+network is involved: each virtual user logs in as a synthetic user, then
+browses products, lists, places and cancels orders, and now and then logs in
+again, for a fixed duration. Reports throughput and latency percentiles per
+route. Run with ``python -m benchmarks.load_test``, or as part of
+``python -m benchmarks.suite``.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import httpx
+
+from src.synthetic import SYNTHETIC_PASSWORD
+
+from .common import percentile, seeded_database, synthetic_fixture
+
+USERS = 20_000
+PRODUCTS = 2_000
+ORDERS = 200_000
+CONCURRENCY = 32
+DURATION_SECONDS = 10.0
+# Share of each route in the traffic mix
+MIX = {
+    "POST /login": 2,
+    "GET /products": 35,
+    "GET /orders": 30,
+    "POST /orders": 20,
+    "POST /orders/{id}/cancel": 13,
+}
+
+
+class Recorder:
+    """Latency samples and error counts per route."""
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(
+        self, http: httpx.AsyncClient, route: str, method: str, url: str, **kwargs
+    ) -> httpx.Response:
+        start = time.perf_counter()
+        response = await http.request(method, url, **kwargs)
+        self.samples[route].append((time.perf_counter() - start) * 1e3)
+        if response.status_code >= 400:
+            self.errors[route] += 1
+        return response
+
+    def report(self, elapsed: float) -> Dict[str, dict]:
+        routes = {}
+        for route, samples in sorted(self.samples.items()):
+            routes[route] = {
+                "requests": len(samples),
+                "errors": self.errors[route],
+                "throughput_rps": len(samples) / elapsed,
+                "p50_ms": percentile(samples, 50),
+                "p95_ms": percentile(samples, 95),
+                "p99_ms": percentile(samples, 99),
+            }
+        return routes
+
+
+async def virtual_user(
+    http: httpx.AsyncClient,
+    recorder: Recorder,
+    rng: random.Random,
+    users: int,
+    products: int,
+    deadline: float,
+) -> None:
+    username = f"user{rng.randint(2, users)}"
+    placed: List[int] = []
+    headers: Dict[str, str] = {}
+    routes, weights = list(MIX), list(MIX.values())
+    route = "POST /login"
+    while time.perf_counter() < deadline:
+        if route == "POST /login" or not headers:
+            response = await recorder.request(
+                http,
+                "POST /login",
+                "POST",
+                "/login",
+                data={"username": username, "password": SYNTHETIC_PASSWORD},
+            )
+            if response.status_code == 200:
+                token = response.json()["access_token"]
+                headers = {"Authorization": f"Bearer {token}"}
+            else:
+                # Shed by the password hashing pool; back off as asked
+                await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+        elif route == "GET /products":
+            await recorder.request(
+                http,
+                route,
+                "GET",
+                "/products",
+                params={"limit": 20, "sort_by": rng.choice(["id", "price"])},
+                headers=headers,
+            )
+        elif route == "GET /orders":
+            await recorder.request(
+                http, route, "GET", "/orders", params={"limit": 20}, headers=headers
+            )
+        elif route == "POST /orders" or not placed:
+            # Cancels need an order of this user's to cancel
+            response = await recorder.request(
+                http,
+                "POST /orders",
+                "POST",
+                "/orders",
+                json={
+                    "items": [
+                        {"id": rng.randint(1, products), "quantity": rng.randint(1, 3)}
+                    ]
+                },
+                headers=headers,
+            )
+            if response.status_code == 200:
+                placed.append(response.json()["id"])
+        else:
+            await recorder.request(
+                http,
+                route,
+                "POST",
+                f"/orders/{placed.pop()}/cancel",
+                headers=headers,
+            )
+        route = rng.choices(routes, weights)[0]
+
+
+async def drive(
+    concurrency: int, duration: float, users: int, products: int, seed: int = 7
+) -> Dict[str, object]:
+    from src.app import app
+
+    recorder = Recorder()
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://loadtest", timeout=60
+        ) as http:
+            start = time.perf_counter()
+            deadline = start + duration
+            await asyncio.gather(
+                *(
+                    virtual_user(
+                        http,
+                        recorder,
+                        random.Random(seed * 1_000 + worker),
+                        users,
+                        products,
+                        deadline,
+                    )
+                    for worker in range(concurrency)
+                )
+            )
+            elapsed = time.perf_counter() - start
+    routes = recorder.report(elapsed)
+    requests = sum(route["requests"] for route in routes.values())
+    return {
+        "concurrency": concurrency,
+        "duration_seconds": elapsed,
+        "requests": requests,
+        "throughput_rps": requests / elapsed,
+        "routes": routes,
+    }
+
+
+def run(
+    kind: str = "memory",
+    users: int = USERS,
+    products: int = PRODUCTS,
+    orders: int = ORDERS,
+    seed: int = 42,
+    concurrency: int = CONCURRENCY,
+    duration: float = DURATION_SECONDS,
+) -> Dict[str, object]:
+    """Load ``kind`` storage with a synthetic fixture and drive the mix."""
+    fixture = synthetic_fixture(users, products, orders, seed)
+    with seeded_database(kind, fixture):
+        return asyncio.run(drive(concurrency, duration, users, products))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--users", type=int, default=USERS)
+    parser.add_argument("--products", type=int, default=PRODUCTS)
+    parser.add_argument("--orders", type=int, default=ORDERS)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--duration", type=float, default=DURATION_SECONDS)
+    args = parser.parse_args()
+    results = run(
+        args.backend,
+        args.users,
+        args.products,
+        args.orders,
+        concurrency=args.concurrency,
+        duration=args.duration,
+    )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
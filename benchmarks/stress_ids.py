@@ -0,0 +1,121 @@
+"""
+Stress test for order and product id allocation under concurrency.
+
+Fires concurrent creates from threads sharing one backend, from processes
+leasing ids from a shared sequence file, and from processes sharing one
+SQLite database, then checks that no id was handed out twice. Exits with a
+non-zero status on any collision. Run with ``python -m benchmarks.stress_ids``.
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from src.data import MOCK_ORDERS, MOCK_PRODUCTS, MOCK_USERS
+from src.schemas import OrderCreate, ProductCreate
+from src.storage import MemoryBackend, SQLiteBackend, StorageBackend
+
+THREADS = 16
+PROCESSES = 4
+CREATES_PER_WORKER = 500
+
+ORDER = OrderCreate(items=[{"id": 1, "quantity": 1}])
+PRODUCT = ProductCreate(name="Stress Product", description="Stress", price=1.0)
+
+
+def create_many(backend: StorageBackend, count: int) -> List[int]:
+    ids = []
+    for number in range(count):
+        ids.append(backend.create_order(2, ORDER).id)
+        if number % 10 == 0:
+            ids.append(-backend.create_product(PRODUCT).id)
+    return ids
+
+
+def create_with_threads(backend: StorageBackend) -> List[int]:
+    with ThreadPoolExecutor(THREADS) as executor:
+        batches = executor.map(
+            lambda _: create_many(backend, CREATES_PER_WORKER), range(THREADS)
+        )
+        return [created for batch in batches for created in batch]
+
+
+def memory_worker(sequence_path: str) -> List[int]:
+    backend = MemoryBackend(id_sequence_path=sequence_path)
+    backend.load(users=MOCK_USERS, products=MOCK_PRODUCTS, orders=MOCK_ORDERS)
+    try:
+        return create_with_threads(backend)
+    finally:
+        backend.close()
+
+
+def sqlite_worker(database_path: str) -> List[int]:
+    backend = SQLiteBackend(database_path)
+    try:
+        return create_with_threads(backend)
+    finally:
+        backend.close()
+
+
+def check(name: str, ids: List[int], started: float) -> bool:
+    orders = [created for created in ids if created > 0]
+    products = [-created for created in ids if created < 0]
+    duplicates = (len(orders) - len(set(orders))) + (len(products) - len(set(products)))
+    reused_seed = [created for created in orders if created <= len(MOCK_ORDERS)]
+    reused_seed += [created for created in products if created <= len(MOCK_PRODUCTS)]
+    elapsed = time.perf_counter() - started
+    print(
+        f"{name}: {len(orders):,} orders, {len(products):,} products in "
+        f"{elapsed:.2f}s, {duplicates} duplicate ids, "
+        f"{len(reused_seed)} seeded ids reused"
+    )
+    return duplicates == 0 and not reused_seed
+
+
+def main() -> int:
+    ok = True
+
+    started = time.perf_counter()
+    backend = MemoryBackend()
+    backend.load(users=MOCK_USERS, products=MOCK_PRODUCTS, orders=MOCK_ORDERS)
+    ids = create_with_threads(backend)
+    ok &= check("memory, threads", ids, started)
+    indexed = sum(len(order_ids) for order_ids in backend.orders_by_user.values())
+    if indexed != len(backend.orders_db):
+        print(f"  index mismatch: {indexed} indexed, {len(backend.orders_db)} stored")
+        ok = False
+
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as directory:
+        started = time.perf_counter()
+        sequence_path = os.path.join(directory, "ids.db")
+        with context.Pool(PROCESSES) as pool:
+            batches = pool.map(memory_worker, [sequence_path] * PROCESSES)
+        ok &= check(
+            "memory, processes sharing an id sequence",
+            [created for batch in batches for created in batch],
+            started,
+        )
+
+        started = time.perf_counter()
+        database_path = os.path.join(directory, "stress.db")
+        seed = SQLiteBackend(database_path)
+        seed.load(users=MOCK_USERS, products=MOCK_PRODUCTS, orders=MOCK_ORDERS)
+        seed.close()
+        with context.Pool(PROCESSES) as pool:
+            batches = pool.map(sqlite_worker, [database_path] * PROCESSES)
+        ok &= check(
+            "sqlite, processes sharing a database",
+            [created for batch in batches for created in batch],
+            started,
+        )
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Benchmark suite: ``src.database`` microbenchmarks and the in-process load test.
+
+Both run against the same synthetic fixture, and the results are written as
+JSON together with the commit they were measured on, so runs can be
+compared between commits:
+
+    python -m benchmarks.suite --output base.json
+    git checkout my-branch
+    python -m benchmarks.suite --output head.json --compare base.json
+
+``--compare`` prints the change of every metric against an earlier run.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import UTC, datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+from . import bench_database, load_test
+from .common import print_table
+
+# Metrics where a higher value is better; for the others lower is better
+HIGHER_IS_BETTER = ("calls_per_second", "throughput_rps")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _metrics(results: dict) -> Iterator[Tuple[str, float]]:
+    for name, result in results.get("database", {}).items():
+        yield f"database {name} us_per_call", result["us_per_call"]
+    load = results.get("load", {})
+    if load:
+        yield "load throughput_rps", load["throughput_rps"]
+    for route, result in load.get("routes", {}).items():
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            yield f"load {route} {metric}", result[metric]
+
+
+def compare(baseline: dict, results: dict) -> None:
+    before: Dict[str, float] = dict(_metrics(baseline))
+    rows = []
+    for name, value in _metrics(results):
+        if name not in before or not before[name]:
+            continue
+        change = (value - before[name]) / before[name] * 100
+        better = change > 0 if name.endswith(HIGHER_IS_BETTER) else change < 0
+        rows.append(
+            [name, before[name], value, f"{change:+.1f}%", "" if better else "worse"]
+        )
+    before_commit = baseline["meta"].get("commit")
+    after_commit = results["meta"].get("commit")
+    print(f"\nChange from {before_commit} to {after_commit}")
+    print_table(["metric", "before", "after", "change", ""], rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--users", type=int, default=bench_database.USERS)
+    parser.add_argument("--products", type=int, default=bench_database.PRODUCTS)
+    parser.add_argument("--orders", type=int, default=bench_database.ORDERS)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=load_test.CONCURRENCY)
+    parser.add_argument("--duration", type=float, default=load_test.DURATION_SECONDS)
+    parser.add_argument("--skip", choices=["database", "load"], action="append")
+    parser.add_argument("--output", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results of an earlier run to compare with")
+    args = parser.parse_args()
+    skip = args.skip or []
+    sizes = {"users": args.users, "products": args.products, "orders": args.orders}
+
+    results: dict = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(UTC).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "backend": args.backend,
+            "seed": args.seed,
+            **sizes,
+        }
+    }
+    if "database" not in skip:
+        results["database"] = bench_database.run(args.backend, seed=args.seed, **sizes)
+    if "load" not in skip:
+        results["load"] = load_test.run(
+            args.backend,
+            seed=args.seed,
+            concurrency=args.concurrency,
+            duration=args.duration,
+            **sizes,
+        )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+# Caching is opt-in: it is enabled by giving entries a lifetime
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", "0"))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "10000"))
+CHAT_CACHE_MAX_BYTES = int(os.getenv("CHAT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _Entry:
+    __slots__ = ("value", "size", "cost", "expires_at", "tags")
+
+    def __init__(
+        self,
+        value: Any,
+        size: int,
+        cost: float,
+        expires_at: float,
+        tags: Tuple[Hashable, ...],
+    ) -> None:
+        self.value = value
+        self.size = size
+        self.cost = cost
+        self.expires_at = expires_at
+        self.tags = tags
+
+
+class ResponseCache:
+    """LRU cache of JSON-ready values, bounded in entries, bytes and age.
+
+    Each entry remembers how long it took to produce, so that hits can be
+    reported as time saved, and may carry tags so that every entry derived
+    from a record can be dropped when the record changes. A ``ttl`` of zero
+    disables the cache.
+    """
+
+    def __init__(
+        self,
+        ttl: float = CHAT_CACHE_TTL_SECONDS,
+        max_entries: int = CHAT_CACHE_MAX_ENTRIES,
+        max_bytes: int = CHAT_CACHE_MAX_BYTES,
+    ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._keys_by_tag: Dict[Hashable, Set[str]] = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                self._discard(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.saved_seconds += entry.cost
+        return entry.value
+
+    def put(
+        self, key: str, value: Any, cost: float, tags: Iterable[Hashable] = ()
+    ) -> None:
+        """Store ``value``, which took ``cost`` seconds to produce."""
+        size = len(key) + len(json.dumps(value, default=str))
+        if not self.enabled or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._discard(key)
+        while self._entries and (
+            len(self._entries) >= self.max_entries or self.size + size > self.max_bytes
+        ):
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+        tags = tuple(tags)
+        self._entries[key] = _Entry(
+            value, size, cost, time.monotonic() + self.ttl, tags
+        )
+        self.size += size
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+
+    def invalidate(self, tag: Hashable) -> None:
+        """Drop every entry stored with ``tag``."""
+        for key in self._keys_by_tag.pop(tag, ()):
+            if key in self._entries:
+                self._discard(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_tag.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+        for tag in entry.tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+
+def _normalize_text(text: Optional[str]) -> Optional[str]:
+    if text is None:
+        return None
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def completion_key(model: str, messages: List, tools: Optional[List[dict]]) -> str:
+    """Key a completion on what determines its answer.
+
+    Whitespace and case in messages are normalized, and tool call ids, which
+    are random, are left out, so repeated questions and tool results match.
+    """
+    normalized = []
+    for message in messages:
+        tool_calls = [
+            (call.function.name, call.function.arguments)
+            for call in message.tool_calls or ()
+        ]
+        normalized.append((message.role, _normalize_text(message.content), tool_calls))
+    raw = json.dumps([model, tools, normalized], sort_keys=True)
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+# Completions of the model, and results of the agent's tools
+completion_cache = ResponseCache()
+tool_cache = ResponseCache()
@@ -1,109 +1,120 @@
-from typing import List, Dict, Any
-from openai import OpenAI
+import asyncio
 import os
-from src.schemas import ChatMessage
-import requests
-from dotenv import load_dotenv
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletionMessage
 
-def get_jwt_token(username: str, password: str):
-    response = requests.post(
-        f"http://localhost:8000/login",
-        data={"username": username, "password": password},
-    )
-    response.raise_for_status()
-    return response.json()["access_token"]
+from candidate_solution.cache import completion_cache, completion_key
+from candidate_solution.tools import create_tool_backend, registry
+from src.metrics import llm_duration
+from src.schemas import ChatMessage
 
+MODEL = "gpt-4o-mini"
 
-def get_user_by_id(user_id: int, jwt_token: str):
-    response = requests.get(
-        f"http://localhost:8000/user/{user_id}",
-        headers={"Authorization": f"Bearer {jwt_token}"},
-    )
-    return response.json()
+# Created on first use, so that environment variables loaded after import
+# (e.g. from .env) are honoured, and then shared so connections are pooled.
+_client: Optional[AsyncOpenAI] = None
 
 
-def get_user_info(user_id: int) -> Dict[str, Any]:
-    # For demonstration, we'll use a hardcoded token. In production, you should handle authentication properly
-    jwt_token = get_jwt_token("admin", "admin123")
-    user_data = get_user_by_id(user_id, jwt_token)
-    return {"username": user_data["username"], "email": user_data["email"]}
+def get_client() -> AsyncOpenAI:
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=os.getenv("API_KEY"),
+            base_url=os.getenv("PROXY_URL"),
+        )
+    return _client
 
 
-def generate_answer(user_id: int, messages: List[ChatMessage]) -> List[ChatMessage]:
-    if messages[0].role != "system":
+def with_system_prompt(user_id: int, messages: List[ChatMessage]) -> List[ChatMessage]:
+    if not messages or messages[0].role != "system":
         messages.insert(
             0,
             ChatMessage(
                 role="system",
-                content=f"You are a helpful customer support agent of an e-commerce website. You have access to user information through the get_user_info tool. The user_id is {user_id}",
+                content=f"You are a helpful customer support agent of an e-commerce website. You have access to the user's information, their orders and the product catalog through tools. The user_id is {user_id}",
             ),
         )
+    return messages
+
 
-    tools = [
-        {
-            "type": "function",
-            "function": {
-                "name": "get_user_info",
-                "description": "Get the username and email of the current user",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "user_id": {
-                            "type": "integer",
-                            "description": "The ID of the user",
-                        }
+async def add_tool_results(
+    user_id: int, messages: List[ChatMessage], tool_calls: List
+) -> None:
+    """Run the tool calls of a turn concurrently and append their results."""
+    messages.append(
+        ChatMessage(
+            role="assistant",
+            tool_calls=[
+                {
+                    "id": tool_call.id,
+                    "type": tool_call.type,
+                    "function": {
+                        "name": tool_call.function.name,
+                        "arguments": tool_call.function.arguments,
                     },
-                    "required": ["user_id"],
-                },
-            },
-        }
-    ]
-
-    client = OpenAI(
-        api_key=os.getenv("API_KEY"),
-        base_url=os.getenv("PROXY_URL"),
+                }
+                for tool_call in tool_calls
+            ],
+        )
     )
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini", messages=messages, tools=tools, tool_choice="auto"
+    results = await registry.call_many(
+        [(call.function.name, call.function.arguments) for call in tool_calls],
+        user_id,
     )
+    for tool_call, content in zip(tool_calls, results):
+        messages.append(
+            ChatMessage(
+                role="tool",
+                content=content,
+                tool_call_id=tool_call.id,
+                name=tool_call.function.name,
+            )
+        )
+
+
+def _cache_key(kwargs: dict) -> Optional[str]:
+    if not completion_cache.enabled:
+        return None
+    return completion_key(kwargs["model"], kwargs["messages"], kwargs.get("tools"))
 
-    assistant_message = response.choices[0].message
+
+async def _create_completion(**kwargs) -> ChatCompletionMessage:
+    """Return the assistant message, from completion_cache when enabled."""
+    key = _cache_key(kwargs)
+    if key is not None:
+        cached = completion_cache.get(key)
+        if cached is not None:
+            return ChatCompletionMessage.model_validate(cached)
+    start = time.perf_counter()
+    response = await get_client().chat.completions.create(**kwargs)
+    message = response.choices[0].message
+    elapsed = time.perf_counter() - start
+    llm_duration.observe(elapsed, "completion")
+    if key is not None:
+        completion_cache.put(
+            key, message.model_dump(mode="json", exclude_none=True), elapsed
+        )
+    return message
+
+
+async def generate_answer(
+    user_id: int, messages: List[ChatMessage]
+) -> List[ChatMessage]:
+    messages = with_system_prompt(user_id, messages)
+
+    assistant_message = await _create_completion(
+        model=MODEL, messages=messages, tools=registry.specs, tool_choice="auto"
+    )
 
     if assistant_message.tool_calls:
-        for tool_call in assistant_message.tool_calls:
-            messages.append(
-                ChatMessage(
-                    role="assistant",
-                    tool_calls=[
-                        {
-                            "id": tool_call.id,
-                            "type": tool_call.type,
-                            "function": {
-                                "name": tool_call.function.name,
-                                "arguments": tool_call.function.arguments,
-                            },
-                        }
-                    ],
-                )
-            )
-            if tool_call.function.name == "get_user_info":
-                user_info = get_user_info(user_id)
-                messages.append(
-                    ChatMessage(
-                        role="tool",
-                        content=str(user_info),
-                        tool_call_id=tool_call.id,
-                        name=tool_call.function.name,
-                    )
-                )
+        await add_tool_results(user_id, messages, assistant_message.tool_calls)
 
         # Make a second call to process the tool response
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", messages=messages
-        )
-        assistant_message = response.choices[0].message
+        assistant_message = await _create_completion(model=MODEL, messages=messages)
 
     messages.append(
         ChatMessage(
@@ -114,8 +125,111 @@ def generate_answer(user_id: int, messages: List[ChatMessage]) -> List[ChatMessa
     return messages
 
 
-if __name__ == "__main__":
-    load_dotenv()
+class _StreamedToolCall:
+    """Tool call assembled from the fragments of a streamed completion."""
+
+    def __init__(self) -> None:
+        self.id = ""
+        self.type = "function"
+        self.function = _StreamedFunction()
+
+
+class _StreamedFunction:
+    def __init__(self) -> None:
+        self.name = ""
+        self.arguments = ""
+
+
+async def _stream_completion(
+    **kwargs,
+) -> AsyncIterator[Tuple[Optional[str], List[_StreamedToolCall]]]:
+    """Yield ``(token, [])`` per content token, then ``(None, tool_calls)``.
+
+    A completion answered from completion_cache is yielded as one token.
+    """
+    key = _cache_key(kwargs)
+    if key is not None:
+        cached = completion_cache.get(key)
+        if cached is not None:
+            message = ChatCompletionMessage.model_validate(cached)
+            if message.content:
+                yield message.content, []
+            yield None, list(message.tool_calls or ())
+            return
+
+    start = time.perf_counter()
+    content: List[str] = []
+    tool_calls: Dict[int, _StreamedToolCall] = {}
+    stream = await get_client().chat.completions.create(stream=True, **kwargs)
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+        if delta.content:
+            content.append(delta.content)
+            yield delta.content, []
+        for fragment in delta.tool_calls or ():
+            tool_call = tool_calls.setdefault(fragment.index, _StreamedToolCall())
+            if fragment.id:
+                tool_call.id = fragment.id
+            if fragment.function and fragment.function.name:
+                tool_call.function.name += fragment.function.name
+            if fragment.function and fragment.function.arguments:
+                tool_call.function.arguments += fragment.function.arguments
+    calls = [tool_calls[index] for index in sorted(tool_calls)]
+    elapsed = time.perf_counter() - start
+    llm_duration.observe(elapsed, "stream")
+    if key is not None:
+        message = {"role": "assistant", "content": "".join(content) or None}
+        if calls:
+            message["tool_calls"] = [
+                {
+                    "id": call.id,
+                    "type": call.type,
+                    "function": {
+                        "name": call.function.name,
+                        "arguments": call.function.arguments,
+                    },
+                }
+                for call in calls
+            ]
+        completion_cache.put(key, message, elapsed)
+    yield None, calls
+
+
+async def stream_answer(
+    user_id: int, messages: List[ChatMessage]
+) -> AsyncIterator[Tuple[str, Any]]:
+    """Stream the answer as ``("token", text)`` events as they arrive.
+
+    Tool calls requested by the model are run between the two completions.
+    The last event is ``("done", messages)`` with the full conversation.
+    """
+    messages = with_system_prompt(user_id, messages)
+    content: List[str] = []
+
+    tool_calls: List[_StreamedToolCall] = []
+    async for token, calls in _stream_completion(
+        model=MODEL, messages=messages, tools=registry.specs, tool_choice="auto"
+    ):
+        if token:
+            content.append(token)
+            yield "token", token
+        tool_calls = calls or tool_calls
+
+    if tool_calls:
+        await add_tool_results(user_id, messages, tool_calls)
+        content = []
+        async for token, _ in _stream_completion(model=MODEL, messages=messages):
+            if token:
+                content.append(token)
+                yield "token", token
+
+    messages.append(ChatMessage(role="assistant", content="".join(content)))
+    yield "done", messages
+
+
+async def _main() -> None:
     user_id = None
     messages = []
     while True:
@@ -126,5 +240,17 @@ if __name__ == "__main__":
             print("Quitting...")
             break
         messages.append(ChatMessage(role="user", content=message))
-        messages = generate_answer(user_id, messages)
-        print("Assistant: ", messages[-1].content)
+        print("Assistant: ", end="", flush=True)
+        async for event, data in stream_answer(user_id, messages):
+            if event == "token":
+                print(data, end="", flush=True)
+            else:
+                messages = data
+        print()
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    # The CLI runs apart from the server, so tools go through its API
+    registry.backend = create_tool_backend("http")
+    asyncio.run(_main())
@@ -0,0 +1,598 @@
+import asyncio
+import inspect
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import httpx
+
+from candidate_solution.cache import tool_cache
+from src import database
+from src.metrics import chat_tool_duration
+from src.models import OrderStatus
+
+# "local" reads the database in-process; "http" calls the API at API_BASE_URL,
+# for when the agent runs apart from the server
+TOOL_BACKEND = os.getenv("TOOL_BACKEND", "local")
+API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+TOOL_API_USERNAME = os.getenv("TOOL_API_USERNAME", "admin")
+TOOL_API_PASSWORD = os.getenv("TOOL_API_PASSWORD", "admin123")
+
+
+class ToolError(Exception):
+    """Raised by a tool to report a failure back to the model."""
+
+
+class LocalToolBackend:
+    """Reads straight from ``src.database``, in the server process.
+
+    Records are returned as JSON-ready dicts shaped like the API responses.
+    Database calls block, on SQLite for I/O, so each lookup runs in a worker
+    thread and concurrent tool calls do not hold up the event loop or each
+    other.
+    """
+
+    async def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        user = await asyncio.to_thread(database.get_user_by_id, user_id)
+        if user is None:
+            return None
+        return {"username": user.username, "email": user.email}
+
+    async def list_orders(
+        self, user_id: int, status: Optional[str], limit: int
+    ) -> List[Dict[str, Any]]:
+        def list_page() -> List[Dict[str, Any]]:
+            orders, _ = database.list_orders(
+                user_id=user_id, status=status, limit=limit
+            )
+            return [order.model_dump(mode="json") for order in orders]
+
+        return await asyncio.to_thread(list_page)
+
+    async def get_orders_by_ids(self, order_ids: List[int]) -> Dict[int, Any]:
+        def get_orders() -> Dict[int, Any]:
+            orders = database.get_orders_by_ids(order_ids)
+            return {
+                order_id: order.model_dump(mode="json")
+                for order_id, order in orders.items()
+            }
+
+        return await asyncio.to_thread(get_orders)
+
+    async def get_products_by_ids(self, product_ids: List[int]) -> Dict[int, Any]:
+        def get_products() -> Dict[int, Any]:
+            products = database.get_products_by_ids(product_ids)
+            return {
+                product_id: product.model_dump()
+                for product_id, product in products.items()
+            }
+
+        return await asyncio.to_thread(get_products)
+
+    async def search_products(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        def search() -> List[Dict[str, Any]]:
+            return [
+                product.model_dump()
+                for product, _ in database.search_products(query, limit=limit)
+            ]
+
+        return await asyncio.to_thread(search)
+
+    async def catalog_version(self) -> Optional[int]:
+        return await asyncio.to_thread(database.get_catalog_version)
+
+    async def close(self) -> None:
+        pass
+
+
+class HttpToolBackend:
+    """Calls the API over a pooled connection, logging in only when needed.
+
+    The access token is reused until the API rejects it.
+    """
+
+    def __init__(self, base_url: str, username: str, password: str) -> None:
+        self.base_url = base_url
+        self._credentials = {"username": username, "password": password}
+        self._http: Optional[httpx.AsyncClient] = None
+        self._token: Optional[str] = None
+        self._login_lock = asyncio.Lock()
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(base_url=self.base_url)
+        return self._http
+
+    async def _get_token(self, rejected: Optional[str] = None) -> str:
+        async with self._login_lock:
+            # Another caller may have logged in while this one waited
+            if self._token is None or self._token == rejected:
+                response = await self._client().post("/login", data=self._credentials)
+                response.raise_for_status()
+                self._token = response.json()["access_token"]
+            return self._token
+
+    async def _get(self, path: str, params: Optional[dict] = None) -> httpx.Response:
+        token = await self._get_token()
+        response = await self._client().get(
+            path, params=params, headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code == 401:
+            token = await self._get_token(rejected=token)
+            response = await self._client().get(
+                path, params=params, headers={"Authorization": f"Bearer {token}"}
+            )
+        return response
+
+    async def get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        response = await self._get(f"/user/{user_id}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        user_data = response.json()
+        return {"username": user_data["username"], "email": user_data["email"]}
+
+    async def list_orders(
+        self, user_id: int, status: Optional[str], limit: int
+    ) -> List[Dict[str, Any]]:
+        params = {"user_id": user_id, "limit": limit}
+        if status is not None:
+            params["status"] = status
+        response = await self._get("/orders", params)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_orders_by_ids(self, order_ids: List[int]) -> Dict[int, Any]:
+        # The API has no batch endpoint, so fetch the orders concurrently
+        responses = await asyncio.gather(
+            *(self._get(f"/orders/{order_id}") for order_id in order_ids)
+        )
+        orders = {}
+        for order_id, response in zip(order_ids, responses):
+            if response.status_code == 404:
+                continue
+            response.raise_for_status()
+            orders[order_id] = response.json()
+        return orders
+
+    async def get_products_by_ids(self, product_ids: List[int]) -> Dict[int, Any]:
+        wanted = set(product_ids)
+        return {
+            product["id"]: product
+            for product in await self.get_all_products()
+            if product["id"] in wanted
+        }
+
+    async def search_products(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        response = await self._get("/products/search", {"q": query, "limit": limit})
+        response.raise_for_status()
+        return [
+            {key: value for key, value in product.items() if key != "score"}
+            for product in response.json()
+        ]
+
+    async def get_all_products(self) -> List[Dict[str, Any]]:
+        products, params = [], {"limit": 1000}
+        while True:
+            response = await self._get("/products", params)
+            response.raise_for_status()
+            products.extend(response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                return products
+            params = {"limit": 1000, "cursor": cursor}
+
+    async def catalog_version(self) -> Optional[int]:
+        # Not visible from here; cached product data ages out with the TTL
+        return None
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+def create_tool_backend(name: str) -> LocalToolBackend | HttpToolBackend:
+    if name == "local":
+        return LocalToolBackend()
+    if name == "http":
+        return HttpToolBackend(API_BASE_URL, TOOL_API_USERNAME, TOOL_API_PASSWORD)
+    raise ValueError(f"Unknown tool backend: {name}")
+
+
+class BatchLoader:
+    """Coalesces the keys requested by concurrent tool calls into one lookup.
+
+    Keys requested before the event loop gets back to its queue of ready
+    callbacks are fetched together, and each key is fetched once per turn.
+    """
+
+    def __init__(self, fetch: Callable[[List[int]], Awaitable[Dict[int, Any]]]):
+        self._fetch = fetch
+        self._futures: Dict[int, asyncio.Future] = {}
+        self._queued: List[int] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+
+    async def load_many(self, keys: Iterable[int]) -> Dict[int, Any]:
+        """Return the found records by key; unknown keys are left out."""
+        loop = asyncio.get_running_loop()
+        keys = list(dict.fromkeys(keys))
+        for key in keys:
+            if key in self._futures:
+                continue
+            self._futures[key] = loop.create_future()
+            if not self._queued:
+                loop.call_soon(self._dispatch)
+            self._queued.append(key)
+        values = await asyncio.gather(*(self._futures[key] for key in keys))
+        return {key: value for key, value in zip(keys, values) if value is not None}
+
+    def _dispatch(self) -> None:
+        keys, self._queued = self._queued, []
+        self.batches += 1
+        task = asyncio.ensure_future(self._resolve(keys))
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, keys: List[int]) -> None:
+        try:
+            found = await self._fetch(keys)
+        except Exception as exc:
+            for key in keys:
+                self._futures[key].set_exception(exc)
+            return
+        for key in keys:
+            self._futures[key].set_result(found.get(key))
+
+
+class ToolContext:
+    """What the tool calls of one turn share: the user and batched lookups."""
+
+    def __init__(
+        self, backend: LocalToolBackend | HttpToolBackend, user_id: int
+    ) -> None:
+        self.backend = backend
+        self.user_id = user_id
+        self.orders = BatchLoader(backend.get_orders_by_ids)
+        self.products = BatchLoader(backend.get_products_by_ids)
+
+
+ToolFunction = Callable[..., Awaitable[Any]]
+
+_JSON_TYPES = {
+    "integer": int,
+    "number": (int, float),
+    "string": str,
+    "boolean": bool,
+    "array": list,
+    "object": dict,
+}
+
+
+def _schema_error(value: Any, schema: dict, path: str) -> Optional[str]:
+    """Describe how ``value`` does not match a tool parameter schema, if it
+    does not. Covers the types, array items and enums that tools use."""
+    expected = schema.get("type")
+    if expected is not None:
+        # JSON true and false are not numbers, though bool subclasses int
+        if not isinstance(value, _JSON_TYPES[expected]) or (
+            isinstance(value, bool) and expected != "boolean"
+        ):
+            return f"{path} must be of type {expected}"
+    if "enum" in schema and value not in schema["enum"]:
+        return f"{path} must be one of {', '.join(map(str, schema['enum']))}"
+    if expected == "array" and "items" in schema:
+        for index, item in enumerate(value):
+            error = _schema_error(item, schema["items"], f"{path}[{index}]")
+            if error is not None:
+                return error
+    return None
+
+
+def validate_arguments(parameters: dict, arguments: Dict[str, Any]) -> Optional[str]:
+    """Check the model's arguments against a tool's parameters schema.
+
+    Optional parameters may be null, as the tools treat null as not given;
+    missing and unknown parameters are left to binding the tool's signature.
+    """
+    required = parameters.get("required", ())
+    for name, value in arguments.items():
+        schema = parameters.get("properties", {}).get(name)
+        if schema is None or (value is None and name not in required):
+            continue
+        error = _schema_error(value, schema, name)
+        if error is not None:
+            return error
+    return None
+
+
+class ToolRegistry:
+    """Tools offered to the model, run on behalf of the chatting user.
+
+    Each tool receives the turn's ToolContext followed by the model's
+    arguments, and must only expose data that the context's user may see.
+    """
+
+    def __init__(self, backend: LocalToolBackend | HttpToolBackend) -> None:
+        self.backend = backend
+        self._specs: List[dict] = []
+        self._functions: Dict[str, ToolFunction] = {}
+        self._parameters: Dict[str, dict] = {}
+        self._depends_on: Dict[str, Tuple[str, ...]] = {}
+
+    @property
+    def specs(self) -> List[dict]:
+        """Tool definitions in the format of the chat completions API."""
+        return self._specs
+
+    def register(
+        self,
+        name: str,
+        description: str,
+        parameters: dict,
+        depends_on: Optional[Tuple[str, ...]] = None,
+    ) -> Callable[[ToolFunction], ToolFunction]:
+        """Register a tool function under ``name``.
+
+        ``depends_on`` lists the records the result is derived from, out of
+        "user", "orders" and "products"; tools that declare it have their
+        results cached in ``tool_cache`` until one of those records changes.
+        """
+
+        def decorator(function: ToolFunction) -> ToolFunction:
+            self._specs.append(
+                {
+                    "type": "function",
+                    "function": {
+                        "name": name,
+                        "description": description,
+                        "parameters": parameters,
+                    },
+                }
+            )
+            self._functions[name] = function
+            self._parameters[name] = parameters
+            if depends_on is not None:
+                self._depends_on[name] = depends_on
+            return function
+
+        return decorator
+
+    async def call(self, name: str, arguments: str, context: ToolContext) -> str:
+        """Run a tool and return its result, or the error, as message content."""
+        function = self._functions.get(name)
+        if function is None:
+            return f"Unknown tool: {name}"
+        try:
+            kwargs = json.loads(arguments or "{}")
+            inspect.signature(function).bind(context, **kwargs)
+        except (json.JSONDecodeError, TypeError):
+            return f"Invalid arguments for {name}"
+        # Checked before running the tool, so that a value of the wrong type
+        # is reported to the model rather than failing the whole turn
+        error = validate_arguments(self._parameters[name], kwargs)
+        if error is not None:
+            return f"Invalid arguments for {name}: {error}"
+        depends_on = self._depends_on.get(name)
+        key = None
+        if depends_on is not None and tool_cache.enabled:
+            catalog_version = (
+                await self.backend.catalog_version()
+                if "products" in depends_on
+                else None
+            )
+            key = json.dumps(
+                [name, context.user_id, catalog_version, kwargs], sort_keys=True
+            )
+            cached = tool_cache.get(key)
+            if cached is not None:
+                return cached
+        start = time.perf_counter()
+        try:
+            result = await function(context, **kwargs)
+        except ToolError as exc:
+            chat_tool_duration.observe(time.perf_counter() - start, name, "error")
+            return str(exc)
+        elapsed = time.perf_counter() - start
+        chat_tool_duration.observe(elapsed, name, "ok")
+        content = json.dumps(result, default=str)
+        if key is not None:
+            tool_cache.put(
+                key,
+                content,
+                elapsed,
+                tags=[
+                    (kind, context.user_id)
+                    for kind in depends_on
+                    if kind in ("user", "orders")
+                ],
+            )
+        return content
+
+    async def call_many(self, calls: List[Tuple[str, str]], user_id: int) -> List[str]:
+        """Run one turn's ``(name, arguments)`` calls concurrently.
+
+        The calls share a ToolContext, so their lookups are batched.
+        """
+        context = ToolContext(self.backend, user_id)
+        return await asyncio.gather(
+            *(self.call(name, arguments, context) for name, arguments in calls)
+        )
+
+
+registry = ToolRegistry(create_tool_backend(TOOL_BACKEND))
+
+
+def _invalidate_user(user_id: int) -> None:
+    tool_cache.invalidate(("user", user_id))
+    tool_cache.invalidate(("orders", user_id))
+
+
+# Only changes made through this process are seen; with the http backend or
+# several workers, the cache TTL bounds how stale a result can be
+database.add_user_listener(_invalidate_user)
+database.add_order_listener(
+    lambda order_id, user_id: tool_cache.invalidate(("orders", user_id))
+)
+
+
+@registry.register(
+    "get_user_info",
+    "Get the username and email of the current user",
+    {
+        "type": "object",
+        "properties": {
+            "user_id": {
+                "type": "integer",
+                "description": "The ID of the user",
+            }
+        },
+        "required": ["user_id"],
+    },
+    depends_on=("user",),
+)
+async def get_user_info(
+    context: ToolContext, user_id: Optional[int] = None
+) -> Dict[str, Any]:
+    if user_id is not None and user_id != context.user_id:
+        raise ToolError("Not authorized to access this user's information")
+    user = await context.backend.get_user(context.user_id)
+    if user is None:
+        raise ToolError("User not found")
+    return user
+
+
+MAX_LISTED_ORDERS = 20
+MAX_FOUND_PRODUCTS = 10
+
+
+def _order_summary(order: Dict[str, Any]) -> Dict[str, Any]:
+    names = {
+        product["id"]: product["name"]
+        for product in order.get("products") or ()
+        if product
+    }
+    return {
+        "order_id": order["id"],
+        "status": order["status"],
+        "created_at": order["created_at"],
+        "delivery_date": order.get("delivery_date"),
+        "total_price": order["total_price"],
+        "items": [
+            {
+                "product_id": item["id"],
+                "name": names.get(item["id"]),
+                "quantity": item["quantity"],
+            }
+            for item in order["items"]
+        ],
+    }
+
+
+@registry.register(
+    "list_orders",
+    "List the current user's most recent orders, newest first",
+    {
+        "type": "object",
+        "properties": {
+            "limit": {
+                "type": "integer",
+                "description": (
+                    f"Number of orders to return, at most {MAX_LISTED_ORDERS}"
+                ),
+            },
+            "status": {
+                "type": "string",
+                "enum": [status.value for status in OrderStatus],
+                "description": "Only return orders in this status",
+            },
+        },
+    },
+    depends_on=("orders", "products"),
+)
+async def list_orders(
+    context: ToolContext, limit: int = 3, status: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    if status is not None and status not in OrderStatus._value2member_map_:
+        raise ToolError(f"Unknown order status: {status}")
+    limit = min(max(limit, 1), MAX_LISTED_ORDERS)
+    orders = await context.backend.list_orders(context.user_id, status, limit)
+    return [_order_summary(order) for order in orders]
+
+
+@registry.register(
+    "get_order_status",
+    "Get the status and delivery date of some of the current user's orders",
+    {
+        "type": "object",
+        "properties": {
+            "order_ids": {
+                "type": "array",
+                "items": {"type": "integer"},
+                "description": "The IDs of the orders",
+            }
+        },
+        "required": ["order_ids"],
+    },
+    depends_on=("orders",),
+)
+async def get_order_status(
+    context: ToolContext, order_ids: List[int]
+) -> List[Dict[str, Any]]:
+    orders = await context.orders.load_many(order_ids)
+    statuses = []
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        # Orders of other users are reported like unknown ones
+        if order is None or order["user_id"] != context.user_id:
+            statuses.append({"order_id": order_id, "error": "Order not found"})
+        else:
+            statuses.append(
+                {
+                    "order_id": order_id,
+                    "status": order["status"],
+                    "delivery_date": order.get("delivery_date"),
+                }
+            )
+    return statuses
+
+
+@registry.register(
+    "get_products",
+    "Look up products by ID, or search the catalog by name",
+    {
+        "type": "object",
+        "properties": {
+            "product_ids": {
+                "type": "array",
+                "items": {"type": "integer"},
+                "description": "The IDs of the products",
+            },
+            "name": {
+                "type": "string",
+                "description": (
+                    "Words to look for in product names and descriptions; "
+                    "each matches as a prefix, and all must match"
+                ),
+            },
+        },
+    },
+    depends_on=("products",),
+)
+async def get_products(
+    context: ToolContext,
+    product_ids: Optional[List[int]] = None,
+    name: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    if product_ids:
+        products = await context.products.load_many(product_ids)
+        return [
+            products[product_id] for product_id in product_ids if product_id in products
+        ]
+    if name:
+        # Ranked by the product search index rather than a catalog scan
+        return await context.backend.search_products(name, MAX_FOUND_PRODUCTS)
+    raise ToolError("Give product_ids or a name to look for")
@@ -1,50 +1,117 @@
+import heapq
+import json
 from contextlib import asynccontextmanager
-from datetime import timedelta
-from typing import List
+from datetime import UTC, date, datetime, timedelta
+from typing import Callable, List, Literal, Optional
 
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, Header, HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
+from pydantic import TypeAdapter, ValidationError
 
 from .auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
     create_access_token,
     get_current_active_user,
     get_user_by_username,
-    verify_password,
+    token_cache,
 )
+from .catalog import catalog_cache, etag_matches
 from .database import (
+    add_user,
+    count_late_orders,
     create_order,
+    create_orders,
     create_product,
-    get_all_orders,
-    get_all_products,
     get_order_by_id,
-    get_orders_by_user,
     get_product_by_id,
+    get_product_order_count,
+    get_sales_by_day,
+    get_sales_by_product,
+    get_sales_by_status,
     init_db,
+    iter_orders,
+    list_late_orders,
+    list_orders,
+    search_products,
     update_order_status,
     delete_product_by_id,
     get_user_by_id,
 )
-from .models import Order, Product, User
+from .export import iter_csv, iter_ndjson
+from .lifecycle import ORDER_SCHEDULER, order_scheduler
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from .metrics import MetricsMiddleware
+from .metrics import registry as metrics
+from .models import Order, OrderStatus, Product
 from .schemas import (
+    BulkOrderCreate,
+    BulkOrderResponse,
+    BulkOrderResult,
+    ChatSessionMessage,
+    ChatSessionResponse,
+    DailySales,
     OrderCreate,
     OrderResponse,
     ProductCreate,
     ProductResponse,
+    ProductSales,
+    ProductSearchResult,
+    SalesSummary,
+    StatusSales,
     Token,
     UserInDB,
     ChatMessage,
     UserResponse,
 )
-from candidate_solution.solution import generate_answer
+from .security import (
+    DUMMY_PASSWORD_HASH,
+    HashingOverloaded,
+    get_password_hash,
+    needs_rehash,
+    password_hasher,
+)
+from .sessions import ChatSession, chat_sessions
+from candidate_solution.cache import completion_cache, tool_cache
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Initialize the database with mock data on startup
     init_db()
+    if ORDER_SCHEDULER:
+        order_scheduler.start()
     yield
+    order_scheduler.stop()
+    password_hasher.shutdown()
+
+
+# Routes that read or write the database are plain functions, which Starlette
+# runs in its threadpool: a backend call can block, e.g. on a SQLite write
+# lock, and would otherwise stall every request on the event loop. Async
+# routes hand their database calls to run_in_threadpool.
+
+# Pagination defaults for list endpoints
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Stored orders and products are validated once, when they are written, so
+# the routes returning them dump them straight to JSON with these instead of
+# having FastAPI revalidate every field against the response model
+_order_json = TypeAdapter(Order)
+_orders_json = TypeAdapter(List[Order])
+_product_json = TypeAdapter(Product)
+
+
+def _json_response(adapter: TypeAdapter, value, headers=None) -> Response:
+    return Response(
+        content=adapter.dump_json(value),
+        media_type="application/json",
+        headers=headers,
+    )
 
 
 app = FastAPI(
@@ -62,23 +129,116 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# Caches whose hits, misses and size are exported by /metrics
+_CACHES = {
+    "auth_token": token_cache,
+    "catalog": catalog_cache,
+    "chat_completion": completion_cache,
+    "chat_tool": tool_cache,
+}
+metrics.collected(
+    "cache_hits_total",
+    "Lookups answered from the cache",
+    ("cache",),
+    lambda: [((name,), cache.hits) for name, cache in _CACHES.items()],
+    kind="counter",
+)
+metrics.collected(
+    "cache_misses_total",
+    "Lookups the cache could not answer",
+    ("cache",),
+    lambda: [((name,), cache.misses) for name, cache in _CACHES.items()],
+    kind="counter",
+)
+metrics.collected(
+    "cache_entries",
+    "Entries held by the cache",
+    ("cache",),
+    lambda: [((name,), len(cache)) for name, cache in _CACHES.items()],
+)
+metrics.collected(
+    "password_hashes_total",
+    "Password hashes by outcome: completed, or rejected because the pool was full",
+    ("outcome",),
+    lambda: [
+        (("completed",), password_hasher.completed),
+        (("rejected",), password_hasher.rejected),
+    ],
+    kind="counter",
+)
+metrics.collected(
+    "password_hashes_in_flight",
+    "Password hashes running or queued",
+    (),
+    lambda: [((), password_hasher.in_flight)],
+)
+metrics.collected(
+    "order_transitions_total",
+    "Order status changes made by the lifecycle scheduler",
+    (),
+    lambda: [((), order_scheduler.transitions)],
+    kind="counter",
+)
+metrics.collected(
+    "orders_late",
+    "Orders past their delivery date that are neither delivered nor cancelled",
+    (),
+    lambda: [((), count_late_orders())],
+)
+metrics.collected(
+    "chat_sessions",
+    "Chat sessions held by this worker",
+    (),
+    lambda: [((), len(chat_sessions))],
+)
 
 
 @app.post("/login", response_model=Token, tags=["Authentication"])
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(response: Response, form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Authenticate user and return JWT token.
 
     - **username**: Username for authentication
     - **password**: Password for authentication
     """
-    user = get_user_by_username(form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_in_threadpool(get_user_by_username, form_data.username)
+    hashed_password = user.hashed_password if user else DUMMY_PASSWORD_HASH
+    try:
+        verified, timing = await password_hasher.verify(
+            form_data.password, hashed_password
+        )
+    except HashingOverloaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many logins in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    server_timing = (
+        f"hash-queue;dur={timing.queue_seconds * 1e3:.1f},"
+        f" hash;dur={timing.hash_seconds * 1e3:.1f}"
+    )
+    if not user or not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
+            headers={"WWW-Authenticate": "Bearer", "Server-Timing": server_timing},
         )
+    response.headers["Server-Timing"] = server_timing
+
+    if needs_rehash(user.hashed_password):
+        # Upgrade hashes made with an older scheme or work factor
+        try:
+            new_hash, _ = await password_hasher.run(
+                get_password_hash, form_data.password
+            )
+        except HashingOverloaded:
+            pass
+        else:
+            await run_in_threadpool(
+                add_user, {**user.model_dump(), "hashed_password": new_hash}
+            )
 
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -88,17 +248,68 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 
 @app.get("/products", response_model=List[ProductResponse], tags=["Products"])
-async def read_products(current_user: UserInDB = Depends(get_current_active_user)):
+def read_products(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    sort_by: Literal["id", "price"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    if_none_match: Optional[str] = Header(None),
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """
+    Get a page of products.
+
+    - **limit**: Maximum number of products to return
+    - **cursor**: Cursor of the page to return, from the `X-Next-Cursor` header
+    - **sort_by**: Sort by `id` or `price`
+    - **order**: `asc` or `desc`
+
+    The `X-Next-Cursor` response header is set when more products are available.
+    Responses carry an `ETag`; send it back in `If-None-Match` to get an empty
+    `304 Not Modified` while the catalog is unchanged.
     """
-    Get all products.
+    try:
+        page = catalog_cache.get_page(sort_by, order == "desc", limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    headers = {"ETag": page.etag, "Cache-Control": "private, no-cache"}
+    if page.next_cursor:
+        headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if etag_matches(if_none_match, page.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=page.body, media_type="application/json", headers=headers)
+
 
-    Returns a list of all available products in the store.
+@app.get(
+    "/products/search", response_model=List[ProductSearchResult], tags=["Products"]
+)
+def search_catalog(
+    q: str = Query(min_length=1, max_length=200),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: UserInDB = Depends(get_current_active_user),
+):
     """
-    return get_all_products()
+    Search products by name and description, best matches first.
+
+    - **q**: Words to search for; each matches as a prefix, and all must match
+    - **min_price** / **max_price**: Price range, inclusive
+    - **limit**: Maximum number of products to return
+    """
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(
+            status_code=400, detail="min_price cannot be greater than max_price"
+        )
+    return [
+        ProductSearchResult(**product.model_dump(), score=score)
+        for product, score in search_products(q, min_price, max_price, limit)
+    ]
 
 
 @app.get("/products/{product_id}", response_model=ProductResponse, tags=["Products"])
-async def read_product(
+def read_product(
     product_id: int, current_user: UserInDB = Depends(get_current_active_user)
 ):
     """
@@ -109,11 +320,11 @@ async def read_product(
     product = get_product_by_id(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    return _json_response(_product_json, product)
 
 
 @app.post("/products", response_model=ProductResponse, tags=["Products"])
-async def create_new_product(
+def create_new_product(
     product: ProductCreate, current_user: UserInDB = Depends(get_current_active_user)
 ):
     """
@@ -131,36 +342,142 @@ async def create_new_product(
     return create_product(product)
 
 
+def _page_orders(**filters) -> Response:
+    try:
+        orders, next_cursor = list_orders(**filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return _json_response(_orders_json, orders, headers)
+
+
 @app.get("/orders", response_model=List[OrderResponse], tags=["Orders"])
-async def read_orders(current_user: UserInDB = Depends(get_current_active_user)):
+def read_orders(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[OrderStatus] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    sort_by: Literal["created_at", "total_price"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    current_user: UserInDB = Depends(get_current_active_user),
+):
     """
-    Get all orders for the current user.
+    Get a page of orders for the current user.
 
-    Returns a list of all orders placed by the authenticated user.
-    Admin users can see all orders.
+    Returns orders placed by the authenticated user. Admin users can see all
+    orders, optionally filtered by **user_id**.
+
+    - **limit**: Maximum number of orders to return
+    - **cursor**: Cursor of the page to return, from the `X-Next-Cursor` header
+    - **status**: Only return orders in this status
+    - **created_from** / **created_to**: Only return orders created in this range
+    - **sort_by**: Sort by `created_at` or `total_price`
+    - **order**: `asc` or `desc`
+
+    The `X-Next-Cursor` response header is set when more orders are available.
     """
     if current_user.role != "admin":
-        return get_orders_by_user(current_user.id)
-    else:
-        return get_all_orders()
+        if user_id is not None and user_id != current_user.id:
+            raise HTTPException(
+                status_code=403, detail="Not authorized to access these orders"
+            )
+        user_id = current_user.id
+    return _page_orders(
+        user_id=user_id,
+        status=status,
+        created_from=created_from,
+        created_to=created_to,
+        sort_by=sort_by,
+        descending=order == "desc",
+        limit=limit,
+        cursor=cursor,
+    )
 
 
 @app.get("/user_orders", response_model=List[OrderResponse], tags=["Orders"])
-async def read_user_orders(
-    user_id: int, current_user: UserInDB = Depends(get_current_active_user)
+def read_user_orders(
+    user_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[OrderStatus] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort_by: Literal["created_at", "total_price"] = "created_at",
+    order: Literal["asc", "desc"] = "desc",
+    current_user: UserInDB = Depends(get_current_active_user),
 ):
     """
-    Get all orders for the a specific user. Admin only.
+    Get a page of orders for a specific user. Admin only.
+
+    Accepts the same paging, filtering and sorting parameters as `GET /orders`.
     """
     if current_user.role != "admin":
         raise HTTPException(
             status_code=403, detail="Not authorized to access this order"
         )
-    return get_orders_by_user(user_id)
+    return _page_orders(
+        user_id=user_id,
+        status=status,
+        created_from=created_from,
+        created_to=created_to,
+        sort_by=sort_by,
+        descending=order == "desc",
+        limit=limit,
+        cursor=cursor,
+    )
+
+
+@app.get("/orders/export", tags=["Orders"])
+def export_orders(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    since: Optional[datetime] = None,
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """
+    Stream every order as NDJSON or CSV. Admin only.
+
+    - **format**: `ndjson` (one JSON order per line) or `csv`
+    - **since**: Only export orders created or updated at or after this time
+
+    The `X-Export-Watermark` response header holds the time the export started;
+    pass it as **since** on the next call to pull only what changed.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to export orders")
+    if since is not None and since.tzinfo is None:
+        since = since.replace(tzinfo=UTC)
+
+    watermark = datetime.now(UTC).isoformat()
+    if format == "csv":
+        body, media_type = iter_csv(iter_orders(since)), "text/csv"
+    else:
+        body, media_type = iter_ndjson(iter_orders(since)), "application/x-ndjson"
+    return StreamingResponse(
+        body, media_type=media_type, headers={"X-Export-Watermark": watermark}
+    )
+
+
+@app.get("/orders/late", response_model=List[OrderResponse], tags=["Orders"])
+def read_late_orders(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """
+    Get orders past their delivery date that are neither delivered nor
+    cancelled, most overdue first.
+
+    - **limit**: Maximum number of orders to return
+
+    Users get their own late orders; admins get everyone's.
+    """
+    user_id = None if current_user.role == "admin" else current_user.id
+    return _json_response(_orders_json, list_late_orders(user_id, limit))
 
 
 @app.get("/orders/{order_id}", response_model=OrderResponse, tags=["Orders"])
-async def read_order(
+def read_order(
     order_id: int, current_user: UserInDB = Depends(get_current_active_user)
 ):
     """
@@ -177,35 +494,99 @@ async def read_order(
         raise HTTPException(
             status_code=403, detail="Not authorized to access this order"
         )
-    return order
+    return _json_response(_order_json, order)
 
 
 @app.post("/orders", response_model=OrderResponse, tags=["Orders"])
-async def create_new_order(
+def create_new_order(
     order: OrderCreate, current_user: UserInDB = Depends(get_current_active_user)
 ):
     """
     Create a new order for the current user.
 
-    - **product_id**: ID of the product to order
+    - **id**: ID of the product to order
     - **quantity**: Number of items to order (must be greater than 0)
     """
-    return create_order(current_user.id, order)
+    try:
+        return _json_response(_order_json, create_order(current_user.id, order))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 
 @app.post("/create_order", response_model=OrderResponse, tags=["Orders"])
-async def create_order(
+def create_order_for_user(
     user_id: int,
     order: OrderCreate,
     current_user: UserInDB = Depends(get_current_active_user),
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to create an order")
-    return create_order(user_id, order)
+    try:
+        return _json_response(_order_json, create_order(user_id, order))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/orders/bulk", response_model=BulkOrderResponse, tags=["Orders"])
+def create_bulk_orders(
+    bulk: BulkOrderCreate, current_user: UserInDB = Depends(get_current_active_user)
+):
+    """
+    Create many orders in one request.
+
+    - **orders**: Up to 1000 orders, each with its **items** and, for admin users
+      only, the **user_id** to create it for (defaults to the current user)
+
+    Every order is validated and priced against a single catalog lookup. Orders
+    that fail are reported in **results** with their own status code and error,
+    without failing the rest of the batch.
+    """
+    results = [None] * len(bulk.orders)
+    accepted = []
+    known_users = {current_user.id: True}
+    for index, entry in enumerate(bulk.orders):
+        user_id = entry.user_id if entry.user_id is not None else current_user.id
+        if user_id != current_user.id and current_user.role != "admin":
+            results[index] = BulkOrderResult(
+                index=index,
+                status_code=403,
+                error="Not authorized to create an order for another user",
+            )
+            continue
+        if user_id not in known_users:
+            known_users[user_id] = get_user_by_id(user_id) is not None
+        if not known_users[user_id]:
+            results[index] = BulkOrderResult(
+                index=index, status_code=404, error="User not found"
+            )
+            continue
+        accepted.append((index, user_id, OrderCreate(items=entry.items)))
+
+    created = create_orders([(user_id, order) for _, user_id, order in accepted])
+    for (index, _, _), outcome in zip(accepted, created):
+        if isinstance(outcome, ValidationError):
+            results[index] = BulkOrderResult(
+                index=index,
+                status_code=422,
+                error="; ".join(error["msg"] for error in outcome.errors()),
+            )
+        elif isinstance(outcome, ValueError):
+            results[index] = BulkOrderResult(
+                index=index, status_code=404, error=str(outcome)
+            )
+        else:
+            results[index] = BulkOrderResult(
+                index=index, status_code=200, order=outcome.model_dump()
+            )
+
+    failed = sum(1 for result in results if result.error is not None)
+    return BulkOrderResponse(
+        created=len(results) - failed, failed=failed, results=results
+    )
 
 
 @app.post("/orders/{order_id}/cancel", response_model=OrderResponse, tags=["Orders"])
-async def cancel_order(
+def cancel_order(
     order_id: int, current_user: UserInDB = Depends(get_current_active_user)
 ):
     """
@@ -217,6 +598,7 @@ async def cancel_order(
     - Users can only cancel their own orders
     - Admin users can cancel any order
     - Cannot cancel orders that have been delivered
+    - Returns 409 if the order changed status while it was being cancelled
     """
     order = get_order_by_id(order_id)
     if not order:
@@ -228,14 +610,18 @@ async def cancel_order(
     if order.status == "delivered":
         raise HTTPException(status_code=400, detail="Cannot cancel a delivered order")
 
-    updated_order = update_order_status(order_id, "cancelled")
+    # Only cancelled while still in the status checked above, so an order
+    # the lifecycle scheduler delivers meanwhile is not cancelled after all
+    updated_order = update_order_status(order_id, "cancelled", expected=order.status)
     if not updated_order:
-        raise HTTPException(status_code=500, detail="Failed to update order status")
-    return updated_order
+        raise HTTPException(
+            status_code=409, detail="Order status changed, please try again"
+        )
+    return _json_response(_order_json, updated_order)
 
 
 @app.delete("/products/{product_id}", response_model=ProductResponse, tags=["Products"])
-async def delete_product(
+def delete_product(
     product_id: int, current_user: UserInDB = Depends(get_current_active_user)
 ):
     """
@@ -246,12 +632,10 @@ async def delete_product(
     product = get_product_by_id(product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    all_orders = get_all_orders()
-    for order in all_orders:
-        if product_id in [item.id for item in order.items]:
-            raise HTTPException(
-                status_code=400, detail="Cannot delete a product that has been ordered"
-            )
+    if get_product_order_count(product_id) > 0:
+        raise HTTPException(
+            status_code=400, detail="Cannot delete a product that has been ordered"
+        )
     if current_user.role != "admin":
         raise HTTPException(
             status_code=403, detail="Not authorized to delete this product"
@@ -260,18 +644,276 @@ async def delete_product(
     return product
 
 
+def _require_admin(user: UserInDB) -> None:
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to view analytics")
+
+
+@app.get("/analytics/sales", response_model=SalesSummary, tags=["Analytics"])
+def read_sales_summary(
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """
+    Order counts and revenue per status, and totals. Admin only.
+
+    **revenue** and **units** leave out cancelled orders; each status reports
+    the total of the orders in it. Read from aggregates kept up to date as
+    orders change, so this does not scan orders.
+    """
+    _require_admin(current_user)
+    by_status = get_sales_by_status()
+    revenue_cents = sum(
+        cents
+        for status, (_, cents) in by_status.items()
+        if status != OrderStatus.CANCELLED
+    )
+    return SalesSummary(
+        orders=sum(orders for orders, _ in by_status.values()),
+        units=sum(units for units, _ in get_sales_by_product().values()),
+        revenue=revenue_cents / 100,
+        by_status=[
+            StatusSales(status=status, orders=orders, revenue=cents / 100)
+            for status in OrderStatus
+            for orders, cents in [by_status.get(status, (0, 0))]
+        ],
+    )
+
+
+@app.get("/analytics/products", response_model=List[ProductSales], tags=["Analytics"])
+def read_product_sales(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    sort_by: Literal["revenue", "units"] = "revenue",
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """
+    Best selling products by revenue or units, over orders not cancelled.
+    Admin only.
+
+    - **limit**: Maximum number of products to return
+    - **sort_by**: `revenue` or `units`, highest first
+    """
+    _require_admin(current_user)
+    field = 1 if sort_by == "revenue" else 0
+    top = heapq.nlargest(
+        limit,
+        get_sales_by_product().items(),
+        key=lambda entry: (entry[1][field], -entry[0]),
+    )
+    return [
+        ProductSales(product_id=product_id, units=units, revenue=cents / 100)
+        for product_id, (units, cents) in top
+    ]
+
+
+@app.get("/analytics/daily", response_model=List[DailySales], tags=["Analytics"])
+def read_daily_sales(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """
+    Orders and revenue per day of creation (UTC), over orders not cancelled.
+    Admin only.
+
+    - **start** / **end**: First and last day to return, inclusive
+    """
+    _require_admin(current_user)
+    return [
+        DailySales(day=day, orders=orders, revenue=cents / 100)
+        for day, (orders, cents) in get_sales_by_day(start, end).items()
+    ]
+
+
+def _chat_solution():
+    # Imported on first use: the chat stack loads the OpenAI client, which
+    # makes up most of the import time, and many workers never serve chat
+    from candidate_solution import solution
+
+    return solution
+
+
+def _sse_frame(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_chat(
+    user_id: int,
+    messages: List[ChatMessage],
+    on_done: Optional[Callable[[List[ChatMessage]], List[ChatMessage]]] = None,
+):
+    try:
+        async for event, data in _chat_solution().stream_answer(user_id, messages):
+            if event == "done":
+                if on_done is not None:
+                    data = on_done(data)
+                data = [message.model_dump(exclude_none=True) for message in data]
+            yield _sse_frame(event, data)
+    except Exception as exc:
+        # Headers are already sent, so report the failure in-band
+        yield _sse_frame("error", {"detail": str(exc)})
+
+
+async def _stream_session_turn(session: ChatSession, content: str):
+    async with session.lock:
+        async for frame in _stream_chat(
+            session.user_id, session.begin_turn(content), on_done=session.end_turn
+        ):
+            yield frame
+
+
+def _chat_user_id(user_id: Optional[int], current_user: UserInDB) -> int:
+    """The user a chat runs as: the caller, or for admins the one asked for."""
+    if user_id is None or user_id == current_user.id:
+        return current_user.id
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403, detail="Not authorized to chat as another user"
+        )
+    return user_id
+
+
 @app.post("/chat", response_model=List[ChatMessage], tags=["Chat"])
 async def chat(
-    user_id: int,
     messages: List[ChatMessage],
+    stream: bool = False,
+    user_id: Optional[int] = None,
+    current_user: UserInDB = Depends(get_current_active_user),
 ):
-    return generate_answer(user_id, messages)  #  use candidate_solution/solution.py
+    """
+    Answer the conversation with the assistant, whose tools only read the
+    current user's account and orders.
 
+    - **stream**: Send the answer as Server-Sent Events: one `token` event per
+      text fragment as it arrives, then a `done` event holding the full
+      conversation, or an `error` event if the answer failed
+    - **user_id**: Admin only: chat as this user instead
+    """
+    user_id = _chat_user_id(user_id, current_user)
+    if stream:
+        return StreamingResponse(
+            _stream_chat(user_id, messages),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+    return await _chat_solution().generate_answer(
+        user_id, messages
+    )  #  use candidate_solution/solution.py
 
-@app.get("/user/{user_id}", response_model=UserResponse, tags=["Users"])
-async def get_user(
-    user_id: int, current_user: UserInDB = Depends(get_current_active_user)
+
+@app.get("/chat/cache", tags=["Chat"])
+async def read_chat_cache_stats(
+    current_user: UserInDB = Depends(get_current_active_user),
 ):
+    """
+    Hit rates and time saved by the chat response caches. Admin only.
+
+    Caching is enabled by setting `CHAT_CACHE_TTL_SECONDS`.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=403, detail="Not authorized to read cache statistics"
+        )
+    return {"completions": completion_cache.stats(), "tools": tool_cache.stats()}
+
+
+def _session_response(session: ChatSession) -> ChatSessionResponse:
+    return ChatSessionResponse(
+        session_id=session.id,
+        user_id=session.user_id,
+        message_count=len(session.messages),
+        token_count=session.token_count,
+        token_budget=session.token_budget,
+        dropped_turns=session.dropped_turns,
+    )
+
+
+def _get_session(session_id: str, current_user: UserInDB) -> ChatSession:
+    session = chat_sessions.get(session_id)
+    # Sessions of other users are reported like unknown ones
+    if session is None or session.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Session not found")
+    return session
+
+
+@app.post(
+    "/chat/sessions",
+    response_model=ChatSessionResponse,
+    status_code=status.HTTP_201_CREATED,
+    tags=["Chat"],
+)
+async def create_chat_session(
+    user_id: Optional[int] = None,
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """
+    Start a conversation kept on the server, as the current user.
+
+    - **user_id**: Admin only: chat as this user instead
+
+    Send each new message to `/chat/sessions/{session_id}/messages`; older
+    turns are dropped once the history exceeds the session's token budget.
+    Sessions expire after a period without messages, and only the user who
+    started a session can use it.
+    """
+    session = chat_sessions.create(
+        _chat_user_id(user_id, current_user), owner_id=current_user.id
+    )
+    return _session_response(session)
+
+
+@app.get(
+    "/chat/sessions/{session_id}", response_model=ChatSessionResponse, tags=["Chat"]
+)
+async def read_chat_session(
+    session_id: str, current_user: UserInDB = Depends(get_current_active_user)
+):
+    return _session_response(_get_session(session_id, current_user))
+
+
+@app.post(
+    "/chat/sessions/{session_id}/messages",
+    response_model=List[ChatMessage],
+    tags=["Chat"],
+)
+async def chat_in_session(
+    session_id: str,
+    message: ChatSessionMessage,
+    stream: bool = False,
+    current_user: UserInDB = Depends(get_current_active_user),
+):
+    """
+    Send a message in a session and get only this turn's replies.
+
+    - **stream**: Stream the answer as in `POST /chat`; the `done` event holds
+      this turn's replies
+    """
+    session = _get_session(session_id, current_user)
+    if stream:
+        return StreamingResponse(
+            _stream_session_turn(session, message.content),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache"},
+        )
+    async with session.lock:
+        messages = await _chat_solution().generate_answer(
+            session.user_id, session.begin_turn(message.content)
+        )
+        return session.end_turn(messages)
+
+
+@app.delete(
+    "/chat/sessions/{session_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    tags=["Chat"],
+)
+async def delete_chat_session(
+    session_id: str, current_user: UserInDB = Depends(get_current_active_user)
+):
+    chat_sessions.delete(_get_session(session_id, current_user).id)
+
+
+@app.get("/user/{user_id}", response_model=UserResponse, tags=["Users"])
+def get_user(user_id: int, current_user: UserInDB = Depends(get_current_active_user)):
     """
     Get user information by ID.
 
@@ -289,3 +931,15 @@ async def get_user(
         raise HTTPException(status_code=404, detail="User not found")
 
     return user
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Monitoring"])
+def read_metrics():
+    """
+    Metrics of this worker in the Prometheus text format.
+
+    Request counts and latency histograms per route and status, time spent in
+    each database operation, cache hit counts, password hashing, and chat model
+    and tool call durations.
+    """
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
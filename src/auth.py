@@ -1,13 +1,15 @@
+import time
+from collections import OrderedDict
 from datetime import UTC, datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Set, Tuple
 
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
-from .database import get_user_by_username
+from .database import add_user_listener, get_user_by_username
 from .schemas import TokenData, UserInDB
-from .security import verify_password
 
 # Security configuration
 SECRET_KEY = (
@@ -15,10 +17,88 @@ SECRET_KEY = (
 )
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+TOKEN_CACHE_MAX_SIZE = 10_000
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
 
+class TokenCache:
+    """LRU cache mapping verified access tokens to the users they resolve to.
+
+    Entries expire at the token's ``exp`` claim, the least recently used
+    entry is evicted once ``max_size`` is reached, and every token of a user
+    is dropped when that user's record changes.
+    """
+
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE) -> None:
+        self.max_size = max_size
+        self._entries: OrderedDict[str, Tuple[UserInDB, float]] = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> Optional[UserInDB]:
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        user, expires_at = entry
+        if expires_at <= time.time():
+            self._discard(token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return user
+
+    def put(self, token: str, user: UserInDB, expires_at: float) -> None:
+        if self.max_size <= 0:
+            return
+        if token in self._entries:
+            self._discard(token)
+        while len(self._entries) >= self.max_size:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+        self._entries[token] = (user, expires_at)
+        self._tokens_by_user.setdefault(user.id, set()).add(token)
+
+    def invalidate_user(self, user_id: int) -> None:
+        for token in self._tokens_by_user.pop(user_id, ()):
+            self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _discard(self, token: str) -> None:
+        user, _ = self._entries.pop(token)
+        tokens = self._tokens_by_user.get(user.id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user.id]
+
+
+token_cache = TokenCache()
+add_user_listener(token_cache.invalidate_user)
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -31,6 +111,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -45,9 +129,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     except JWTError:
         raise credentials_exception
 
-    user = get_user_by_username(token_data.username)
+    # Only a cache miss reads the database, in a thread off the event loop
+    user = await run_in_threadpool(get_user_by_username, token_data.username)
     if user is None:
         raise credentials_exception
+
+    expires_at = payload.get("exp")
+    if isinstance(expires_at, (int, float)):
+        token_cache.put(token, user, float(expires_at))
     return user
 
 
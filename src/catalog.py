@@ -0,0 +1,94 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from .database import get_catalog_version, list_products
+from .schemas import ProductResponse
+
+# Pre-encoded pages kept for the current catalog version
+CATALOG_CACHE_MAX_PAGES = 256
+
+_product_list = TypeAdapter(List[ProductResponse])
+
+
+class CatalogPage(NamedTuple):
+    body: bytes
+    etag: str
+    next_cursor: Optional[str]
+
+
+class CatalogCache:
+    """Pre-encoded JSON pages of the product catalog.
+
+    Pages are encoded once and served as bytes until the catalog version
+    changes, which only happens when a product is created or deleted. The
+    ETag is a hash of the body, so it is strong and identical on every
+    worker serving the same catalog.
+
+    Requests read it from several threads, so the pages are only looked up
+    and stored under a lock; a missing page is encoded without it.
+    """
+
+    def __init__(self, max_pages: int = CATALOG_CACHE_MAX_PAGES) -> None:
+        self.max_pages = max_pages
+        self._version: Optional[int] = None
+        self._pages: OrderedDict[Tuple, CatalogPage] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get_page(
+        self,
+        sort_by: str = "id",
+        descending: bool = False,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> CatalogPage:
+        version = get_catalog_version()
+        key = (sort_by, descending, limit, cursor)
+        with self._lock:
+            if version != self._version:
+                self._pages.clear()
+                self._version = version
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                self.hits += 1
+                return page
+            self.misses += 1
+
+        products, next_cursor = list_products(sort_by, descending, limit, cursor)
+        body = _product_list.dump_json(
+            _product_list.validate_python(
+                [product.model_dump() for product in products]
+            )
+        )
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        page = CatalogPage(body, etag, next_cursor)
+        with self._lock:
+            # Only kept while the catalog is still at the version it was read at
+            if self._version == version:
+                self._pages[key] = page
+                if len(self._pages) > self.max_pages:
+                    self._pages.popitem(last=False)
+        return page
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+catalog_cache = CatalogCache()
@@ -1,141 +1,267 @@
-from datetime import UTC, datetime, timedelta
-from typing import Dict, List, Optional
+import os
+from datetime import UTC, date, datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-from .data import LAST_ORDER_ID, MOCK_ORDERS, MOCK_PRODUCTS, MOCK_USERS
-from .models import Order, Product, User
+from .data import MOCK_ORDERS, MOCK_PRODUCTS, MOCK_USERS
+from .metrics import database_duration, database_errors, timed
+from .models import Order, OrderStatus, Product
 from .schemas import OrderCreate, ProductCreate, UserInDB
+from .storage import StorageBackend, create_backend
+from .synthetic import iter_fixture
 
-# In-memory database
-users_db: Dict[int, dict] = {}
-orders_db: Dict[int, dict] = {}
-products_db: Dict[int, dict] = {}
-last_order_id = LAST_ORDER_ID
-last_product_id = 1  # Initialize with 1 since we have one mock product
+# Storage backend, selected with e.g. DATABASE_URL=sqlite:///ecommerce.db
+DATABASE_URL = os.getenv("DATABASE_URL", "memory://")
+# SQLite file shared by workers of the memory backend to allocate unique ids
+ID_SEQUENCE_PATH = os.getenv("ID_SEQUENCE_PATH")
+# Fixture written by ``python -m src.synthetic`` to load instead of the mock data
+SEED_FIXTURE_PATH = os.getenv("SEED_FIXTURE_PATH")
 
+_backend: StorageBackend = create_backend(DATABASE_URL, ID_SEQUENCE_PATH)
 
-def init_db():
-    """Initialize the database with mock data"""
-    # Initialize users
-    for user in MOCK_USERS:
-        users_db[user["id"]] = user
+# Times each operation below, labelled with its name, for /metrics
+_timed = timed(database_duration, database_errors)
 
-    # Initialize orders
-    for order in MOCK_ORDERS:
-        orders_db[order["id"]] = order
 
-    # Initialize products
-    for product in MOCK_PRODUCTS:
-        products_db[product["id"]] = product
+def get_backend() -> StorageBackend:
+    return _backend
+
+
+def set_backend(backend: StorageBackend) -> StorageBackend:
+    """Replace the active backend, keeping registered listeners.
+
+    Returns the previous backend, which the caller is responsible for closing.
+    """
+    global _backend
+    previous = _backend
+    backend.user_listeners.extend(previous.user_listeners)
+    backend.order_listeners.extend(previous.order_listeners)
+    _backend = backend
+    return previous
+
+
+def init_db(fixture_path: Optional[str] = SEED_FIXTURE_PATH):
+    """Initialize the database with mock data, or the records of a fixture"""
+    if not _backend.is_empty():
+        return
+    if fixture_path is None:
+        _backend.load(users=MOCK_USERS, products=MOCK_PRODUCTS, orders=MOCK_ORDERS)
+        return
+    # Streamed in batches, so the whole fixture is never in memory at once
+    for section, records in iter_fixture(fixture_path):
+        _backend.load(**{section: records})
 
 
 # User operations
+@_timed
 def get_user_by_username(username: str) -> Optional[UserInDB]:
-    for user in users_db.values():
-        if user["username"] == username:
-            return UserInDB(**user)
-    return None
+    return _backend.get_user_by_username(username)
+
 
+@_timed
+def get_user_by_email(email: str) -> Optional[UserInDB]:
+    return _backend.get_user_by_email(email)
 
+
+@_timed
 def get_user_by_id(user_id: int) -> Optional[UserInDB]:
-    user = users_db.get(user_id)
-    if user:
-        return UserInDB(**user)
-    return None
+    return _backend.get_user_by_id(user_id)
+
+
+@_timed
+def add_user(user: dict) -> UserInDB:
+    return _backend.add_user(user)
+
+
+def add_user_listener(listener: Callable[[int], None]) -> None:
+    _backend.add_user_listener(listener)
+
+
+def add_order_listener(listener: Callable[[int, int], None]) -> None:
+    """Call ``listener(order_id, user_id)`` whenever an order changes."""
+    _backend.add_order_listener(listener)
 
 
 # Product operations
+@_timed
 def get_product_by_id(product_id: int) -> Optional[Product]:
-    product = products_db.get(product_id)
-    if product:
-        return Product(**product)
-    return None
+    return _backend.get_product_by_id(product_id)
+
+
+@_timed
+def get_products_by_ids(product_ids: Iterable[int]) -> Dict[int, Product]:
+    """Resolve each distinct product id once; unknown ids are left out."""
+    return _backend.get_products_by_ids(product_ids)
 
 
+@_timed
 def get_all_products() -> List[Product]:
-    return [Product(**product) for product in products_db.values()]
+    return _backend.get_all_products()
+
+
+@_timed
+def list_products(
+    sort_by: str = "id",
+    descending: bool = False,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Product], Optional[str]]:
+    """Return one page of products and the cursor of the next page, if any."""
+    return _backend.list_products(sort_by, descending, limit, cursor)
+
 
+@_timed
+def get_catalog_version() -> int:
+    """Counter that changes whenever a product is created or deleted."""
+    return _backend.get_catalog_version()
 
+
+@_timed
 def create_product(product: ProductCreate) -> Product:
-    global last_product_id
-    last_product_id += 1
-
-    # Create and validate the product before storing it
-    new_product = Product(
-        id=last_product_id,
-        name=product.name,
-        description=product.description,
-        price=product.price,
-    )
+    return _backend.create_product(product)
+
+
+@_timed
+def delete_product_by_id(product_id: int) -> None:
+    _backend.delete_product_by_id(product_id)
+
 
-    # If validation passes, store the product
-    products_db[last_product_id] = new_product.model_dump()
-    return new_product
+@_timed
+def search_products(
+    query: str,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = 20,
+) -> List[Tuple[Product, float]]:
+    """Products matching every term of ``query``, best first, with scores."""
+    return _backend.search_products(query, min_price, max_price, limit)
 
 
 # Order operations
+@_timed
 def get_orders_by_user(user_id: int) -> List[Order]:
-    return [
-        add_product_details(Order(**order))
-        for order in orders_db.values()
-        if order["user_id"] == user_id
-    ]
+    return _backend.get_orders_by_user(user_id)
+
+
+@_timed
+def list_orders(
+    user_id: Optional[int] = None,
+    status: Optional[OrderStatus] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    sort_by: str = "created_at",
+    descending: bool = True,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Order], Optional[str]]:
+    """Return one page of orders and the cursor of the next page, if any."""
+    return _backend.list_orders(
+        user_id=user_id,
+        status=status,
+        created_from=created_from,
+        created_to=created_to,
+        sort_by=sort_by,
+        descending=descending,
+        limit=limit,
+        cursor=cursor,
+    )
+
+
+def iter_orders(since: Optional[datetime] = None) -> Iterator[dict]:
+    """Yield stored orders in id order without materializing a list.
+
+    With ``since``, only orders created or updated at or after it are
+    yielded.
+    """
+    return _backend.iter_orders(since)
+
+
+@_timed
+def list_late_orders(
+    user_id: Optional[int] = None, limit: int = 100, now: Optional[datetime] = None
+) -> List[Order]:
+    """Orders neither delivered nor cancelled whose delivery date has passed,
+    most overdue first, optionally of one user."""
+    return _backend.list_late_orders(now or datetime.now(UTC), user_id, limit)
 
 
+@_timed
+def count_late_orders(now: Optional[datetime] = None) -> int:
+    return _backend.count_late_orders(now or datetime.now(UTC))
+
+
+@_timed
+def get_product_order_count(product_id: int) -> int:
+    """Number of orders, in any status, that include the product."""
+    return _backend.get_product_order_count(product_id)
+
+
+@_timed
 def get_order_by_id(order_id: int) -> Optional[Order]:
-    order = orders_db.get(order_id)
-    if order:
-        return add_product_details(Order(**order))
-    return None
+    return _backend.get_order_by_id(order_id)
+
+
+@_timed
+def get_orders_by_ids(order_ids: Iterable[int]) -> Dict[int, Order]:
+    """Resolve each distinct order id once; unknown ids are left out."""
+    return _backend.get_orders_by_ids(order_ids)
 
 
+@_timed
 def create_order(user_id: int, order: OrderCreate) -> Order:
-    global last_order_id
-
-    # Check if product exists
-    product = get_product_by_id(order.product_id)
-    if not product:
-        raise ValueError("Product not found")
-
-    last_order_id += 1
-    created_at = datetime.now(UTC)
-    new_order = {
-        "id": last_order_id,
-        "user_id": user_id,
-        "product_id": order.product_id,
-        "quantity": order.quantity,
-        "total_price": order.quantity * product.price,
-        "status": "pending",
-        "created_at": created_at,
-        "updated_at": None,
-        "delivery_date": created_at + timedelta(days=7),
-    }
-
-    orders_db[last_order_id] = new_order
-    return Order(**new_order)
-
-
-def update_order_status(order_id: int, status: str) -> Optional[Order]:
-    order = orders_db.get(order_id)
-    if order:
-        order["status"] = status
-        order["updated_at"] = datetime.now(UTC)
-        return Order(**order)
-    return None
+    return _backend.create_order(user_id, order)
 
 
+@_timed
+def create_orders(
+    orders: List[Tuple[int, OrderCreate]],
+) -> List[Union[Order, ValueError]]:
+    """Create many ``(user_id, order)`` pairs, reading the catalog once.
+
+    Each result is the created order or the ValueError that rejected it.
+    """
+    return _backend.create_orders(orders)
+
+
+@_timed
+def update_order_status(
+    order_id: int, status: str, expected: Optional[OrderStatus] = None
+) -> Optional[Order]:
+    return _backend.update_order_status(order_id, status, expected)
+
+
+@_timed
 def get_all_orders() -> List[Order]:
-    return [add_product_details(Order(**order)) for order in orders_db.values()]
+    return _backend.get_all_orders()
+
 
+# Sales analytics, read from aggregates kept up to date by every order write;
+# amounts are integer cents
+@_timed
+def get_sales_by_status() -> Dict[OrderStatus, Tuple[int, int]]:
+    """``(orders, cents)`` per status, for statuses with orders."""
+    return _backend.get_sales_by_status()
 
+
+@_timed
+def get_sales_by_product() -> Dict[int, Tuple[int, int]]:
+    """``(units, cents)`` per product id, over orders not cancelled."""
+    return _backend.get_sales_by_product()
+
+
+@_timed
+def get_sales_by_day(
+    start: Optional[date] = None, end: Optional[date] = None
+) -> Dict[date, Tuple[int, int]]:
+    """``(orders, cents)`` per UTC day, over orders not cancelled, in day order."""
+    return _backend.get_sales_by_day(start, end)
+
+
+@_timed
 def add_product_details(order: Order) -> Order:
-    products = []
-    for item in order.items:
-        product = get_product_by_id(item.id)
-        products.append(product)
-    order.products = products
-    return order
+    return _backend.add_products_details([order])[0]
 
 
-def delete_product_by_id(product_id: int) -> None:
-    if product_id in products_db:
-        del products_db[product_id]
+@_timed
+def add_products_details(orders: List[Order]) -> List[Order]:
+    """Attach product details to a page of orders, resolving each product once."""
+    return _backend.add_products_details(orders)
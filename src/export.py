@@ -0,0 +1,73 @@
+import csv
+import io
+import json
+from typing import Iterable, Iterator
+
+from .models import OrderStatus
+
+CSV_COLUMNS = [
+    "id",
+    "user_id",
+    "status",
+    "total_price",
+    "created_at",
+    "updated_at",
+    "delivery_date",
+    "items",
+]
+
+# Number of orders encoded into each chunk written to the response
+EXPORT_CHUNK_SIZE = 500
+
+
+def _isoformat(value) -> str | None:
+    return value.isoformat() if value is not None else None
+
+
+def _export_record(order: dict) -> dict:
+    return {
+        "id": order["id"],
+        "user_id": order["user_id"],
+        "items": [
+            {"id": item["id"], "quantity": item["quantity"]} for item in order["items"]
+        ],
+        "total_price": order["total_price"],
+        "status": OrderStatus(order["status"]).value,
+        "created_at": _isoformat(order["created_at"]),
+        "updated_at": _isoformat(order["updated_at"]),
+        "delivery_date": _isoformat(order["delivery_date"]),
+    }
+
+
+def iter_ndjson(orders: Iterable[dict]) -> Iterator[bytes]:
+    """Encode orders as newline-delimited JSON, one chunk per batch."""
+    lines = []
+    for order in orders:
+        lines.append(json.dumps(_export_record(order), separators=(",", ":")))
+        if len(lines) == EXPORT_CHUNK_SIZE:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def iter_csv(orders: Iterable[dict]) -> Iterator[bytes]:
+    """Encode orders as CSV with a header row; items are ``id:quantity;...``."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    rows = 0
+    for order in orders:
+        record = _export_record(order)
+        record["items"] = ";".join(
+            f"{item['id']}:{item['quantity']}" for item in record["items"]
+        )
+        writer.writerow([record[column] for column in CSV_COLUMNS])
+        rows += 1
+        if rows == EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            rows = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode()
@@ -0,0 +1,117 @@
+import sqlite3
+import threading
+from typing import Optional, Tuple
+
+# Ids leased from a shared sequence at a time; larger blocks mean fewer
+# cross-process round trips but larger gaps when a worker stops.
+DEFAULT_BLOCK_SIZE = 100
+
+
+class LocalBlockSource:
+    """Sequence held in this process, for a single worker."""
+
+    def __init__(self, next_id: int = 1) -> None:
+        self._next_id = next_id
+        self._lock = threading.Lock()
+
+    def lease(self, size: int) -> Tuple[int, int]:
+        with self._lock:
+            start = self._next_id
+            self._next_id += size
+        return start, start + size
+
+    def advance_to(self, next_id: int) -> None:
+        with self._lock:
+            self._next_id = max(self._next_id, next_id)
+
+
+class SQLiteBlockSource:
+    """Sequence stored in a SQLite file, shared by every process that opens it.
+
+    Each lease is one ``BEGIN IMMEDIATE`` transaction, which SQLite serializes
+    across processes.
+    """
+
+    def __init__(self, path: str, name: str) -> None:
+        self.name = name
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS id_sequences"
+            " (name TEXT PRIMARY KEY, next_id INTEGER NOT NULL)"
+        )
+        self._connection.execute(
+            "INSERT OR IGNORE INTO id_sequences (name, next_id) VALUES (?, 1)",
+            (name,),
+        )
+
+    def _update(self, sql: str, value: int) -> int:
+        with self._lock:
+            connection = self._connection
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(sql, (value, self.name))
+                (next_id,) = connection.execute(
+                    "SELECT next_id FROM id_sequences WHERE name = ?", (self.name,)
+                ).fetchone()
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+        return next_id
+
+    def lease(self, size: int) -> Tuple[int, int]:
+        end = self._update(
+            "UPDATE id_sequences SET next_id = next_id + ? WHERE name = ?", size
+        )
+        return end - size, end
+
+    def advance_to(self, next_id: int) -> None:
+        self._update(
+            "UPDATE id_sequences SET next_id = MAX(next_id, ?) WHERE name = ?",
+            next_id,
+        )
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class IdAllocator:
+    """Allocates unique ids from blocks leased from a shared sequence.
+
+    Only leasing a new block touches the sequence; handing out an id from the
+    current block takes a lock private to this allocator. Ids are unique
+    across every allocator sharing the sequence, and increasing within one
+    allocator, but not dense: a block abandoned by a stopped worker leaves a
+    gap.
+    """
+
+    def __init__(
+        self,
+        source: Optional[LocalBlockSource | SQLiteBlockSource] = None,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> None:
+        self.source = source if source is not None else LocalBlockSource()
+        self.block_size = block_size
+        self._next_id = 0
+        self._end = 0
+        self._lock = threading.Lock()
+
+    def allocate(self) -> int:
+        with self._lock:
+            if self._next_id >= self._end:
+                self._next_id, self._end = self.source.lease(self.block_size)
+            allocated = self._next_id
+            self._next_id += 1
+        return allocated
+
+    def reserve_through(self, used_id: int) -> None:
+        """Make sure no id up to ``used_id`` is allocated from now on."""
+        with self._lock:
+            self.source.advance_to(used_id + 1)
+            if self._next_id <= used_id:
+                # Keep what is left of the current block, if anything
+                self._next_id = min(used_id + 1, self._end)
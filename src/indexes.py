@@ -0,0 +1,95 @@
+import base64
+import binascii
+import json
+from bisect import bisect_left, bisect_right, insort
+from typing import Iterator, List, Optional, Tuple
+
+# An index entry: the sort key followed by the record id as a tie-breaker
+IndexKey = Tuple[float, int]
+
+# Sorts after every record id, to bound a key range inclusively
+_MAX_ID = float("inf")
+
+
+class SortedIndex:
+    """Ordered list of ``(key, id)`` pairs supporting keyset pagination.
+
+    Keys are floats (prices, epoch timestamps) so that an entry can be
+    encoded into a cursor and found again exactly.
+    """
+
+    def __init__(self) -> None:
+        self._entries: List[IndexKey] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: float, item_id: int) -> None:
+        entry = (key, item_id)
+        # Appending is the common case: new orders have the latest created_at
+        if not self._entries or self._entries[-1] < entry:
+            self._entries.append(entry)
+        else:
+            insort(self._entries, entry)
+
+    def remove(self, key: float, item_id: int) -> None:
+        entry = (key, item_id)
+        position = bisect_left(self._entries, entry)
+        if position < len(self._entries) and self._entries[position] == entry:
+            del self._entries[position]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _range(self, lower: Optional[float], upper: Optional[float]) -> range:
+        """Positions of the entries whose key is within the inclusive bounds."""
+        entries = self._entries
+        start = 0 if lower is None else bisect_left(entries, (lower,))
+        stop = (
+            len(entries) if upper is None else bisect_right(entries, (upper, _MAX_ID))
+        )
+        return range(start, stop)
+
+    def count(
+        self, lower: Optional[float] = None, upper: Optional[float] = None
+    ) -> int:
+        return len(self._range(lower, upper))
+
+    def scan(
+        self,
+        after: Optional[IndexKey] = None,
+        descending: bool = False,
+        lower: Optional[float] = None,
+        upper: Optional[float] = None,
+    ) -> Iterator[IndexKey]:
+        """Yield entries in order, starting strictly after the ``after`` entry.
+
+        ``lower`` and ``upper`` bound the key inclusively.
+        """
+        entries = self._entries
+        bounds = self._range(lower, upper)
+        start, stop = bounds.start, bounds.stop
+        if descending:
+            if after is not None:
+                stop = min(stop, bisect_left(entries, after))
+            for position in range(stop - 1, start - 1, -1):
+                yield entries[position]
+        else:
+            if after is not None:
+                start = max(start, bisect_right(entries, after))
+            for position in range(start, stop):
+                yield entries[position]
+
+
+def encode_cursor(entry: IndexKey) -> str:
+    raw = json.dumps([entry[0], entry[1]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> IndexKey:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key, item_id = json.loads(raw)
+        return float(key), int(item_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,166 @@
+import heapq
+import os
+import threading
+import time
+from datetime import UTC, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .database import (
+    add_order_listener,
+    get_order_by_id,
+    iter_orders,
+    update_order_status,
+)
+from .models import OrderStatus
+
+# Off by default, so that the mock orders keep their statuses; with several
+# workers sharing a database, set ORDER_SCHEDULER=on for only one of them
+ORDER_SCHEDULER = os.getenv("ORDER_SCHEDULER", "off") == "on"
+
+# Status each open status moves on to, and the time an order spends in it
+# first, counted from its last change
+ORDER_LIFECYCLE: Dict[OrderStatus, Tuple[OrderStatus, timedelta]] = {
+    OrderStatus.PENDING: (OrderStatus.PROCESSING, timedelta(hours=1)),
+    OrderStatus.PROCESSING: (OrderStatus.SHIPPED, timedelta(days=1)),
+    OrderStatus.SHIPPED: (OrderStatus.DELIVERED, timedelta(days=2)),
+}
+# Longest sleep between looks at the queue, so that a change of the system
+# clock is noticed
+MAX_WAIT_SECONDS = 60.0
+# Delay before an order whose update failed is tried again
+RETRY_SECONDS = 30.0
+
+
+class OrderScheduler:
+    """Moves open orders through ``ORDER_LIFECYCLE``.
+
+    Each open order has one entry in a heap keyed on the end of its time in
+    its current status. A thread sleeps until the earliest entry is due, so
+    the work is per transition, not a periodic scan of every order. Every
+    order change reported by the storage listener queues the order to be
+    looked at again; heap entries superseded by an earlier one are skipped
+    when they come up.
+
+    Status changes, the scheduler's and cancellations alike, only apply to
+    an order still in the status it was read in, so neither overwrites the
+    other. Late orders are read from storage (``list_late_orders``), so they
+    are known whether the scheduler runs or not.
+    """
+
+    def __init__(
+        self,
+        lifecycle: Optional[Dict[OrderStatus, Tuple[OrderStatus, timedelta]]] = None,
+    ) -> None:
+        self.lifecycle = lifecycle or ORDER_LIFECYCLE
+        self._heap: List[Tuple[float, int]] = []
+        # Due time of the live heap entry of each queued order
+        self._due: Dict[int, float] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._listening = False
+        self.transitions = 0
+        self.errors = 0
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def start(self) -> None:
+        """Queue every open order and start moving them on, in a thread."""
+        if self._thread is not None:
+            return
+        if not self._listening:
+            add_order_listener(self._order_changed)
+            self._listening = True
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name="order-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        thread = self._thread
+        if thread is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        thread.join(timeout)
+        with self._condition:
+            self._thread = None
+            self._heap.clear()
+            self._due.clear()
+
+    def schedule(self, order_id: int, due: float) -> None:
+        """Look at an order again at ``due``, in epoch seconds, or earlier
+        if it is already queued for then."""
+        with self._condition:
+            current = self._due.get(order_id)
+            if current is not None and current <= due:
+                return
+            self._due[order_id] = due
+            heapq.heappush(self._heap, (due, order_id))
+            if self._heap[0] == (due, order_id):
+                self._condition.notify()
+
+    def _order_changed(self, order_id: int, user_id: int) -> None:
+        # Called by the storage backend, possibly with its write lock held,
+        # so the order is only queued here and read by the scheduler thread
+        if self._thread is not None:
+            self.schedule(order_id, time.time())
+
+    def _queue_open_orders(self) -> None:
+        for order in iter_orders():
+            if self._stopping:
+                return
+            status = OrderStatus(order["status"])
+            if status in self.lifecycle:
+                _, delay = self.lifecycle[status]
+                changed_at = order["updated_at"] or order["created_at"]
+                self.schedule(order["id"], (changed_at + delay).timestamp())
+
+    def _next_order(self) -> Optional[int]:
+        """Wait for the next due order and take it off the queue, or return
+        None once stopping."""
+        with self._condition:
+            while not self._stopping:
+                wait = MAX_WAIT_SECONDS
+                if self._heap:
+                    due, order_id = self._heap[0]
+                    wait = min(due - time.time(), wait)
+                    if wait <= 0:
+                        heapq.heappop(self._heap)
+                        if self._due.get(order_id) == due:
+                            del self._due[order_id]
+                            return order_id
+                        continue
+                self._condition.wait(wait)
+            return None
+
+    def _run(self) -> None:
+        self._queue_open_orders()
+        while (order_id := self._next_order()) is not None:
+            try:
+                self._advance(order_id)
+            except Exception:
+                # Counted with the database error that caused it; tried again
+                self.errors += 1
+                self.schedule(order_id, time.time() + RETRY_SECONDS)
+
+    def _advance(self, order_id: int) -> None:
+        order = get_order_by_id(order_id)
+        if order is None or order.status not in self.lifecycle:
+            return
+
+        next_status, delay = self.lifecycle[order.status]
+        due = (order.updated_at or order.created_at) + delay
+        if due <= datetime.now(UTC):
+            # Whether it applies or the order changed meanwhile, the change
+            # is reported to _order_changed, which queues the order again
+            if update_order_status(order_id, next_status, expected=order.status):
+                self.transitions += 1
+            return
+        self.schedule(order_id, due.timestamp())
+
+
+order_scheduler = OrderScheduler()
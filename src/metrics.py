@@ -0,0 +1,309 @@
+import time
+from bisect import bisect_left
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Upper bounds, in seconds, of the latency histogram buckets
+REQUEST_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+DATABASE_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 1.0,
+)  # fmt: skip
+LLM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Route label of requests that matched no route, so that scanned URLs do not
+# each get their own series
+UNMATCHED_ROUTE = "<unmatched>"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counts per label values.
+
+    Updates take no lock: they are plain increments, made from the event
+    loop and the request threadpool, and an increment racing one from
+    another thread can at worst be lost, which a counter of this kind can
+    afford.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[Tuple[str, Labels, Sequence[str], float]]:
+        for labels, value in list(self._values.items()):
+            yield self.name, self.labelnames, labels, value
+
+
+class _Buckets:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class Histogram:
+    """Distribution of observed values per label values.
+
+    Each observation increments one bucket, found by bisection; buckets are
+    only made cumulative when rendered. Updates take no lock, as for Counter.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = REQUEST_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values: Dict[Labels, _Buckets] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        buckets = self._values.get(labels)
+        if buckets is None:
+            # One more slot for values above the last bound
+            buckets = self._values.setdefault(labels, _Buckets(len(self.buckets) + 1))
+        buckets.counts[bisect_left(self.buckets, value)] += 1
+        buckets.sum += value
+
+    def samples(self) -> Iterable[Tuple[str, Labels, Sequence[str], float]]:
+        names = (*self.labelnames, "le")
+        for labels, buckets in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), buckets.counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    names,
+                    (*labels, _format_value(bound)),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", self.labelnames, labels, buckets.sum
+            yield f"{self.name}_count", self.labelnames, labels, cumulative
+
+
+class Collected:
+    """Values read from their owner at scrape time, such as cache statistics.
+
+    ``collect`` returns ``(label values, value)`` pairs; ``kind`` is
+    ``gauge`` or ``counter``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[Labels, float]]],
+        kind: str = "gauge",
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.kind = kind
+        self._collect = collect
+
+    def samples(self) -> Iterable[Tuple[str, Labels, Sequence[str], float]]:
+        for labels, value in self._collect():
+            yield self.name, self.labelnames, labels, value
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = REQUEST_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def collected(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Iterable[Tuple[Labels, float]]],
+        kind: str = "gauge",
+    ) -> Collected:
+        return self.register(Collected(name, help, labelnames, collect, kind))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labelnames, labels, value in metric.samples():
+                lines.append(
+                    f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "Time to handle an HTTP request, until its response is fully sent",
+    ("method", "route", "status"),
+)
+database_duration = registry.histogram(
+    "database_operation_duration_seconds",
+    "Time spent in each src.database operation",
+    ("operation",),
+    DATABASE_BUCKETS,
+)
+database_errors = registry.counter(
+    "database_operation_errors_total",
+    "src.database operations that raised",
+    ("operation",),
+)
+llm_duration = registry.histogram(
+    "llm_request_duration_seconds",
+    "Time to get a chat completion from the model, until its last token for"
+    " streams; completions answered from the cache are not included",
+    ("kind",),
+    LLM_BUCKETS,
+)
+chat_tool_duration = registry.histogram(
+    "chat_tool_duration_seconds",
+    "Time to run a chat agent tool call",
+    ("tool", "outcome"),
+    DATABASE_BUCKETS,
+)
+
+
+def timed(histogram: Histogram, errors: Optional[Counter] = None, name: str = ""):
+    """Decorate a function to observe its duration, labelled with ``name``
+    or the function's name."""
+
+    def decorator(function: Callable) -> Callable:
+        label = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(label)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start, label)
+
+        return wrapper
+
+    return decorator
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them per route.
+
+    Requests are labelled with the path template of the route they matched
+    (``/orders/{order_id}``), not the raw path, so the number of series
+    stays bounded.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        self._route_paths: Dict[object, str] = {}
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self._route_path(scope)
+            labels = (scope["method"], route, str(status_code))
+            http_requests.inc(*labels)
+            http_request_duration.observe(time.perf_counter() - start, *labels)
+
+    def _route_path(self, scope) -> str:
+        # The router records the matched route (or at least its endpoint) in
+        # the scope it was called with
+        route = scope.get("route")
+        if route is not None and getattr(route, "path", None):
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        path = self._route_paths.get(endpoint)
+        if path is None:
+            app = scope.get("app")
+            path = next(
+                (
+                    candidate.path
+                    for candidate in getattr(app, "routes", ())
+                    if getattr(candidate, "endpoint", None) is endpoint
+                ),
+                UNMATCHED_ROUTE,
+            )
+            self._route_paths[endpoint] = path
+        return path
@@ -2,7 +2,7 @@ from datetime import datetime
 from enum import Enum
 from typing import List, Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 
 class UserRole(str, Enum):
@@ -27,6 +27,9 @@ class OrderStatus(str, Enum):
 
 
 class Product(BaseModel):
+    # Validated products are shared between orders, so they must not change
+    model_config = ConfigDict(frozen=True)
+
     id: int
     name: str
     description: str
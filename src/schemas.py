@@ -1,10 +1,9 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional, Literal
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 from .models import OrderStatus, UserRole
-from openai.types.chat import ChatCompletionMessage
 
 
 class UserBase(BaseModel):
@@ -51,13 +50,18 @@ class ProductResponse(ProductBase):
     id: int
 
 
+class ProductSearchResult(ProductResponse):
+    score: float  # BM25 relevance, higher is better
+
+
 class OrderItem(BaseModel):
     id: int
-    quantity: int = Field(gt=0)  # Ensure quantity is greater than 0
+    # Greater than 0, and small enough for every backend to store
+    quantity: int = Field(gt=0, le=2**31 - 1)
 
 
 class OrderBase(BaseModel):
-    items: List[OrderItem]  # Changed from single product to list of items
+    items: List[OrderItem] = Field(min_length=1)  # At least one item
 
 
 class OrderCreate(OrderBase):
@@ -76,5 +80,84 @@ class OrderResponse(BaseModel):
     products: Optional[List[ProductResponse]] = None
 
 
-class ChatMessage(ChatCompletionMessage):
+class BulkOrderEntry(OrderBase):
+    # Admin only: create the order for this user instead of the caller
+    user_id: Optional[int] = None
+
+
+class BulkOrderCreate(BaseModel):
+    orders: List[BulkOrderEntry] = Field(min_length=1, max_length=1000)
+
+
+class BulkOrderResult(BaseModel):
+    index: int  # Position of the order in the request
+    status_code: int
+    order: Optional[OrderResponse] = None
+    error: Optional[str] = None
+
+
+class BulkOrderResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkOrderResult]
+
+
+class StatusSales(BaseModel):
+    status: OrderStatus
+    orders: int
+    revenue: float  # Total of the orders in this status
+
+
+class SalesSummary(BaseModel):
+    orders: int
+    units: int  # Units sold in orders that are not cancelled
+    revenue: float  # Total of the orders that are not cancelled
+    by_status: List[StatusSales]
+
+
+class ProductSales(BaseModel):
+    product_id: int
+    units: int
+    revenue: float
+
+
+class DailySales(BaseModel):
+    day: date
+    orders: int
+    revenue: float
+
+
+class ChatToolCallFunction(BaseModel):
+    name: str
+    arguments: str  # JSON encoded
+
+
+class ChatToolCall(BaseModel):
+    id: str
+    type: Literal["function"] = "function"
+    function: ChatToolCallFunction
+
+
+class ChatMessage(BaseModel):
+    # Same shape as the OpenAI chat messages, without importing the client
+    # library; other fields they carry are kept as they are
+    model_config = ConfigDict(extra="allow")
+
     role: Literal["user", "assistant", "system", "tool"]
+    content: Optional[str] = None
+    tool_calls: Optional[List[ChatToolCall]] = None
+    tool_call_id: Optional[str] = None
+    name: Optional[str] = None
+
+
+class ChatSessionMessage(BaseModel):
+    content: str = Field(..., min_length=1)
+
+
+class ChatSessionResponse(BaseModel):
+    session_id: str
+    user_id: int
+    message_count: int
+    token_count: int
+    token_budget: int
+    dropped_turns: int
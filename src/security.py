@@ -1,31 +1,175 @@
+import asyncio
 import hashlib
+import os
 import secrets
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, NamedTuple, Optional, Tuple
 
+# PBKDF2-HMAC-SHA256 work factor; OWASP recommends at least 600,000
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000"))
+# Hashes run concurrently, and hashes allowed to wait for a worker before
+# new ones are refused
+PASSWORD_HASH_WORKERS = int(
+    os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))
+)
+PASSWORD_HASH_QUEUE_LIMIT = int(
+    os.getenv("PASSWORD_HASH_QUEUE_LIMIT", str(8 * PASSWORD_HASH_WORKERS))
+)
+# "thread" (hashlib releases the GIL while hashing) or "process"
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
 
-def _hash_password(password: str, salt: str | None = None) -> tuple[str, str]:
+_ALGORITHM = "pbkdf2_sha256"
+
+
+def _hash_password(
+    password: str, salt: str | None = None, iterations: int = PASSWORD_HASH_ITERATIONS
+) -> tuple[str, str]:
     if salt is None:
         salt = secrets.token_hex(16)
-    # Combine password and salt
-    salted = (password + salt).encode()
-    # Use SHA256 for hashing
-    hashed = hashlib.sha256(salted).hexdigest()
+    hashed = hashlib.pbkdf2_hmac(
+        "sha256", password.encode(), salt.encode(), iterations
+    ).hex()
     return hashed, salt
 
 
+def _legacy_hash_password(password: str, salt: str) -> str:
+    # Single salted SHA256, used before PBKDF2; only verified, never created
+    return hashlib.sha256((password + salt).encode()).hexdigest()
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    # Split the stored hash into hash and salt
     try:
-        stored_hash, salt = hashed_password.split(":")
-        # Hash the plain password with the same salt
-        calculated_hash, _ = _hash_password(plain_password, salt)
+        if hashed_password.startswith(f"{_ALGORITHM}$"):
+            _, iterations, salt, stored_hash = hashed_password.split("$")
+            calculated_hash, _ = _hash_password(plain_password, salt, int(iterations))
+        else:
+            stored_hash, salt = hashed_password.split(":")
+            calculated_hash = _legacy_hash_password(plain_password, salt)
         # Compare the hashes
         return secrets.compare_digest(stored_hash, calculated_hash)
     except ValueError:
         return False
 
 
-def get_password_hash(password: str) -> str:
-    # Generate a hash and salt for the password
-    hashed, salt = _hash_password(password)
-    # Return the combined hash:salt string
-    return f"{hashed}:{salt}"
+def get_password_hash(password: str, salt: str | None = None) -> str:
+    hashed, salt = _hash_password(password, salt)
+    return f"{_ALGORITHM}${PASSWORD_HASH_ITERATIONS}${salt}${hashed}"
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Whether the hash uses an older scheme or work factor than the current."""
+    return not hashed_password.startswith(f"{_ALGORITHM}${PASSWORD_HASH_ITERATIONS}$")
+
+
+# Verified in place of a missing user's hash, so that unknown usernames take
+# as long to reject as wrong passwords
+DUMMY_PASSWORD_HASH = f"{_ALGORITHM}${PASSWORD_HASH_ITERATIONS}${'0' * 32}${'0' * 64}"
+
+
+class HashingOverloaded(Exception):
+    """Raised when every worker is busy and the queue is full."""
+
+
+class HashTiming(NamedTuple):
+    queue_seconds: float
+    hash_seconds: float
+
+
+def _timed(function: Callable[..., Any], *args: Any) -> Tuple[Any, float]:
+    # Runs in the worker, so the duration excludes time spent queued
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def _percentile(ordered: list, q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class PasswordHasher:
+    """Runs password hashing in a worker pool, off the event loop.
+
+    At most ``workers`` hashes run at once and ``queue_limit`` more may wait;
+    beyond that ``run`` raises HashingOverloaded instead of queueing, so a
+    login storm is shed rather than delaying every login. The queue and hash
+    time of recent calls are kept for ``stats``.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        queue_limit: int = PASSWORD_HASH_QUEUE_LIMIT,
+        kind: str = PASSWORD_HASH_EXECUTOR,
+    ) -> None:
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {kind}")
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.kind = kind
+        self._executor: Optional[Executor] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timings: deque[HashTiming] = deque(maxlen=1024)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def run(
+        self, function: Callable[..., Any], *args: Any
+    ) -> Tuple[Any, HashTiming]:
+        """Run ``function(*args)`` in the pool and return its result and timing."""
+        if self.in_flight >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HashingOverloaded()
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            result, hash_seconds = await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), _timed, function, *args
+            )
+        finally:
+            self.in_flight -= 1
+        timing = HashTiming(time.perf_counter() - start - hash_seconds, hash_seconds)
+        self.completed += 1
+        self.timings.append(timing)
+        return result, timing
+
+    async def verify(
+        self, plain_password: str, hashed_password: str
+    ) -> Tuple[bool, HashTiming]:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        hash_times = sorted(timing.hash_seconds for timing in self.timings)
+        queue_times = sorted(timing.queue_seconds for timing in self.timings)
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "hash_seconds_p50": _percentile(hash_times, 0.5),
+            "hash_seconds_p95": _percentile(hash_times, 0.95),
+            "queue_seconds_p50": _percentile(queue_times, 0.5),
+            "queue_seconds_p95": _percentile(queue_times, 0.95),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,163 @@
+import asyncio
+import os
+import secrets
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from .schemas import ChatMessage
+
+# Context kept per conversation, in estimated model tokens
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "4000"))
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "10000"))
+
+# Rough token count per character of English text, and per-message overhead
+_CHARS_PER_TOKEN = 4
+_TOKENS_PER_MESSAGE = 4
+
+
+def estimate_tokens(message: ChatMessage) -> int:
+    """Approximate the tokens a message costs, without a tokenizer."""
+    chars = len(message.content or "")
+    for tool_call in message.tool_calls or ():
+        chars += len(tool_call.function.name) + len(tool_call.function.arguments)
+    return chars // _CHARS_PER_TOKEN + _TOKENS_PER_MESSAGE
+
+
+class ChatSession:
+    """A conversation kept server-side, so clients only send new messages.
+
+    Once the history exceeds ``token_budget``, the oldest turns (a user
+    message and every reply to it) are dropped whole, so a tool result is
+    never separated from the call it answers. System messages at the start
+    and the latest turn are always kept.
+
+    ``user_id`` is the user the assistant answers as, and ``owner_id`` the
+    logged-in user who created the session, the only one who may use it;
+    they differ when an admin chats as another user.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        user_id: int,
+        token_budget: int,
+        owner_id: Optional[int] = None,
+    ) -> None:
+        self.id = session_id
+        self.user_id = user_id
+        self.owner_id = user_id if owner_id is None else owner_id
+        self.token_budget = token_budget
+        self.messages: List[ChatMessage] = []
+        self.dropped_turns = 0
+        # Serializes turns, so concurrent requests cannot interleave them
+        self.lock = asyncio.Lock()
+
+    @property
+    def token_count(self) -> int:
+        return sum(estimate_tokens(message) for message in self.messages)
+
+    def begin_turn(self, content: str) -> List[ChatMessage]:
+        """Return the messages to send to the model for a new user message."""
+        return [*self.messages, ChatMessage(role="user", content=content)]
+
+    def end_turn(self, messages: List[ChatMessage]) -> List[ChatMessage]:
+        """Store the answered conversation and return this turn's replies."""
+        last_user = max(
+            index for index, message in enumerate(messages) if message.role == "user"
+        )
+        self.messages = messages
+        self.compact()
+        return messages[last_user + 1 :]
+
+    def compact(self) -> None:
+        messages = self.messages
+        head = 0
+        while head < len(messages) and messages[head].role == "system":
+            head += 1
+        turn_starts = [
+            index
+            for index in range(head, len(messages))
+            if messages[index].role == "user"
+        ]
+        tokens = [estimate_tokens(message) for message in messages]
+        budget = self.token_budget - sum(tokens[:head])
+        # Keep the newest turns that fit, always including the latest one
+        keep_from = len(messages)
+        for start in reversed(turn_starts):
+            cost = sum(tokens[start:keep_from])
+            if cost > budget and keep_from < len(messages):
+                break
+            budget -= cost
+            keep_from = start
+        if keep_from > head:
+            self.dropped_turns += sum(1 for start in turn_starts if start < keep_from)
+            self.messages = messages[:head] + messages[keep_from:]
+
+
+class SessionStore:
+    """Chat sessions by id, bounded in count and idle time.
+
+    A session expires ``ttl`` seconds after it was last used, and the least
+    recently used session is evicted once ``max_size`` is reached.
+    """
+
+    def __init__(
+        self,
+        max_size: int = SESSION_MAX_COUNT,
+        ttl: float = SESSION_TTL_SECONDS,
+        token_budget: int = SESSION_TOKEN_BUDGET,
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.token_budget = token_budget
+        self._sessions: OrderedDict[str, Tuple[ChatSession, float]] = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, user_id: int, owner_id: Optional[int] = None) -> ChatSession:
+        self._expire()
+        while len(self._sessions) >= self.max_size:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+        session = ChatSession(
+            secrets.token_urlsafe(16), user_id, self.token_budget, owner_id
+        )
+        self._sessions[session.id] = (session, time.monotonic() + self.ttl)
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        session, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._sessions[session_id]
+            self.expirations += 1
+            return None
+        self._sessions[session_id] = (session, time.monotonic() + self.ttl)
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        return self._sessions.pop(session_id, None) is not None
+
+    def clear(self) -> None:
+        self._sessions.clear()
+
+    def _expire(self) -> None:
+        # Entries are in order of last use, so expired ones are at the front
+        now = time.monotonic()
+        while self._sessions:
+            _, expires_at = next(iter(self._sessions.values()))
+            if expires_at > now:
+                break
+            self._sessions.popitem(last=False)
+            self.expirations += 1
+
+
+chat_sessions = SessionStore()
@@ -0,0 +1,37 @@
+"""
+Storage backends behind the functions exported by ``src.database``.
+"""
+
+from typing import Optional
+
+from .base import ORDER_SORT_FIELDS, PRODUCT_SORT_FIELDS, StorageBackend
+from .memory import MemoryBackend
+from .sqlite import SQLiteBackend
+
+__all__ = [
+    "ORDER_SORT_FIELDS",
+    "PRODUCT_SORT_FIELDS",
+    "MemoryBackend",
+    "SQLiteBackend",
+    "StorageBackend",
+    "create_backend",
+]
+
+
+def create_backend(url: str, id_sequence_path: Optional[str] = None) -> StorageBackend:
+    """Create a backend from a URL.
+
+    - ``memory://``: process-local dicts (the default). ``id_sequence_path``
+      names a SQLite file from which workers lease order and product ids
+    - ``sqlite:///relative/path.db``, ``sqlite:////absolute/path.db``: a
+      SQLite database file
+    - ``sqlite://`` or ``sqlite:///:memory:``: a private in-memory SQLite
+      database
+    """
+    scheme, _, rest = url.partition("://")
+    if scheme == "memory":
+        return MemoryBackend(id_sequence_path)
+    if scheme == "sqlite":
+        path = rest[1:] if rest.startswith("/") else rest
+        return SQLiteBackend(path or ":memory:")
+    raise ValueError(f"Unsupported database URL: {url}")
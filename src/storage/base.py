@@ -0,0 +1,293 @@
+from abc import ABC, abstractmethod
+from datetime import UTC, date, datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ..models import Order, OrderStatus, Product
+from ..schemas import OrderCreate, ProductCreate, UserInDB
+
+ORDER_SORT_FIELDS = ("created_at", "total_price")
+PRODUCT_SORT_FIELDS = ("id", "price")
+# Statuses of orders not yet delivered nor cancelled, which are late once
+# their delivery date passes
+OPEN_ORDER_STATUSES = frozenset(
+    {OrderStatus.PENDING, OrderStatus.PROCESSING, OrderStatus.SHIPPED}
+)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def to_micros(value: Optional[datetime]) -> Optional[int]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def from_micros(value: Optional[int]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return _EPOCH + timedelta(microseconds=value)
+
+
+class StorageBackend(ABC):
+    """Storage operations behind the functions exported by ``src.database``.
+
+    Records cross this interface as plain dicts shaped like the mock data in
+    ``src.data`` when loading, and as validated models when read back.
+    Listeners registered with ``add_user_listener`` are called with the user
+    id whenever a stored user is replaced or removed, and listeners
+    registered with ``add_order_listener`` with the order id and its user id
+    whenever an order is stored or its status changes.
+
+    Backends keep sales aggregates (see ``SalesTotals``) up to date on every
+    order write, so the ``get_sales_by_*`` queries read buckets instead of
+    scanning orders. Amounts are returned in integer cents.
+    """
+
+    def __init__(self) -> None:
+        self.user_listeners: List[Callable[[int], None]] = []
+        self.order_listeners: List[Callable[[int, int], None]] = []
+
+    def add_user_listener(self, listener: Callable[[int], None]) -> None:
+        self.user_listeners.append(listener)
+
+    def _notify_user_changed(self, user_id: int) -> None:
+        for listener in self.user_listeners:
+            listener(user_id)
+
+    def add_order_listener(self, listener: Callable[[int, int], None]) -> None:
+        self.order_listeners.append(listener)
+
+    def _notify_order_changed(self, order_id: int, user_id: int) -> None:
+        for listener in self.order_listeners:
+            listener(order_id, user_id)
+
+    # Lifecycle
+    @abstractmethod
+    def load(
+        self,
+        users: Iterable[dict] = (),
+        products: Iterable[dict] = (),
+        orders: Iterable[dict] = (),
+    ) -> None:
+        """Insert or replace records, keeping their ids."""
+
+    @abstractmethod
+    def is_empty(self) -> bool: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    def close(self) -> None:
+        pass
+
+    # User operations
+    @abstractmethod
+    def get_user_by_id(self, user_id: int) -> Optional[UserInDB]: ...
+
+    @abstractmethod
+    def get_user_by_username(self, username: str) -> Optional[UserInDB]: ...
+
+    @abstractmethod
+    def get_user_by_email(self, email: str) -> Optional[UserInDB]: ...
+
+    def add_user(self, user: dict) -> UserInDB:
+        self.load(users=[user])
+        return self.get_user_by_id(user["id"])
+
+    # Product operations
+    @abstractmethod
+    def get_product_by_id(self, product_id: int) -> Optional[Product]: ...
+
+    @abstractmethod
+    def get_products_by_ids(self, product_ids: Iterable[int]) -> Dict[int, Product]:
+        """Resolve each distinct product id once; unknown ids are left out."""
+
+    @abstractmethod
+    def get_all_products(self) -> List[Product]: ...
+
+    @abstractmethod
+    def list_products(
+        self,
+        sort_by: str = "id",
+        descending: bool = False,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Product], Optional[str]]:
+        """Return one page of products and the cursor of the next page, if any."""
+
+    @abstractmethod
+    def get_catalog_version(self) -> int:
+        """Counter that changes whenever a product is created or deleted."""
+
+    @abstractmethod
+    def create_product(self, product: ProductCreate) -> Product: ...
+
+    @abstractmethod
+    def delete_product_by_id(self, product_id: int) -> None: ...
+
+    @abstractmethod
+    def search_products(
+        self,
+        query: str,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 20,
+    ) -> List[Tuple[Product, float]]:
+        """Products matching every term of ``query``, best first, with scores.
+
+        Terms match as prefixes of the words in product names and
+        descriptions and are ranked by BM25, with the name weighing twice
+        as much as the description. Prices are filtered inclusively.
+        """
+
+    # Order operations
+    @abstractmethod
+    def get_order_by_id(self, order_id: int) -> Optional[Order]: ...
+
+    @abstractmethod
+    def get_orders_by_ids(self, order_ids: Iterable[int]) -> Dict[int, Order]:
+        """Resolve each distinct order id once; unknown ids are left out."""
+
+    @abstractmethod
+    def get_orders_by_user(self, user_id: int) -> List[Order]: ...
+
+    @abstractmethod
+    def get_all_orders(self) -> List[Order]: ...
+
+    @abstractmethod
+    def list_orders(
+        self,
+        user_id: Optional[int] = None,
+        status: Optional[OrderStatus] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        sort_by: str = "created_at",
+        descending: bool = True,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Order], Optional[str]]:
+        """Return one page of orders and the cursor of the next page, if any."""
+
+    @abstractmethod
+    def iter_orders(self, since: Optional[datetime] = None) -> Iterator[dict]:
+        """Yield stored orders in id order without materializing a list.
+
+        With ``since``, only orders created or updated at or after it are
+        yielded.
+        """
+
+    @abstractmethod
+    def list_late_orders(
+        self, now: datetime, user_id: Optional[int] = None, limit: int = 100
+    ) -> List[Order]:
+        """Open orders whose delivery date is at or before ``now``, most
+        overdue first, optionally of one user."""
+
+    @abstractmethod
+    def count_late_orders(self, now: datetime) -> int: ...
+
+    @abstractmethod
+    def get_product_order_count(self, product_id: int) -> int:
+        """Number of orders, in any status, that include the product."""
+
+    @abstractmethod
+    def create_order(self, user_id: int, order: OrderCreate) -> Order: ...
+
+    @abstractmethod
+    def create_orders(
+        self, orders: List[Tuple[int, OrderCreate]]
+    ) -> List[Union[Order, ValueError]]:
+        """Create many ``(user_id, order)`` pairs in one pass.
+
+        The catalog is read once for the whole batch. Each position of the
+        result holds the created order, or the ``ValueError`` explaining why
+        that order was rejected; the other orders are still created.
+        """
+
+    @staticmethod
+    def new_order(
+        user_id: int,
+        order: OrderCreate,
+        products: Dict[int, Product],
+        created_at: datetime,
+    ) -> dict:
+        """Price an order at current prices into a record without an id.
+
+        Raises ValueError when one of its products does not exist.
+        """
+        total_price = 0.0
+        for item in order.items:
+            product = products.get(item.id)
+            if not product:
+                raise ValueError("Product not found")
+            total_price += item.quantity * product.price
+        return {
+            "id": None,
+            "user_id": user_id,
+            "items": [item.model_dump() for item in order.items],
+            "total_price": round(total_price, 2),
+            "status": OrderStatus.PENDING,
+            "created_at": created_at,
+            "updated_at": None,
+            "delivery_date": created_at + timedelta(days=7),
+        }
+
+    @staticmethod
+    def stored_order(record: dict) -> Order:
+        """Build an Order from a record that was validated when it was stored.
+
+        Stored values already have their final types, so strict validation
+        only rebuilds the model, without coercing anything. It runs in
+        pydantic-core, and is several times faster than ``model_construct``
+        with nested items.
+        """
+        return Order.model_validate(
+            {**record, "status": OrderStatus(record["status"])}, strict=True
+        )
+
+    @abstractmethod
+    def update_order_status(
+        self, order_id: int, status: str, expected: Optional[OrderStatus] = None
+    ) -> Optional[Order]:
+        """Set the status of an order and return it, or None if there is none.
+
+        With ``expected``, the order is only changed while it is still in
+        that status, and None is returned otherwise.
+        """
+
+    # Sales analytics
+    @abstractmethod
+    def get_sales_by_status(self) -> Dict[OrderStatus, Tuple[int, int]]:
+        """``(orders, cents)`` per status, for statuses with orders."""
+
+    @abstractmethod
+    def get_sales_by_product(self) -> Dict[int, Tuple[int, int]]:
+        """``(units, cents)`` per product id, over orders not cancelled."""
+
+    @abstractmethod
+    def get_sales_by_day(
+        self, start: Optional[date] = None, end: Optional[date] = None
+    ) -> Dict[date, Tuple[int, int]]:
+        """``(orders, cents)`` per UTC day of creation, over orders not
+        cancelled, in day order; ``start`` and ``end`` are inclusive."""
+
+    def add_products_details(self, orders: List[Order]) -> List[Order]:
+        """Attach product details to a page of orders.
+
+        The distinct product ids across all orders are resolved once and the
+        same immutable Product instances are shared between orders. Orders
+        are copied rather than changed, since backends may hand out the same
+        validated instance on every read.
+        """
+        products = self.get_products_by_ids(
+            item.id for order in orders for item in order.items
+        )
+        return [
+            order.model_copy(
+                update={"products": [products.get(item.id) for item in order.items]}
+            )
+            for order in orders
+        ]
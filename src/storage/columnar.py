@@ -0,0 +1,199 @@
+import threading
+from array import array
+from datetime import datetime
+from typing import Iterator, Optional
+
+from ..models import Order, OrderStatus
+from .base import from_micros, to_micros
+
+_STATUSES = list(OrderStatus)
+_STATUS_CODES = {status: code for code, status in enumerate(_STATUSES)}
+# Status code of an id with no stored order
+_ABSENT = 0xFF
+# Timestamp standing for an unset updated_at
+_NO_TIME = -(2**63)
+
+
+class OrderStore:
+    """Orders packed into typed arrays, one column per field.
+
+    A dict per order, with a ``datetime`` per timestamp and a dict per item,
+    costs around a kilobyte; packed, an order takes a few dozen bytes.
+    Statuses are small ints, timestamps integer microseconds since the epoch
+    (UTC), and the items of every order share two arrays of product ids and
+    quantities, each order holding the offset and count of its own.
+
+    Columns are indexed by order id, which suits the dense ids handed out by
+    ``IdAllocator``; ids with no order hold an absent status. Records are
+    only decoded, into dicts shaped like the stored ones, when read.
+    Replacing an order appends its items again and leaves the old ones
+    unused, so this is for stores where orders are rarely replaced.
+
+    An order spans several columns, so writes and ``record`` hold a lock:
+    readers on other threads, such as exports, never see an order that is
+    only partly written.
+    """
+
+    def __init__(self) -> None:
+        self._status = array("B")
+        self._user_id = array("q")
+        self._total_price = array("d")
+        self._created_at = array("q")
+        self._updated_at = array("q")
+        self._delivery_date = array("q")
+        self._items_start = array("q")
+        self._items_count = array("I")
+        self._item_ids = array("q")
+        self._item_quantities = array("I")
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _columns(self):
+        return (
+            self._status,
+            self._user_id,
+            self._total_price,
+            self._created_at,
+            self._updated_at,
+            self._delivery_date,
+            self._items_start,
+            self._items_count,
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, order_id: int) -> bool:
+        return 0 <= order_id < len(self._status) and self._status[order_id] != _ABSENT
+
+    def __iter__(self) -> Iterator[int]:
+        status = self._status
+        return (
+            order_id for order_id in range(len(status)) if status[order_id] != _ABSENT
+        )
+
+    def nbytes(self) -> int:
+        """Bytes held by the columns, including unused item slots."""
+        columns = (*self._columns(), self._item_ids, self._item_quantities)
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def _reserve(self, order_id: int) -> None:
+        missing = order_id + 1 - len(self._status)
+        if missing <= 0:
+            return
+        self._status.frombytes(bytes([_ABSENT]) * missing)
+        for column in self._columns()[1:]:
+            column.frombytes(bytes(missing * column.itemsize))
+
+    def add(self, order: Order) -> None:
+        """Store a validated order, replacing any with the same id."""
+        order_id = order.id
+        if order_id < 1:
+            raise ValueError(f"Invalid order id: {order_id}")
+        # Packed before anything is stored, so a value that does not fit
+        # leaves the store unchanged; OrderCreate bounds quantities well
+        # below, so this only guards against records loaded from elsewhere
+        try:
+            item_ids = array("q", [item.id for item in order.items])
+            quantities = array("I", [item.quantity for item in order.items])
+        except OverflowError as e:
+            raise ValueError(f"Order {order_id} has an item out of range") from e
+        row = (
+            _STATUS_CODES[order.status],
+            order.user_id,
+            order.total_price,
+            to_micros(order.created_at),
+            to_micros(order.updated_at) if order.updated_at else _NO_TIME,
+            to_micros(order.delivery_date),
+            len(self._item_ids),
+            len(item_ids),
+        )
+
+        with self._lock:
+            self._reserve(order_id)
+            if self._status[order_id] == _ABSENT:
+                self._count += 1
+            self._item_ids.extend(item_ids)
+            self._item_quantities.extend(quantities)
+            for column, value in zip(self._columns(), row):
+                column[order_id] = value
+
+    def record(self, order_id: int) -> Optional[dict]:
+        """Decode a stored order into a dict, or None if there is none."""
+        with self._lock:
+            if order_id not in self:
+                return None
+            start = self._items_start[order_id]
+            end = start + self._items_count[order_id]
+            item_ids = self._item_ids[start:end]
+            quantities = self._item_quantities[start:end]
+            user_id = self._user_id[order_id]
+            total_price = self._total_price[order_id]
+            status = self._status[order_id]
+            created_at = self._created_at[order_id]
+            updated_at = self._updated_at[order_id]
+            delivery_date = self._delivery_date[order_id]
+        # Decoded once the lock is released
+        return {
+            "id": order_id,
+            "user_id": user_id,
+            "items": [
+                {"id": product_id, "quantity": quantity}
+                for product_id, quantity in zip(item_ids, quantities)
+            ],
+            "total_price": total_price,
+            "status": _STATUSES[status],
+            "created_at": from_micros(created_at),
+            "updated_at": None if updated_at == _NO_TIME else from_micros(updated_at),
+            "delivery_date": from_micros(delivery_date),
+        }
+
+    def records(self, since: Optional[datetime] = None) -> Iterator[dict]:
+        """Yield stored orders in id order, decoded one at a time.
+
+        With ``since``, only orders created or updated at or after it are
+        decoded and yielded. Orders stored during iteration beyond the
+        highest id at its start are not yielded.
+        """
+        floor = to_micros(since) if since is not None else None
+        for order_id in range(1, len(self._status)):
+            if floor is not None:
+                with self._lock:
+                    if order_id not in self:
+                        continue
+                    changed_at = self._updated_at[order_id]
+                    if changed_at == _NO_TIME:
+                        changed_at = self._created_at[order_id]
+                if changed_at < floor:
+                    continue
+            # None once the store was cleared meanwhile
+            record = self.record(order_id)
+            if record is not None:
+                yield record
+
+    def status(self, order_id: int) -> OrderStatus:
+        return _STATUSES[self._status[order_id]]
+
+    def created_at(self, order_id: int) -> float:
+        """Creation time of a stored order, in epoch seconds."""
+        return self._created_at[order_id] / 1_000_000
+
+    def delivery_date(self, order_id: int) -> float:
+        """Delivery date of a stored order, in epoch seconds."""
+        return self._delivery_date[order_id] / 1_000_000
+
+    def set_status(
+        self, order_id: int, status: OrderStatus, updated_at: datetime
+    ) -> None:
+        code, changed_at = _STATUS_CODES[OrderStatus(status)], to_micros(updated_at)
+        with self._lock:
+            if order_id not in self:
+                raise KeyError(order_id)
+            self._status[order_id] = code
+            self._updated_at[order_id] = changed_at
+
+    def clear(self) -> None:
+        with self._lock:
+            for column in (*self._columns(), self._item_ids, self._item_quantities):
+                del column[:]
+            self._count = 0
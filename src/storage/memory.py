@@ -0,0 +1,606 @@
+import threading
+from datetime import UTC, date, datetime
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ..ids import IdAllocator, LocalBlockSource, SQLiteBlockSource
+from ..indexes import SortedIndex, decode_cursor, encode_cursor
+from ..models import Order, OrderStatus, Product
+from ..schemas import OrderCreate, ProductCreate, UserInDB
+from .base import (
+    OPEN_ORDER_STATUSES,
+    ORDER_SORT_FIELDS,
+    PRODUCT_SORT_FIELDS,
+    StorageBackend,
+    to_micros,
+)
+from .columnar import OrderStore
+from .sales import SalesTotals
+from .search import ProductSearchIndex
+
+
+class UserStore:
+    """In-memory users table with unique indexes on username and email.
+
+    Each record is validated into a ``UserInDB`` once, when it is added, and
+    the same instance is handed out on every lookup. Callers must treat the
+    returned users as read-only.
+
+    Listeners registered with ``add_listener`` are called with the user id
+    whenever a user record is replaced or removed, so caches derived from it
+    can drop stale entries.
+    """
+
+    def __init__(self) -> None:
+        self._rows: Dict[int, dict] = {}
+        self._models: Dict[int, UserInDB] = {}
+        self._by_username: Dict[str, int] = {}
+        self._by_email: Dict[str, int] = {}
+        self._listeners: List[Callable[[int], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, user_id: object) -> bool:
+        return user_id in self._rows
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._rows)
+
+    def values(self):
+        return self._rows.values()
+
+    def add_listener(self, listener: Callable[[int], None]) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self, user_id: int) -> None:
+        for listener in self._listeners:
+            listener(user_id)
+
+    def add(self, user: dict) -> UserInDB:
+        """Insert or replace a user, keeping both indexes consistent."""
+        model = UserInDB(**user)
+        email_key = model.email.lower()
+
+        owner = self._by_username.get(model.username)
+        if owner is not None and owner != model.id:
+            raise ValueError("Username already registered")
+        owner = self._by_email.get(email_key)
+        if owner is not None and owner != model.id:
+            raise ValueError("Email already registered")
+
+        previous = self._models.get(model.id)
+        if previous is not None:
+            del self._by_username[previous.username]
+            del self._by_email[previous.email.lower()]
+
+        self._rows[model.id] = user
+        self._models[model.id] = model
+        self._by_username[model.username] = model.id
+        self._by_email[email_key] = model.id
+        if previous is not None:
+            self._notify(model.id)
+        return model
+
+    def get(self, user_id: int) -> Optional[UserInDB]:
+        return self._models.get(user_id)
+
+    def get_by_username(self, username: str) -> Optional[UserInDB]:
+        user_id = self._by_username.get(username)
+        if user_id is None:
+            return None
+        return self._models[user_id]
+
+    def get_by_email(self, email: str) -> Optional[UserInDB]:
+        user_id = self._by_email.get(email.lower())
+        if user_id is None:
+            return None
+        return self._models[user_id]
+
+    def clear(self) -> None:
+        user_ids = list(self._rows)
+        self._rows.clear()
+        self._models.clear()
+        self._by_username.clear()
+        self._by_email.clear()
+        for user_id in user_ids:
+            self._notify(user_id)
+
+
+class MemoryBackend(StorageBackend):
+    """Process-local storage in dicts, with secondary and ordered indexes.
+
+    Orders are packed into an ``OrderStore`` and decoded into ``Order``
+    models only when read.
+
+    Writes are serialized by a lock so that concurrent threads keep the
+    indexes consistent. Order and product ids come from ``IdAllocator``s;
+    with ``id_sequence_path`` they are leased from a SQLite file, so that
+    several worker processes never hand out the same id.
+    """
+
+    def __init__(self, id_sequence_path: Optional[str] = None) -> None:
+        super().__init__()
+        self._write_lock = threading.RLock()
+        self.users_db = UserStore()
+        self.users_db.add_listener(self._notify_user_changed)
+        self.orders_db = OrderStore()
+        self.products_db: Dict[int, dict] = {}
+        # Validated, immutable Product for every entry of products_db
+        self.product_models: Dict[int, Product] = {}
+        self.catalog_version = 0
+
+        # Secondary order indexes, maintained by _store_order
+        self.orders_by_user: Dict[int, List[int]] = {}
+        self.product_order_counts: Dict[int, int] = {}
+        self.sales = SalesTotals()
+
+        # Ordered order indexes, one per sort field, for every partition: all
+        # orders, ("user", user_id) and ("status", status)
+        self.order_sort_indexes: Dict[tuple, Dict[str, SortedIndex]] = {}
+        # Open orders by delivery date, from which late orders are read
+        self.open_orders_by_delivery = SortedIndex()
+        self.product_sort_indexes: Dict[str, SortedIndex] = {
+            field: SortedIndex() for field in PRODUCT_SORT_FIELDS
+        }
+        self.product_search = ProductSearchIndex()
+
+        if id_sequence_path:
+            self.order_ids = IdAllocator(SQLiteBlockSource(id_sequence_path, "orders"))
+            self.product_ids = IdAllocator(
+                SQLiteBlockSource(id_sequence_path, "products")
+            )
+        else:
+            self.order_ids = IdAllocator(LocalBlockSource())
+            self.product_ids = IdAllocator(LocalBlockSource())
+        # Highest stored order id, through which load reserves order ids
+        self.max_order_id = 0
+
+    # Lifecycle
+    def load(
+        self,
+        users: Iterable[dict] = (),
+        products: Iterable[dict] = (),
+        orders: Iterable[dict] = (),
+    ) -> None:
+        with self._write_lock:
+            for user in users:
+                self.users_db.add(user)
+            # Products first, so that sales of the orders are priced
+            for product in products:
+                self._store_product(Product(**product))
+            for order in orders:
+                self._store_order(order)
+            self.order_ids.reserve_through(self.max_order_id)
+            if self.product_models:
+                self.product_ids.reserve_through(max(self.product_models))
+
+    def is_empty(self) -> bool:
+        return not (len(self.users_db) or self.orders_db or self.products_db)
+
+    def clear(self) -> None:
+        # Id allocators keep counting, so ids are never reused
+        self.users_db.clear()
+        self.orders_db.clear()
+        self.products_db.clear()
+        self.product_models.clear()
+        self.orders_by_user.clear()
+        self.product_order_counts.clear()
+        self.sales.clear()
+        self.order_sort_indexes.clear()
+        self.open_orders_by_delivery.clear()
+        for index in self.product_sort_indexes.values():
+            index.clear()
+        self.product_search.clear()
+        self.catalog_version += 1
+        self.max_order_id = 0
+
+    def close(self) -> None:
+        for allocator in (self.order_ids, self.product_ids):
+            if isinstance(allocator.source, SQLiteBlockSource):
+                allocator.source.close()
+
+    # User operations
+    def get_user_by_username(self, username: str) -> Optional[UserInDB]:
+        return self.users_db.get_by_username(username)
+
+    def get_user_by_email(self, email: str) -> Optional[UserInDB]:
+        return self.users_db.get_by_email(email)
+
+    def get_user_by_id(self, user_id: int) -> Optional[UserInDB]:
+        return self.users_db.get(user_id)
+
+    def add_user(self, user: dict) -> UserInDB:
+        with self._write_lock:
+            return self.users_db.add(user)
+
+    # Product operations
+    def _store_product(self, product: Product) -> None:
+        # Called with the write lock held
+        previous = self.product_models.get(product.id)
+        if previous is not None:
+            self._unindex_product(previous)
+        self.products_db[product.id] = product.model_dump()
+        self.product_models[product.id] = product
+        self.product_sort_indexes["id"].add(product.id, product.id)
+        self.product_sort_indexes["price"].add(product.price, product.id)
+        self.product_search.add(product)
+        self.catalog_version += 1
+
+    def _unindex_product(self, product: Product) -> None:
+        self.product_sort_indexes["id"].remove(product.id, product.id)
+        self.product_sort_indexes["price"].remove(product.price, product.id)
+        self.product_search.remove(product.id)
+
+    def get_product_by_id(self, product_id: int) -> Optional[Product]:
+        return self.product_models.get(product_id)
+
+    def get_products_by_ids(self, product_ids: Iterable[int]) -> Dict[int, Product]:
+        products = {}
+        for product_id in set(product_ids):
+            product = self.product_models.get(product_id)
+            if product is not None:
+                products[product_id] = product
+        return products
+
+    def get_all_products(self) -> List[Product]:
+        return list(self.product_models.values())
+
+    def list_products(
+        self,
+        sort_by: str = "id",
+        descending: bool = False,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Product], Optional[str]]:
+        if sort_by not in PRODUCT_SORT_FIELDS:
+            raise ValueError(f"Cannot sort products by {sort_by}")
+        after = decode_cursor(cursor) if cursor else None
+
+        page: List[Product] = []
+        last_entry = None
+        # Walked under the write lock, as writes move entries of the index
+        with self._write_lock:
+            for entry in self.product_sort_indexes[sort_by].scan(after, descending):
+                if len(page) == limit:
+                    return page, encode_cursor(last_entry)
+                page.append(self.product_models[entry[1]])
+                last_entry = entry
+        return page, None
+
+    def get_catalog_version(self) -> int:
+        return self.catalog_version
+
+    def create_product(self, product: ProductCreate) -> Product:
+        # Create and validate the product before storing it
+        new_product = Product(
+            id=self.product_ids.allocate(),
+            name=product.name,
+            description=product.description,
+            price=product.price,
+        )
+
+        # If validation passes, store the product
+        with self._write_lock:
+            self._store_product(new_product)
+        return new_product
+
+    def delete_product_by_id(self, product_id: int) -> None:
+        with self._write_lock:
+            if product_id in self.products_db:
+                del self.products_db[product_id]
+                self._unindex_product(self.product_models.pop(product_id))
+                self.catalog_version += 1
+
+    def search_products(
+        self,
+        query: str,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 20,
+    ) -> List[Tuple[Product, float]]:
+        # Searched under the write lock, as writes change the postings in place
+        with self._write_lock:
+            matches = self.product_search.search(query, limit, min_price, max_price)
+            return [
+                (self.product_models[product_id], score)
+                for product_id, score in matches
+            ]
+
+    # Order operations
+    @staticmethod
+    def _order_sort_keys(order: dict) -> Dict[str, float]:
+        return {
+            "created_at": order["created_at"].timestamp(),
+            "total_price": float(order["total_price"]),
+        }
+
+    @staticmethod
+    def _order_partitions(order: dict) -> List[tuple]:
+        return [
+            ("all",),
+            ("user", order["user_id"]),
+            ("status", OrderStatus(order["status"]).value),
+        ]
+
+    def _add_to_sort_indexes(self, partition: tuple, order: dict) -> None:
+        indexes = self.order_sort_indexes.get(partition)
+        if indexes is None:
+            indexes = self.order_sort_indexes[partition] = {
+                field: SortedIndex() for field in ORDER_SORT_FIELDS
+            }
+        for field, key in self._order_sort_keys(order).items():
+            indexes[field].add(key, order["id"])
+
+    def _remove_from_sort_indexes(self, partition: tuple, order: dict) -> None:
+        indexes = self.order_sort_indexes.get(partition)
+        if indexes is None:
+            return
+        for field, key in self._order_sort_keys(order).items():
+            indexes[field].remove(key, order["id"])
+        if partition != ("all",) and not len(indexes[ORDER_SORT_FIELDS[0]]):
+            del self.order_sort_indexes[partition]
+
+    def _index_order(self, order: dict) -> None:
+        self.orders_by_user.setdefault(order["user_id"], []).append(order["id"])
+        counts = self.product_order_counts
+        for product_id in {item["id"] for item in order["items"]}:
+            counts[product_id] = counts.get(product_id, 0) + 1
+        for partition in self._order_partitions(order):
+            self._add_to_sort_indexes(partition, order)
+        if order["status"] in OPEN_ORDER_STATUSES:
+            self.open_orders_by_delivery.add(
+                order["delivery_date"].timestamp(), order["id"]
+            )
+
+    def _unindex_order(self, order: dict) -> None:
+        for partition in self._order_partitions(order):
+            self._remove_from_sort_indexes(partition, order)
+        if order["status"] in OPEN_ORDER_STATUSES:
+            self.open_orders_by_delivery.remove(
+                order["delivery_date"].timestamp(), order["id"]
+            )
+        user_orders = self.orders_by_user.get(order["user_id"])
+        if user_orders is not None:
+            user_orders.remove(order["id"])
+            if not user_orders:
+                del self.orders_by_user[order["user_id"]]
+        counts = self.product_order_counts
+        for product_id in {item["id"] for item in order["items"]}:
+            remaining = counts.get(product_id, 0) - 1
+            if remaining > 0:
+                counts[product_id] = remaining
+            else:
+                counts.pop(product_id, None)
+
+    def _store_order(self, order: dict) -> None:
+        """Insert or replace an order, keeping the secondary indexes consistent.
+
+        Called with the write lock held. The order is validated first, so an
+        invalid record leaves the store unchanged; the indexes are keyed on
+        the stored record, as it is read back.
+        """
+        model = Order(**order)
+        previous = self.orders_db.record(model.id)
+        if previous is not None:
+            self._unindex_order(previous)
+            self.sales.add_order(self.stored_order(previous), self.product_models, -1)
+        self.orders_db.add(model)
+        self.sales.add_order(model, self.product_models)
+        self._index_order(self.orders_db.record(model.id))
+        self.max_order_id = max(self.max_order_id, model.id)
+        self._notify_order_changed(model.id, model.user_id)
+
+    def _stored_order(self, order_id: int) -> Order:
+        return self.stored_order(self.orders_db.record(order_id))
+
+    def get_orders_by_user(self, user_id: int) -> List[Order]:
+        return self.add_products_details(
+            [
+                self._stored_order(order_id)
+                for order_id in self.orders_by_user.get(user_id, ())
+            ]
+        )
+
+    def get_all_orders(self) -> List[Order]:
+        return self.add_products_details(
+            [self._stored_order(order_id) for order_id in self.orders_db]
+        )
+
+    def list_orders(
+        self,
+        user_id: Optional[int] = None,
+        status: Optional[OrderStatus] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        sort_by: str = "created_at",
+        descending: bool = True,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Order], Optional[str]]:
+        """Return one page of orders and the cursor of the next page, if any.
+
+        The page is read from the narrowest ordered index: the user's orders
+        when ``user_id`` is given, otherwise the orders in ``status``. A
+        created_at range is a key range when sorting by created_at; other
+        filters are applied while walking the index.
+        """
+        if sort_by not in ORDER_SORT_FIELDS:
+            raise ValueError(f"Cannot sort orders by {sort_by}")
+        after = decode_cursor(cursor) if cursor else None
+        status = OrderStatus(status).value if status is not None else None
+        # Epoch seconds, naive datetimes taken as UTC as by the SQLite backend
+        lower = to_micros(created_from) / 1_000_000 if created_from else None
+        upper = to_micros(created_to) / 1_000_000 if created_to else None
+
+        if user_id is not None:
+            partition = ("user", user_id)
+        elif status is not None:
+            partition = ("status", status)
+        else:
+            partition = ("all",)
+        page: List[Order] = []
+        last_entry = next_cursor = None
+        # Walked under the write lock, as writes move entries of the indexes
+        with self._write_lock:
+            indexes = self.order_sort_indexes.get(partition)
+            if indexes is None:
+                return [], None
+            if sort_by == "created_at":
+                entries = indexes[sort_by].scan(after, descending, lower, upper)
+                lower = upper = None
+            else:
+                entries = indexes[sort_by].scan(after, descending)
+
+            for entry in entries:
+                order_id = entry[1]
+                if (
+                    status is not None
+                    and self.orders_db.status(order_id).value != status
+                ):
+                    continue
+                if lower is not None or upper is not None:
+                    created_at = self.orders_db.created_at(order_id)
+                    if (lower is not None and created_at < lower) or (
+                        upper is not None and created_at > upper
+                    ):
+                        continue
+                if len(page) == limit:
+                    next_cursor = encode_cursor(last_entry)
+                    break
+                page.append(self._stored_order(order_id))
+                last_entry = entry
+        return self.add_products_details(page), next_cursor
+
+    def iter_orders(self, since: Optional[datetime] = None) -> Iterator[dict]:
+        return self.orders_db.records(since)
+
+    def list_late_orders(
+        self, now: datetime, user_id: Optional[int] = None, limit: int = 100
+    ) -> List[Order]:
+        upper = to_micros(now) / 1_000_000
+        # Read under the write lock, as writes move entries of the index
+        with self._write_lock:
+            if user_id is None:
+                entries = self.open_orders_by_delivery.scan(upper=upper)
+                order_ids = [order_id for _, order_id in islice(entries, limit)]
+            else:
+                # A user has few orders, so theirs are checked one by one
+                orders_db = self.orders_db
+                late = sorted(
+                    (orders_db.delivery_date(order_id), order_id)
+                    for order_id in self.orders_by_user.get(user_id, ())
+                    if orders_db.status(order_id) in OPEN_ORDER_STATUSES
+                    and orders_db.delivery_date(order_id) <= upper
+                )
+                order_ids = [order_id for _, order_id in late[:limit]]
+            orders = [self._stored_order(order_id) for order_id in order_ids]
+        return self.add_products_details(orders)
+
+    def count_late_orders(self, now: datetime) -> int:
+        with self._write_lock:
+            return self.open_orders_by_delivery.count(upper=to_micros(now) / 1_000_000)
+
+    def get_product_order_count(self, product_id: int) -> int:
+        return self.product_order_counts.get(product_id, 0)
+
+    def get_order_by_id(self, order_id: int) -> Optional[Order]:
+        if order_id in self.orders_db:
+            return self.add_products_details([self._stored_order(order_id)])[0]
+        return None
+
+    def get_orders_by_ids(self, order_ids: Iterable[int]) -> Dict[int, Order]:
+        orders = [
+            self._stored_order(order_id)
+            for order_id in set(order_ids)
+            if order_id in self.orders_db
+        ]
+        return {order.id: order for order in self.add_products_details(orders)}
+
+    def create_order(self, user_id: int, order: OrderCreate) -> Order:
+        # Check that every product exists and price the order at current prices
+        products = self.get_products_by_ids(item.id for item in order.items)
+        new_order = self.new_order(user_id, order, products, datetime.now(UTC))
+        new_order["id"] = self.order_ids.allocate()
+
+        with self._write_lock:
+            self._store_order(new_order)
+        return self._stored_order(new_order["id"])
+
+    def create_orders(
+        self, orders: List[Tuple[int, OrderCreate]]
+    ) -> List[Union[Order, ValueError]]:
+        products = self.get_products_by_ids(
+            item.id for _, order in orders for item in order.items
+        )
+        created_at = datetime.now(UTC)
+        results: List[Union[Order, ValueError]] = []
+        with self._write_lock:
+            for user_id, order in orders:
+                # An invalid order, whether pricing or validation rejects it,
+                # only fails its own entry; _store_order leaves the store
+                # unchanged when it raises
+                try:
+                    new_order = self.new_order(user_id, order, products, created_at)
+                    new_order["id"] = self.order_ids.allocate()
+                    self._store_order(new_order)
+                except ValueError as e:
+                    results.append(e)
+                    continue
+                results.append(self._stored_order(new_order["id"]))
+        return results
+
+    def update_order_status(
+        self, order_id: int, status: str, expected: Optional[OrderStatus] = None
+    ) -> Optional[Order]:
+        with self._write_lock:
+            order = self.orders_db.record(order_id)
+            if not order:
+                return None
+            if expected is not None and order["status"] != expected:
+                return None
+            status = OrderStatus(status)
+            # The user and items of an order never change, and an order counts
+            # as "ordered" for its products in every status, so only the status
+            # partition of the ordered indexes moves.
+            old_partition = ("status", OrderStatus(order["status"]).value)
+            self._remove_from_sort_indexes(old_partition, order)
+            self.orders_db.set_status(order_id, status, datetime.now(UTC))
+            self._add_to_sort_indexes(("status", status.value), order)
+            delivery_key = order["delivery_date"].timestamp()
+            if order["status"] in OPEN_ORDER_STATUSES:
+                self.open_orders_by_delivery.remove(delivery_key, order_id)
+            if status in OPEN_ORDER_STATUSES:
+                self.open_orders_by_delivery.add(delivery_key, order_id)
+            updated = self._stored_order(order_id)
+            self.sales.add_order(self.stored_order(order), self.product_models, -1)
+            self.sales.add_order(updated, self.product_models)
+            self._notify_order_changed(order_id, order["user_id"])
+            return updated
+
+    # Sales analytics
+    # Buckets are copied under the write lock, so that a write cannot change
+    # them while they are read
+    def get_sales_by_status(self) -> Dict[OrderStatus, Tuple[int, int]]:
+        with self._write_lock:
+            return {
+                status: tuple(bucket) for status, bucket in self.sales.statuses.items()
+            }
+
+    def get_sales_by_product(self) -> Dict[int, Tuple[int, int]]:
+        with self._write_lock:
+            return {
+                product_id: tuple(bucket)
+                for product_id, bucket in self.sales.products.items()
+            }
+
+    def get_sales_by_day(
+        self, start: Optional[date] = None, end: Optional[date] = None
+    ) -> Dict[date, Tuple[int, int]]:
+        with self._write_lock:
+            days = [
+                (day, tuple(bucket))
+                for day, bucket in self.sales.days.items()
+                if (start is None or day >= start) and (end is None or day <= end)
+            ]
+        return dict(sorted(days))
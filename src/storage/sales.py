@@ -0,0 +1,75 @@
+from datetime import UTC, date, datetime
+from typing import Dict, Hashable, List, Mapping
+
+from ..models import Order, OrderStatus, Product
+
+# Orders in these statuses count towards product and daily revenue
+REVENUE_STATUSES = frozenset(OrderStatus) - {OrderStatus.CANCELLED}
+
+
+def to_cents(amount: float) -> int:
+    return round(amount * 100)
+
+
+def sales_day(created_at: datetime) -> date:
+    """Day, in UTC, whose bucket an order created at ``created_at`` falls in."""
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(UTC)
+    return created_at.date()
+
+
+def _add(buckets: Dict[Hashable, List[int]], key: Hashable, count: int, cents: int):
+    bucket = buckets.get(key)
+    if bucket is None:
+        bucket = buckets[key] = [0, 0]
+    bucket[0] += count
+    bucket[1] += cents
+    if bucket == [0, 0]:
+        del buckets[key]
+
+
+class SalesTotals:
+    """Sales aggregates, or a change to them, as ``[count, cents]`` buckets.
+
+    - ``statuses``: orders and their total per status, cancelled included
+    - ``products``: units and revenue per product id
+    - ``days``: orders and their total per day of creation, in UTC
+
+    Products and days only count orders that are not cancelled. An order is
+    added with ``sign=1`` and taken out with ``sign=-1``, so a status change
+    is the order as it was taken out and the order as it is added: a
+    cancellation moves it between status buckets and takes its units and
+    revenue back out of its products and day. Amounts are integer cents, so
+    totals stay exact however many changes are applied.
+
+    Product revenue is each item's quantity at the product's price, since
+    orders do not store unit prices; products of an order are never
+    repriced, but items of products that no longer exist only count units.
+    """
+
+    def __init__(self) -> None:
+        self.statuses: Dict[OrderStatus, List[int]] = {}
+        self.products: Dict[int, List[int]] = {}
+        self.days: Dict[date, List[int]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.statuses or self.products or self.days)
+
+    def add_order(
+        self, order: Order, products: Mapping[int, Product], sign: int = 1
+    ) -> None:
+        cents = to_cents(order.total_price) * sign
+        _add(self.statuses, order.status, sign, cents)
+        if order.status not in REVENUE_STATUSES:
+            return
+        _add(self.days, sales_day(order.created_at), sign, cents)
+        for item in order.items:
+            product = products.get(item.id)
+            price = to_cents(product.price) if product is not None else 0
+            units = item.quantity * sign
+            _add(self.products, item.id, units, units * price)
+
+    def clear(self) -> None:
+        self.statuses.clear()
+        self.products.clear()
+        self.days.clear()
@@ -0,0 +1,179 @@
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from operator import neg
+from typing import Dict, List, Optional, Tuple
+
+from ..models import Product
+
+# BM25 parameters and per-column weights (name, description), the same as
+# SQLite's FTS5 bm25() uses, so that both backends rank alike
+BM25_K1 = 1.2
+BM25_B = 0.75
+SEARCH_COLUMN_WEIGHTS = (2.0, 1.0)
+# Shorter query terms only match whole words; a single letter would expand
+# to a large part of the vocabulary
+MIN_PREFIX_LENGTH = 2
+
+# Runs of letters and digits, as FTS5's unicode61 tokenizer splits them
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased tokens of ``text``, with diacritics removed."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _TOKEN.findall(stripped)
+
+
+def query_terms(query: str) -> List[str]:
+    """Distinct tokens of a search query, in order."""
+    return list(dict.fromkeys(tokenize(query)))
+
+
+class ProductSearchIndex:
+    """Inverted index over product names and descriptions, ranked by BM25.
+
+    Each term maps to the products it appears in and its column-weighted
+    number of occurrences there; the sorted vocabulary finds the terms that
+    start with a query term. Products are added and removed one at a time,
+    as the catalog changes.
+
+    Query terms of ``MIN_PREFIX_LENGTH`` or more characters match as
+    prefixes, and a product must match all of them. The occurrences of the
+    terms a query term expands to count as occurrences of that query term,
+    as with FTS5 prefix queries. Prices are kept alongside, so that price
+    ranges are applied to the matches before they are scored.
+    """
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._vocabulary: List[str] = []
+        self._product_terms: Dict[int, Tuple[str, ...]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._prices: Dict[int, float] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, product: Product) -> None:
+        """Index a product, replacing it if it is already indexed."""
+        self.remove(product.id)
+        frequencies: Dict[str, float] = {}
+        length = 0
+        for text, weight in zip(
+            (product.name, product.description), SEARCH_COLUMN_WEIGHTS
+        ):
+            tokens = tokenize(text)
+            length += len(tokens)
+            for token in tokens:
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary.insert(bisect_left(self._vocabulary, term), term)
+            postings[product.id] = frequency
+        self._product_terms[product.id] = tuple(frequencies)
+        self._lengths[product.id] = length
+        self._prices[product.id] = product.price
+        self._total_length += length
+
+    def remove(self, product_id: int) -> None:
+        terms = self._product_terms.pop(product_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            del postings[product_id]
+            if not postings:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+        self._total_length -= self._lengths.pop(product_id)
+        del self._prices[product_id]
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._vocabulary.clear()
+        self._product_terms.clear()
+        self._lengths.clear()
+        self._prices.clear()
+        self._total_length = 0
+
+    def _expand(self, prefix: str) -> Dict[int, float]:
+        """Products matching any term starting with ``prefix``, with the
+        summed frequency of those terms."""
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            return self._postings.get(prefix, {})
+        vocabulary = self._vocabulary
+        start = end = bisect_left(vocabulary, prefix)
+        while end < len(vocabulary) and vocabulary[end].startswith(prefix):
+            end += 1
+        if end - start == 1:
+            # Only read, so a single term's postings need no copy
+            return self._postings[vocabulary[start]]
+        matches: Dict[int, float] = {}
+        for term in vocabulary[start:end]:
+            for product_id, frequency in self._postings[term].items():
+                matches[product_id] = matches.get(product_id, 0.0) + frequency
+        return matches
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+    ) -> List[Tuple[int, float]]:
+        """Return up to ``limit`` ``(product_id, score)`` pairs, best first."""
+        terms = query_terms(query)
+        if not terms or not self._lengths:
+            return []
+        matches = [self._expand(term) for term in terms]
+        if not all(matches):
+            return []
+
+        # Walk the rarest term's products and look the others up
+        matches.sort(key=len)
+        candidates = list(matches[0])
+        for postings in matches[1:]:
+            candidates = [
+                product_id for product_id in candidates if product_id in postings
+            ]
+        if min_price is not None or max_price is not None:
+            prices = self._prices
+            low = float("-inf") if min_price is None else min_price
+            high = float("inf") if max_price is None else max_price
+            candidates = [
+                product_id
+                for product_id in candidates
+                if low <= prices[product_id] <= high
+            ]
+        if not candidates:
+            return []
+
+        # Scored a term at a time over all candidates, which keeps the
+        # arithmetic in comprehensions rather than a loop per product
+        count = len(self._lengths)
+        average_length = self._total_length / count or 1.0
+        base = BM25_K1 * (1 - BM25_B)
+        per_token = BM25_K1 * BM25_B / average_length
+        lengths = self._lengths
+        norms = [base + per_token * lengths[product_id] for product_id in candidates]
+        scores = [0.0] * len(candidates)
+        for postings in matches:
+            hits = len(postings)
+            idf = math.log((count - hits + 0.5) / (hits + 0.5))
+            weight = (idf if idf > 0 else 1e-6) * (BM25_K1 + 1)
+            scores = [
+                score + weight * frequency / (frequency + norm)
+                for score, frequency, norm in zip(
+                    scores, map(postings.__getitem__, candidates), norms
+                )
+            ]
+        # Ties go to the lowest id
+        best = heapq.nlargest(limit, zip(scores, map(neg, candidates)))
+        return [(-negated_id, score) for score, negated_id in best]
@@ -0,0 +1,890 @@
+import queue
+import sqlite3
+from contextlib import contextmanager
+from datetime import UTC, date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ..indexes import decode_cursor, encode_cursor
+from ..models import Order, OrderStatus, Product
+from ..schemas import OrderCreate, ProductCreate, UserInDB
+from .base import (
+    ORDER_SORT_FIELDS,
+    PRODUCT_SORT_FIELDS,
+    StorageBackend,
+    from_micros,
+    to_micros,
+)
+from .sales import SalesTotals
+from .search import MIN_PREFIX_LENGTH, SEARCH_COLUMN_WEIGHTS, query_terms
+
+DEFAULT_POOL_SIZE = 4
+# Per-connection cache of prepared statements kept by the sqlite3 module
+CACHED_STATEMENTS = 256
+# Seconds a connection waits for another writer before raising "locked"
+BUSY_TIMEOUT = 5.0
+# Orders fetched per query when streaming with iter_orders
+ITER_BATCH_SIZE = 500
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER when binding id lists
+MAX_BOUND_IDS = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL,
+    username TEXT NOT NULL UNIQUE,
+    hashed_password TEXT NOT NULL,
+    role TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS users_email ON users (email COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    price REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_price ON products (price, id);
+
+-- Full-text index of product names and descriptions, kept in step with the
+-- products table by triggers
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5 (
+    name,
+    description,
+    content = 'products',
+    content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts (rowid, name, description)
+    VALUES (new.id, new.name, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name, description)
+    VALUES ('delete', old.id, old.name, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name, description)
+    VALUES ('delete', old.id, old.name, old.description);
+    INSERT INTO products_fts (rowid, name, description)
+    VALUES (new.id, new.name, new.description);
+END;
+
+-- Single row, bumped in the same transaction as every catalog change
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0);
+
+-- Timestamps are integer microseconds since the epoch, UTC
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    total_price REAL NOT NULL,
+    status TEXT NOT NULL,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER,
+    delivery_date INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS orders_created ON orders (created_at, id);
+CREATE INDEX IF NOT EXISTS orders_price ON orders (total_price, id);
+CREATE INDEX IF NOT EXISTS orders_user_created ON orders (user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS orders_user_price ON orders (user_id, total_price, id);
+CREATE INDEX IF NOT EXISTS orders_status_created ON orders (status, created_at, id);
+CREATE INDEX IF NOT EXISTS orders_status_price ON orders (status, total_price, id);
+-- Open orders by delivery date, to find late ones; queries must repeat the
+-- WHERE clause (see _OPEN_ORDERS) and name them, as the planner otherwise
+-- prefers the status indexes
+CREATE INDEX IF NOT EXISTS orders_open_delivery ON orders (delivery_date, id)
+    WHERE status IN ('pending', 'processing', 'shipped');
+CREATE INDEX IF NOT EXISTS orders_user_open_delivery
+    ON orders (user_id, delivery_date, id)
+    WHERE status IN ('pending', 'processing', 'shipped');
+
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (order_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS order_items_product ON order_items (product_id, order_id);
+
+-- Sales aggregates, changed in the same transaction as the orders they count.
+-- Amounts are integer cents; products and days leave out cancelled orders
+CREATE TABLE IF NOT EXISTS sales_by_status (
+    status TEXT PRIMARY KEY,
+    orders INTEGER NOT NULL,
+    revenue_cents INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales_by_product (
+    product_id INTEGER PRIMARY KEY,
+    units INTEGER NOT NULL,
+    revenue_cents INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales_by_day (
+    day TEXT PRIMARY KEY,
+    orders INTEGER NOT NULL,
+    revenue_cents INTEGER NOT NULL
+);
+"""
+
+# Rebuilds the sales aggregates from the orders, for databases whose orders
+# were written before the aggregates existed
+_REBUILD_SALES = (
+    "DELETE FROM sales_by_status",
+    "DELETE FROM sales_by_product",
+    "DELETE FROM sales_by_day",
+    """
+    INSERT INTO sales_by_status (status, orders, revenue_cents)
+    SELECT status, COUNT(*), SUM(CAST(ROUND(total_price * 100) AS INTEGER))
+    FROM orders GROUP BY status
+    """,
+    """
+    INSERT INTO sales_by_product (product_id, units, revenue_cents)
+    SELECT
+        i.product_id,
+        SUM(i.quantity),
+        SUM(i.quantity * CAST(ROUND(COALESCE(p.price, 0) * 100) AS INTEGER))
+    FROM order_items i
+    JOIN orders o ON o.id = i.order_id
+    LEFT JOIN products p ON p.id = i.product_id
+    WHERE o.status != 'cancelled'
+    GROUP BY i.product_id
+    """,
+    """
+    INSERT INTO sales_by_day (day, orders, revenue_cents)
+    SELECT
+        date(created_at / 1000000, 'unixepoch'),
+        COUNT(*),
+        SUM(CAST(ROUND(total_price * 100) AS INTEGER))
+    FROM orders WHERE status != 'cancelled'
+    GROUP BY 1
+    """,
+)
+
+_USER_COLUMNS = "id, email, username, hashed_password, role"
+_PRODUCT_COLUMNS = "id, name, description, price"
+_ORDER_COLUMNS = (
+    "id, user_id, total_price, status, created_at, updated_at, delivery_date"
+)
+
+_UPSERT_USER = f"""
+INSERT INTO users ({_USER_COLUMNS}) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    email = excluded.email,
+    username = excluded.username,
+    hashed_password = excluded.hashed_password,
+    role = excluded.role
+"""
+_UPSERT_PRODUCT = f"""
+INSERT INTO products ({_PRODUCT_COLUMNS}) VALUES (?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    name = excluded.name,
+    description = excluded.description,
+    price = excluded.price
+"""
+_UPSERT_ORDER = f"""
+INSERT INTO orders ({_ORDER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    user_id = excluded.user_id,
+    total_price = excluded.total_price,
+    status = excluded.status,
+    created_at = excluded.created_at,
+    updated_at = excluded.updated_at,
+    delivery_date = excluded.delivery_date
+"""
+# Matches OPEN_ORDER_STATUSES and the WHERE clause of the partial indexes
+_OPEN_ORDERS = "status IN ('pending', 'processing', 'shipped')"
+_BUMP_CATALOG_VERSION = "UPDATE catalog_version SET version = version + 1"
+_ADD_STATUS_SALES = """
+INSERT INTO sales_by_status (status, orders, revenue_cents) VALUES (?, ?, ?)
+ON CONFLICT (status) DO UPDATE SET
+    orders = orders + excluded.orders,
+    revenue_cents = revenue_cents + excluded.revenue_cents
+"""
+_ADD_PRODUCT_SALES = """
+INSERT INTO sales_by_product (product_id, units, revenue_cents) VALUES (?, ?, ?)
+ON CONFLICT (product_id) DO UPDATE SET
+    units = units + excluded.units,
+    revenue_cents = revenue_cents + excluded.revenue_cents
+"""
+_ADD_DAY_SALES = """
+INSERT INTO sales_by_day (day, orders, revenue_cents) VALUES (?, ?, ?)
+ON CONFLICT (day) DO UPDATE SET
+    orders = orders + excluded.orders,
+    revenue_cents = revenue_cents + excluded.revenue_cents
+"""
+_INSERT_ITEM = (
+    "INSERT INTO order_items (order_id, position, product_id, quantity) "
+    "VALUES (?, ?, ?, ?)"
+)
+
+
+def _chunks(values: List[int], size: int = MAX_BOUND_IDS) -> Iterator[List[int]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _placeholders(count: int) -> str:
+    return ",".join("?" * count)
+
+
+class ConnectionPool:
+    """Fixed-size pool of SQLite connections shared between threads."""
+
+    def __init__(self, database: str, size: int) -> None:
+        self._connections: queue.LifoQueue = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._connections.put(self._connect(database))
+
+    @staticmethod
+    def _connect(database: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            database,
+            timeout=BUSY_TIMEOUT,
+            # Transactions are opened explicitly with BEGIN
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+    def close(self) -> None:
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class SQLiteBackend(StorageBackend):
+    """Storage in a SQLite database file, shareable between worker processes.
+
+    The database runs in WAL mode so readers never block the single writer.
+    Statements are constant strings, so each pooled connection prepares them
+    once and reuses them from its statement cache. ``":memory:"`` gives a
+    private in-memory database, served by a single connection.
+
+    User listeners only see changes made through this process.
+    """
+
+    def __init__(self, path: str = ":memory:", pool_size: int = DEFAULT_POOL_SIZE):
+        super().__init__()
+        # Every connection to ":memory:" opens a separate database
+        if path == ":memory:":
+            pool_size = 1
+        self.pool = ConnectionPool(path, size=pool_size)
+        with self.pool.connection() as connection:
+            connection.executescript(SCHEMA)
+        self._backfill_sales()
+        self._backfill_search()
+
+    def close(self) -> None:
+        self.pool.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self.pool.connection() as connection:
+            # Take the write lock up front so concurrent writers queue on the
+            # busy timeout instead of failing to upgrade a read lock.
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def _backfill_sales(self) -> None:
+        with self._transaction() as connection:
+            (missing,) = connection.execute(
+                "SELECT EXISTS (SELECT 1 FROM orders)"
+                " AND NOT EXISTS (SELECT 1 FROM sales_by_status)"
+            ).fetchone()
+            if missing:
+                for statement in _REBUILD_SALES:
+                    connection.execute(statement)
+
+    def _backfill_search(self) -> None:
+        # Products written before the full-text index existed
+        with self._transaction() as connection:
+            (missing,) = connection.execute(
+                "SELECT EXISTS (SELECT 1 FROM products)"
+                " AND NOT EXISTS (SELECT 1 FROM products_fts_docsize)"
+            ).fetchone()
+            if missing:
+                connection.execute(
+                    "INSERT INTO products_fts (products_fts) VALUES ('rebuild')"
+                )
+
+    @staticmethod
+    def _apply_sales(connection: sqlite3.Connection, sales: SalesTotals) -> None:
+        connection.executemany(
+            _ADD_STATUS_SALES,
+            [(status.value, *bucket) for status, bucket in sales.statuses.items()],
+        )
+        connection.executemany(
+            _ADD_PRODUCT_SALES,
+            [(product_id, *bucket) for product_id, bucket in sales.products.items()],
+        )
+        connection.executemany(
+            _ADD_DAY_SALES,
+            [(day.isoformat(), *bucket) for day, bucket in sales.days.items()],
+        )
+
+    # Lifecycle
+    def load(
+        self,
+        users: Iterable[dict] = (),
+        products: Iterable[dict] = (),
+        orders: Iterable[dict] = (),
+    ) -> None:
+        replaced_users, loaded_orders = [], []
+        with self._transaction() as connection:
+            for user in users:
+                model = UserInDB(**user)
+                exists = connection.execute(
+                    "SELECT 1 FROM users WHERE id = ?", (model.id,)
+                ).fetchone()
+                try:
+                    connection.execute(
+                        _UPSERT_USER,
+                        (
+                            model.id,
+                            model.email,
+                            model.username,
+                            model.hashed_password,
+                            model.role.value,
+                        ),
+                    )
+                except sqlite3.IntegrityError:
+                    raise ValueError("Username or email already registered")
+                if exists:
+                    replaced_users.append(model.id)
+            catalog_changed = False
+            for product in products:
+                model = Product(**product)
+                connection.execute(
+                    _UPSERT_PRODUCT,
+                    (model.id, model.name, model.description, model.price),
+                )
+                catalog_changed = True
+            if catalog_changed:
+                connection.execute(_BUMP_CATALOG_VERSION)
+            orders = list(orders)
+            # Validated here, once, so that reads can trust stored rows
+            models = [Order(**order) for order in orders]
+            sales = SalesTotals()
+            products = self._products_by_ids(
+                connection, {item.id for model in models for item in model.items}
+            )
+            for previous in self._stored_order_dicts(
+                connection, [model.id for model in models]
+            ):
+                sales.add_order(self.stored_order(previous), products, -1)
+            for model in models:
+                sales.add_order(model, products)
+            self._apply_sales(connection, sales)
+            for order in orders:
+                connection.execute(_UPSERT_ORDER, self._order_row(order))
+                connection.execute(
+                    "DELETE FROM order_items WHERE order_id = ?", (order["id"],)
+                )
+                connection.executemany(
+                    _INSERT_ITEM, self._item_rows(order["id"], order["items"])
+                )
+                loaded_orders.append((order["id"], order["user_id"]))
+        for user_id in replaced_users:
+            self._notify_user_changed(user_id)
+        for order_id, user_id in loaded_orders:
+            self._notify_order_changed(order_id, user_id)
+
+    def is_empty(self) -> bool:
+        with self.pool.connection() as connection:
+            row = connection.execute(
+                "SELECT EXISTS (SELECT 1 FROM users)"
+                " OR EXISTS (SELECT 1 FROM products)"
+                " OR EXISTS (SELECT 1 FROM orders)"
+            ).fetchone()
+        return not row[0]
+
+    def clear(self) -> None:
+        with self._transaction() as connection:
+            user_ids = [row[0] for row in connection.execute("SELECT id FROM users")]
+            for table in (
+                "order_items",
+                "orders",
+                "products",
+                "users",
+                "sales_by_status",
+                "sales_by_product",
+                "sales_by_day",
+            ):
+                connection.execute(f"DELETE FROM {table}")
+            connection.execute("DELETE FROM sqlite_sequence")
+            connection.execute(_BUMP_CATALOG_VERSION)
+        for user_id in user_ids:
+            self._notify_user_changed(user_id)
+
+    # User operations
+    def _fetch_user(self, where: str, value: object) -> Optional[UserInDB]:
+        with self.pool.connection() as connection:
+            row = connection.execute(
+                f"SELECT {_USER_COLUMNS} FROM users WHERE {where}", (value,)
+            ).fetchone()
+        return UserInDB(**row) if row else None
+
+    def get_user_by_id(self, user_id: int) -> Optional[UserInDB]:
+        return self._fetch_user("id = ?", user_id)
+
+    def get_user_by_username(self, username: str) -> Optional[UserInDB]:
+        return self._fetch_user("username = ?", username)
+
+    def get_user_by_email(self, email: str) -> Optional[UserInDB]:
+        return self._fetch_user("email = ? COLLATE NOCASE", email)
+
+    # Product operations
+    @staticmethod
+    def _product(row: sqlite3.Row) -> Product:
+        return Product(
+            id=row["id"],
+            name=row["name"],
+            description=row["description"],
+            price=row["price"],
+        )
+
+    def get_product_by_id(self, product_id: int) -> Optional[Product]:
+        with self.pool.connection() as connection:
+            row = connection.execute(
+                f"SELECT {_PRODUCT_COLUMNS} FROM products WHERE id = ?", (product_id,)
+            ).fetchone()
+        return self._product(row) if row else None
+
+    def get_products_by_ids(self, product_ids: Iterable[int]) -> Dict[int, Product]:
+        with self.pool.connection() as connection:
+            return self._products_by_ids(connection, set(product_ids))
+
+    def _products_by_ids(
+        self, connection: sqlite3.Connection, product_ids: Iterable[int]
+    ) -> Dict[int, Product]:
+        products = {}
+        for chunk in _chunks(list(product_ids)):
+            rows = connection.execute(
+                f"SELECT {_PRODUCT_COLUMNS} FROM products"
+                f" WHERE id IN ({_placeholders(len(chunk))})",
+                chunk,
+            )
+            for row in rows:
+                products[row["id"]] = self._product(row)
+        return products
+
+    def get_all_products(self) -> List[Product]:
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                f"SELECT {_PRODUCT_COLUMNS} FROM products ORDER BY id"
+            ).fetchall()
+        return [self._product(row) for row in rows]
+
+    def list_products(
+        self,
+        sort_by: str = "id",
+        descending: bool = False,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Product], Optional[str]]:
+        if sort_by not in PRODUCT_SORT_FIELDS:
+            raise ValueError(f"Cannot sort products by {sort_by}")
+        direction = "DESC" if descending else "ASC"
+        where, params = "", []
+        if cursor:
+            key, item_id = decode_cursor(cursor)
+            where = f"WHERE ({sort_by}, id) {'<' if descending else '>'} (?, ?)"
+            params = [key, item_id]
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                f"SELECT {_PRODUCT_COLUMNS} FROM products {where}"
+                f" ORDER BY {sort_by} {direction}, id {direction} LIMIT ?",
+                [*params, limit + 1],
+            ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor((rows[-1][sort_by], rows[-1]["id"]))
+        return [self._product(row) for row in rows], next_cursor
+
+    def get_catalog_version(self) -> int:
+        with self.pool.connection() as connection:
+            row = connection.execute("SELECT version FROM catalog_version").fetchone()
+        return row[0]
+
+    def create_product(self, product: ProductCreate) -> Product:
+        with self._transaction() as connection:
+            product_id = connection.execute(
+                "INSERT INTO products (name, description, price) VALUES (?, ?, ?)",
+                (product.name, product.description, product.price),
+            ).lastrowid
+            connection.execute(_BUMP_CATALOG_VERSION)
+        return Product(id=product_id, **product.model_dump())
+
+    def delete_product_by_id(self, product_id: int) -> None:
+        with self._transaction() as connection:
+            deleted = connection.execute(
+                "DELETE FROM products WHERE id = ?", (product_id,)
+            ).rowcount
+            if deleted:
+                connection.execute(_BUMP_CATALOG_VERSION)
+
+    def search_products(
+        self,
+        query: str,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 20,
+    ) -> List[Tuple[Product, float]]:
+        terms = query_terms(query)
+        if not terms:
+            return []
+        # Tokens are letters and digits only, so they quote as they are
+        match = " ".join(
+            f'"{term}"*' if len(term) >= MIN_PREFIX_LENGTH else f'"{term}"'
+            for term in terms
+        )
+        conditions, params = ["products_fts MATCH ?"], [match]
+        if min_price is not None:
+            conditions.append("p.price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("p.price <= ?")
+            params.append(max_price)
+        weights = ", ".join(str(weight) for weight in SEARCH_COLUMN_WEIGHTS)
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                "SELECT p.id, p.name, p.description, p.price,"
+                f" -bm25(products_fts, {weights}) AS score"
+                " FROM products_fts JOIN products p ON p.id = products_fts.rowid"
+                f" WHERE {' AND '.join(conditions)}"
+                " ORDER BY score DESC, p.id LIMIT ?",
+                [*params, limit],
+            ).fetchall()
+        return [(self._product(row), row["score"]) for row in rows]
+
+    # Order operations
+    @staticmethod
+    def _order_row(order: dict) -> tuple:
+        return (
+            order["id"],
+            order["user_id"],
+            order["total_price"],
+            OrderStatus(order["status"]).value,
+            to_micros(order["created_at"]),
+            to_micros(order["updated_at"]),
+            to_micros(order["delivery_date"]),
+        )
+
+    @staticmethod
+    def _item_rows(order_id: int, items: List[dict]) -> Iterator[tuple]:
+        for position, item in enumerate(items):
+            yield order_id, position, item["id"], item["quantity"]
+
+    @staticmethod
+    def _fetch_items(
+        connection: sqlite3.Connection, order_ids: List[int]
+    ) -> Dict[int, List[dict]]:
+        items: Dict[int, List[dict]] = {order_id: [] for order_id in order_ids}
+        for chunk in _chunks(order_ids):
+            rows = connection.execute(
+                "SELECT order_id, product_id, quantity FROM order_items"
+                f" WHERE order_id IN ({_placeholders(len(chunk))})"
+                " ORDER BY order_id, position",
+                chunk,
+            )
+            for order_id, product_id, quantity in rows:
+                items[order_id].append({"id": product_id, "quantity": quantity})
+        return items
+
+    def _order_dicts(
+        self, connection: sqlite3.Connection, rows: List[sqlite3.Row]
+    ) -> List[dict]:
+        items = self._fetch_items(connection, [row["id"] for row in rows])
+        return [
+            {
+                "id": row["id"],
+                "user_id": row["user_id"],
+                "items": items[row["id"]],
+                "total_price": row["total_price"],
+                "status": OrderStatus(row["status"]),
+                "created_at": from_micros(row["created_at"]),
+                "updated_at": from_micros(row["updated_at"]),
+                "delivery_date": from_micros(row["delivery_date"]),
+            }
+            for row in rows
+        ]
+
+    def _query_orders(self, sql: str, params: Iterable = ()) -> List[Order]:
+        with self.pool.connection() as connection:
+            rows = connection.execute(sql, list(params)).fetchall()
+            orders = self._order_dicts(connection, rows)
+        return self.add_products_details([self.stored_order(o) for o in orders])
+
+    def get_order_by_id(self, order_id: int) -> Optional[Order]:
+        orders = self._query_orders(
+            f"SELECT {_ORDER_COLUMNS} FROM orders WHERE id = ?", (order_id,)
+        )
+        return orders[0] if orders else None
+
+    def _stored_order_dicts(
+        self, connection: sqlite3.Connection, order_ids: Iterable[int]
+    ) -> List[dict]:
+        orders = []
+        for chunk in _chunks(list(set(order_ids))):
+            rows = connection.execute(
+                f"SELECT {_ORDER_COLUMNS} FROM orders"
+                f" WHERE id IN ({_placeholders(len(chunk))})",
+                chunk,
+            ).fetchall()
+            orders.extend(self._order_dicts(connection, rows))
+        return orders
+
+    def get_orders_by_ids(self, order_ids: Iterable[int]) -> Dict[int, Order]:
+        with self.pool.connection() as connection:
+            orders = self._stored_order_dicts(connection, order_ids)
+        return {
+            order.id: order
+            for order in self.add_products_details(
+                [self.stored_order(o) for o in orders]
+            )
+        }
+
+    def get_orders_by_user(self, user_id: int) -> List[Order]:
+        return self._query_orders(
+            f"SELECT {_ORDER_COLUMNS} FROM orders WHERE user_id = ? ORDER BY id",
+            (user_id,),
+        )
+
+    def get_all_orders(self) -> List[Order]:
+        return self._query_orders(f"SELECT {_ORDER_COLUMNS} FROM orders ORDER BY id")
+
+    def list_orders(
+        self,
+        user_id: Optional[int] = None,
+        status: Optional[OrderStatus] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        sort_by: str = "created_at",
+        descending: bool = True,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Order], Optional[str]]:
+        if sort_by not in ORDER_SORT_FIELDS:
+            raise ValueError(f"Cannot sort orders by {sort_by}")
+        clauses, params = [], []
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(OrderStatus(status).value)
+        if created_from is not None:
+            clauses.append("created_at >= ?")
+            params.append(to_micros(created_from))
+        if created_to is not None:
+            clauses.append("created_at <= ?")
+            params.append(to_micros(created_to))
+        if cursor:
+            clauses.append(f"({sort_by}, id) {'<' if descending else '>'} (?, ?)")
+            params.extend(decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "DESC" if descending else "ASC"
+
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                f"SELECT {_ORDER_COLUMNS} FROM orders {where}"
+                f" ORDER BY {sort_by} {direction}, id {direction} LIMIT ?",
+                [*params, limit + 1],
+            ).fetchall()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor((rows[-1][sort_by], rows[-1]["id"]))
+            orders = self._order_dicts(connection, rows)
+        return (
+            self.add_products_details([self.stored_order(o) for o in orders]),
+            next_cursor,
+        )
+
+    # Sales analytics
+    def get_sales_by_status(self) -> Dict[OrderStatus, Tuple[int, int]]:
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                "SELECT status, orders, revenue_cents FROM sales_by_status"
+                " WHERE orders != 0"
+            ).fetchall()
+        return {OrderStatus(status): (orders, cents) for status, orders, cents in rows}
+
+    def get_sales_by_product(self) -> Dict[int, Tuple[int, int]]:
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                "SELECT product_id, units, revenue_cents FROM sales_by_product"
+                " WHERE units != 0 OR revenue_cents != 0"
+            ).fetchall()
+        return {product_id: (units, cents) for product_id, units, cents in rows}
+
+    def get_sales_by_day(
+        self, start: Optional[date] = None, end: Optional[date] = None
+    ) -> Dict[date, Tuple[int, int]]:
+        with self.pool.connection() as connection:
+            rows = connection.execute(
+                "SELECT day, orders, revenue_cents FROM sales_by_day"
+                " WHERE orders != 0 AND day >= ? AND day <= ? ORDER BY day",
+                (
+                    start.isoformat() if start else "",
+                    end.isoformat() if end else "9999-12-31",
+                ),
+            ).fetchall()
+        return {date.fromisoformat(day): (orders, cents) for day, orders, cents in rows}
+
+    def iter_orders(self, since: Optional[datetime] = None) -> Iterator[dict]:
+        # Each batch checks a connection out only while it is read, so a slow
+        # consumer does not hold on to a pooled connection.
+        clause, params = "", []
+        if since is not None:
+            clause = "AND COALESCE(updated_at, created_at) >= ?"
+            params = [to_micros(since)]
+        last_id = 0
+        while True:
+            with self.pool.connection() as connection:
+                rows = connection.execute(
+                    f"SELECT {_ORDER_COLUMNS} FROM orders WHERE id > ? {clause}"
+                    " ORDER BY id LIMIT ?",
+                    [last_id, *params, ITER_BATCH_SIZE],
+                ).fetchall()
+                orders = self._order_dicts(connection, rows)
+            if not orders:
+                return
+            yield from orders
+            last_id = orders[-1]["id"]
+
+    def list_late_orders(
+        self, now: datetime, user_id: Optional[int] = None, limit: int = 100
+    ) -> List[Order]:
+        index, clauses = "orders_open_delivery", [_OPEN_ORDERS, "delivery_date <= ?"]
+        params: list = [to_micros(now)]
+        if user_id is not None:
+            index = "orders_user_open_delivery"
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        return self._query_orders(
+            f"SELECT {_ORDER_COLUMNS} FROM orders INDEXED BY {index}"
+            f" WHERE {' AND '.join(clauses)} ORDER BY delivery_date, id LIMIT ?",
+            [*params, limit],
+        )
+
+    def count_late_orders(self, now: datetime) -> int:
+        with self.pool.connection() as connection:
+            (count,) = connection.execute(
+                "SELECT COUNT(*) FROM orders INDEXED BY orders_open_delivery"
+                f" WHERE {_OPEN_ORDERS} AND delivery_date <= ?",
+                (to_micros(now),),
+            ).fetchone()
+        return count
+
+    def get_product_order_count(self, product_id: int) -> int:
+        with self.pool.connection() as connection:
+            row = connection.execute(
+                "SELECT COUNT(DISTINCT order_id) FROM order_items WHERE product_id = ?",
+                (product_id,),
+            ).fetchone()
+        return row[0]
+
+    def _insert_order(self, connection: sqlite3.Connection, new_order: dict) -> None:
+        new_order["id"] = connection.execute(
+            _UPSERT_ORDER, self._order_row(new_order)
+        ).lastrowid
+        connection.executemany(
+            _INSERT_ITEM, self._item_rows(new_order["id"], new_order["items"])
+        )
+
+    def create_order(self, user_id: int, order: OrderCreate) -> Order:
+        with self._transaction() as connection:
+            # Check that every product exists and price the order at current prices
+            products = self._products_by_ids(
+                connection, {item.id for item in order.items}
+            )
+            new_order = self.new_order(user_id, order, products, datetime.now(UTC))
+            self._insert_order(connection, new_order)
+            model = Order(**new_order)
+            sales = SalesTotals()
+            sales.add_order(model, products)
+            self._apply_sales(connection, sales)
+        self._notify_order_changed(new_order["id"], user_id)
+        return model
+
+    def create_orders(
+        self, orders: List[Tuple[int, OrderCreate]]
+    ) -> List[Union[Order, ValueError]]:
+        results: List[Union[Order, ValueError]] = []
+        with self._transaction() as connection:
+            products = self._products_by_ids(
+                connection, {item.id for _, order in orders for item in order.items}
+            )
+            created_at = datetime.now(UTC)
+            sales = SalesTotals()
+            for user_id, order in orders:
+                # An invalid order, whether pricing or validation rejects it,
+                # only fails its own entry: its rows are rolled back to the
+                # savepoint, and the rest of the batch is kept
+                connection.execute("SAVEPOINT bulk_order")
+                try:
+                    new_order = self.new_order(user_id, order, products, created_at)
+                    self._insert_order(connection, new_order)
+                    model = Order(**new_order)
+                except ValueError as e:
+                    connection.execute("ROLLBACK TO bulk_order")
+                    results.append(e)
+                else:
+                    sales.add_order(model, products)
+                    results.append(model)
+                connection.execute("RELEASE bulk_order")
+            self._apply_sales(connection, sales)
+        for result in results:
+            if isinstance(result, Order):
+                self._notify_order_changed(result.id, result.user_id)
+        return results
+
+    def update_order_status(
+        self, order_id: int, status: str, expected: Optional[OrderStatus] = None
+    ) -> Optional[Order]:
+        status = OrderStatus(status)
+        updated_at = datetime.now(UTC)
+        with self._transaction() as connection:
+            previous = self._stored_order_dicts(connection, [order_id])
+            if not previous:
+                return None
+            if expected is not None and previous[0]["status"] != expected:
+                return None
+            connection.execute(
+                "UPDATE orders SET status = ?, updated_at = ? WHERE id = ?",
+                (status.value, to_micros(updated_at), order_id),
+            )
+            before = self.stored_order(previous[0])
+            order = before.model_copy(
+                update={"status": status, "updated_at": updated_at}
+            )
+            sales = SalesTotals()
+            products = self._products_by_ids(
+                connection, {item.id for item in order.items}
+            )
+            sales.add_order(before, products, -1)
+            sales.add_order(order, products)
+            self._apply_sales(connection, sales)
+        self._notify_order_changed(order_id, order.user_id)
+        return order
@@ -0,0 +1,247 @@
+import argparse
+import gzip
+import itertools
+import json
+import random
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import IO, Iterator, List, Optional, Tuple, Union
+
+from .data import resolve_order_dates
+from .models import OrderStatus
+from .security import get_password_hash
+
+# Password of every generated user, who log in as ``user<id>``; user 1 is an admin
+SYNTHETIC_PASSWORD = "synthetic123"
+
+FIXTURE_SECTIONS = ("users", "products", "orders")
+
+# Zipf exponents: a handful of products appear in most orders, and power
+# users place hundreds of orders while most place a few
+PRODUCT_POPULARITY_EXPONENT = 1.0
+USER_ACTIVITY_EXPONENT = 0.6
+
+_ADJECTIVES = [
+    "Classic", "Slim", "Pro", "Deluxe", "Sport", "Urban", "Vintage", "Compact",
+    "Wireless", "Waterproof", "Organic", "Premium", "Everyday", "Travel", "Smart",
+]  # fmt: skip
+_NOUNS = [
+    "T-Shirt", "Jeans", "Running Shoes", "Wallet", "Headphones", "Backpack",
+    "Watch", "Sunglasses", "Jacket", "Sneakers", "Hoodie", "Water Bottle",
+    "Desk Lamp", "Phone Case", "Scarf", "Belt", "Cap", "Notebook",
+]  # fmt: skip
+_MATERIALS = ["cotton", "leather", "canvas", "recycled plastic", "steel", "wool"]
+_FEATURES = [
+    "a lifetime warranty", "extra padding", "RFID protection", "a slim profile",
+    "reinforced seams", "fast charging", "a water-resistant finish",
+]  # fmt: skip
+
+_ITEM_COUNTS = ((1, 2, 3, 4, 5), (50, 25, 12, 8, 5))
+_QUANTITIES = ((1, 2, 3), (80, 15, 5))
+# Status mix by order age in days: recent orders are still moving, old ones
+# are mostly delivered, and a few are late and still processing
+_STATUSES_BY_AGE = [
+    (1, (OrderStatus.PENDING, OrderStatus.PROCESSING), (60, 40)),
+    (
+        4,
+        (OrderStatus.PROCESSING, OrderStatus.SHIPPED, OrderStatus.CANCELLED),
+        (35, 60, 5),
+    ),
+    (
+        float("inf"),
+        (
+            OrderStatus.DELIVERED,
+            OrderStatus.CANCELLED,
+            OrderStatus.SHIPPED,
+            OrderStatus.PROCESSING,
+        ),
+        (88, 8, 3, 1),
+    ),
+]
+
+
+def _zipf_cum_weights(count: int, exponent: float, rng: random.Random) -> List[float]:
+    # Ranks are shuffled, so the popular ids are spread over the id range
+    weights = [1 / rank**exponent for rank in range(1, count + 1)]
+    rng.shuffle(weights)
+    return list(itertools.accumulate(weights))
+
+
+class SyntheticData:
+    """Users, products and orders generated one record at a time.
+
+    The same sizes and seed always produce the same records, and each
+    section has its own random stream, so it can be generated on its own.
+    Records are shaped like the seed data in ``src.data``: order dates are
+    day offsets, spread evenly over the last ``days`` days.
+    """
+
+    def __init__(
+        self,
+        users: int = 200_000,
+        products: int = 20_000,
+        orders: int = 2_000_000,
+        seed: int = 42,
+        days: int = 365,
+    ) -> None:
+        if min(users, products, days) < 1 or orders < 0:
+            raise ValueError("Need at least one user, one product and one day")
+        self.user_count = users
+        self.product_count = products
+        self.order_count = orders
+        self.seed = seed
+        self.days = days
+
+    def _random(self, section: str) -> random.Random:
+        return random.Random(f"{self.seed}:{section}")
+
+    def users(self) -> Iterator[dict]:
+        rng = self._random("users")
+        # One hash for everyone: hashing a password per user would take hours
+        hashed_password = get_password_hash(
+            SYNTHETIC_PASSWORD, salt=f"{rng.getrandbits(128):032x}"
+        )
+        for user_id in range(1, self.user_count + 1):
+            yield {
+                "id": user_id,
+                "email": f"user{user_id}@example.com",
+                "username": f"user{user_id}",
+                "hashed_password": hashed_password,
+                "role": "admin" if user_id == 1 else "user",
+            }
+
+    def products(self) -> Iterator[dict]:
+        rng = self._random("products")
+        for product_id in range(1, self.product_count + 1):
+            adjective, noun = rng.choice(_ADJECTIVES), rng.choice(_NOUNS)
+            yield {
+                "id": product_id,
+                "name": f"{adjective} {noun}",
+                "description": (
+                    f"{adjective} {noun.lower()} in {rng.choice(_MATERIALS)}"
+                    f" with {rng.choice(_FEATURES)}"
+                ),
+                # Long-tailed around $33
+                "price": round(max(1.0, rng.lognormvariate(3.5, 0.9)), 2),
+            }
+
+    def orders(self) -> Iterator[dict]:
+        prices = [product["price"] for product in self.products()]
+        rng = self._random("orders")
+        product_weights = _zipf_cum_weights(
+            self.product_count, PRODUCT_POPULARITY_EXPONENT, rng
+        )
+        user_weights = _zipf_cum_weights(self.user_count, USER_ACTIVITY_EXPONENT, rng)
+        product_ids = range(1, self.product_count + 1)
+        user_ids = range(1, self.user_count + 1)
+        for order_id in range(1, self.order_count + 1):
+            # Oldest first, at a steady rate
+            age = self.days * (1 - (order_id - rng.random()) / self.order_count)
+            item_count = rng.choices(*_ITEM_COUNTS)[0]
+            ordered = dict.fromkeys(
+                rng.choices(product_ids, cum_weights=product_weights, k=item_count)
+            )
+            items = [
+                {"id": product_id, "quantity": rng.choices(*_QUANTITIES)[0]}
+                for product_id in ordered
+            ]
+            for max_age, statuses, weights in _STATUSES_BY_AGE:
+                if age < max_age:
+                    status = rng.choices(statuses, weights)[0]
+                    break
+            created_at = -age
+            yield {
+                "id": order_id,
+                "user_id": rng.choices(user_ids, cum_weights=user_weights)[0],
+                "items": items,
+                "total_price": round(
+                    sum(prices[item["id"] - 1] * item["quantity"] for item in items),
+                    2,
+                ),
+                "status": status.value,
+                "created_at": round(created_at, 5),
+                "updated_at": (
+                    None
+                    if status == OrderStatus.PENDING
+                    else round(created_at + rng.uniform(0, min(age, 3)), 5)
+                ),
+                "delivery_date": round(created_at + rng.randint(3, 10), 5),
+            }
+
+
+def _open(path: Union[str, Path], mode: str) -> IO[str]:
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_fixture(path: Union[str, Path], data: SyntheticData) -> None:
+    """Stream ``data`` to a JSON Lines fixture, gzipped if ``path`` ends in .gz.
+
+    The first line holds the record count of each section, and the records
+    follow one per line, users first, then products, then orders.
+    """
+    header = {
+        "users": data.user_count,
+        "products": data.product_count,
+        "orders": data.order_count,
+        "seed": data.seed,
+    }
+    with _open(path, "wt") as file:
+        file.write(json.dumps(header) + "\n")
+        for record in itertools.chain(data.users(), data.products(), data.orders()):
+            file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def iter_fixture(
+    path: Union[str, Path], batch_size: int = 10_000, now: Optional[datetime] = None
+) -> Iterator[Tuple[str, List[dict]]]:
+    """Read a fixture written by ``write_fixture`` as ``(section, records)``.
+
+    Records come in batches of at most ``batch_size``, in file order, so
+    only one batch is in memory at a time. Order dates are resolved against
+    ``now``.
+    """
+    now = now or datetime.now(UTC)
+    with _open(path, "rt") as file:
+        header = json.loads(next(file))
+        for section in FIXTURE_SECTIONS:
+            remaining = header[section]
+            while remaining:
+                batch = [
+                    json.loads(line)
+                    for line in itertools.islice(file, min(batch_size, remaining))
+                ]
+                if not batch:
+                    raise ValueError(f"Fixture {path} ends before its {section}")
+                remaining -= len(batch)
+                if section == "orders":
+                    for order in batch:
+                        resolve_order_dates(order, now)
+                yield section, batch
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Write a synthetic data fixture for SEED_FIXTURE_PATH"
+    )
+    parser.add_argument("path", help="Output file, gzipped if it ends in .gz")
+    parser.add_argument("--users", type=int, default=200_000)
+    parser.add_argument("--products", type=int, default=20_000)
+    parser.add_argument("--orders", type=int, default=2_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+    data = SyntheticData(args.users, args.products, args.orders, args.seed, args.days)
+    start = time.perf_counter()
+    write_fixture(args.path, data)
+    print(
+        f"Wrote {data.user_count:,} users, {data.product_count:,} products and"
+        f" {data.order_count:,} orders to {args.path}"
+        f" in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
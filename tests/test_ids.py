@@ -0,0 +1,118 @@
+"""
+Id allocation under concurrent creates, on both storage backends.
+
+Threads sharing one backend create orders, one at a time and in bulk, and
+products; every id must be handed out once, and ids follow the seeded ones
+without gaps.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List
+
+import pytest
+
+from src.data import MOCK_ORDERS, MOCK_PRODUCTS, MOCK_USERS
+from src.schemas import OrderCreate, ProductCreate
+from src.storage import MemoryBackend, SQLiteBackend, StorageBackend
+
+THREADS = 8
+CREATES_PER_THREAD = 50
+BULK_SIZE = 5
+
+ORDER = OrderCreate(items=[{"id": 1, "quantity": 1}])
+PRODUCT = ProductCreate(name="Concurrent Product", description="Test", price=1.0)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path) -> Iterator[StorageBackend]:
+    if request.param == "memory":
+        backend: StorageBackend = MemoryBackend()
+    else:
+        backend = SQLiteBackend(str(tmp_path / "ids.db"))
+    backend.load(users=MOCK_USERS, products=MOCK_PRODUCTS, orders=MOCK_ORDERS)
+    yield backend
+    backend.close()
+
+
+def run_threads(create) -> List[int]:
+    with ThreadPoolExecutor(THREADS) as executor:
+        batches = executor.map(lambda _: create(), range(THREADS))
+        return [created for batch in batches for created in batch]
+
+
+def assert_unique_and_dense(ids: List[int], seeded: int) -> None:
+    assert len(ids) == len(set(ids)), "an id was handed out twice"
+    assert sorted(ids) == list(range(seeded + 1, seeded + 1 + len(ids)))
+
+
+def test_concurrent_orders_get_unique_dense_ids(backend):
+    def create() -> List[int]:
+        ids = []
+        for number in range(CREATES_PER_THREAD):
+            if number % 10 == 0:
+                orders = backend.create_orders([(2, ORDER)] * BULK_SIZE)
+                ids.extend(order.id for order in orders)
+            else:
+                ids.append(backend.create_order(2, ORDER).id)
+        return ids
+
+    ids = run_threads(create)
+
+    assert_unique_and_dense(ids, max(order["id"] for order in MOCK_ORDERS))
+    stored = backend.get_orders_by_ids(ids)
+    assert sorted(stored) == sorted(ids)
+    assert all(order.user_id == 2 for order in stored.values())
+
+
+def test_concurrent_products_get_unique_dense_ids(backend):
+    def create() -> List[int]:
+        return [backend.create_product(PRODUCT).id for _ in range(CREATES_PER_THREAD)]
+
+    ids = run_threads(create)
+
+    assert_unique_and_dense(ids, max(product["id"] for product in MOCK_PRODUCTS))
+    assert all(product_id in backend.get_products_by_ids(ids) for product_id in ids)
+
+
+def test_concurrent_orders_and_products_do_not_share_a_sequence(backend):
+    def create() -> List[int]:
+        ids = []
+        for _ in range(CREATES_PER_THREAD):
+            ids.append(backend.create_order(2, ORDER).id)
+            ids.append(-backend.create_product(PRODUCT).id)
+        return ids
+
+    ids = run_threads(create)
+
+    assert_unique_and_dense(
+        [created for created in ids if created > 0],
+        max(order["id"] for order in MOCK_ORDERS),
+    )
+    assert_unique_and_dense(
+        [-created for created in ids if created < 0],
+        max(product["id"] for product in MOCK_PRODUCTS),
+    )
+
+
+def test_memory_backends_sharing_a_sequence_never_reuse_ids(tmp_path):
+    sequence_path = str(tmp_path / "sequence.db")
+    backends = [MemoryBackend(id_sequence_path=sequence_path) for _ in range(2)]
+    for backend in backends:
+        backend.load(users=MOCK_USERS, products=MOCK_PRODUCTS, orders=MOCK_ORDERS)
+    try:
+        with ThreadPoolExecutor(THREADS) as executor:
+            batches = executor.map(
+                lambda number: [
+                    backends[number % 2].create_order(2, ORDER).id
+                    for _ in range(CREATES_PER_THREAD)
+                ],
+                range(THREADS),
+            )
+            ids = [created for batch in batches for created in batch]
+    finally:
+        for backend in backends:
+            backend.close()
+
+    # Each backend leases its own blocks, so ids are unique but not dense
+    assert len(ids) == len(set(ids))
+    assert min(ids) > max(order["id"] for order in MOCK_ORDERS)